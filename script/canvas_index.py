@@ -0,0 +1,73 @@
+# -*- coding: UTF-8 -*-
+""" World coordinates of static canvas items
+This script contains the index PlanViz2024 zooms with: the canvas items that never move (e.g.,
+tasks, start locations and path cells) are kept in tile units, so that only the items in view are
+re-placed when the tile size changes.
+All rights reserved.
+"""
+
+from typing import Dict, Iterable, List, Sequence, Tuple
+import numpy as np
+
+
+class CanvasItemIndex:
+    """ Tile coordinates of static canvas items, plus the tile size each item was last placed at.
+
+    Boxes are (x0, y0, x1, y1) in tiles. Points, e.g., text anchors, have x0 == x1 and y0 == y1
+    and num_coords 2. Rows are appended with doubling capacity and never reused, so that removed
+    items only clear their id.
+    """
+    def __init__(self):
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.boxes = np.zeros((0, 4), dtype=np.float64)
+        self.num_coords = np.zeros(0, dtype=np.int8)
+        self.tile_sizes = np.zeros(0, dtype=np.float64)
+        self.rows:Dict[int, int] = {}
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add(self, item_id:int, coords:Sequence[float], tile_size:float) -> None:
+        """Add an item placed at tile_size with coords in tiles, either (x, y) or (x0, y0, x1, y1)."""
+        if self.size == len(self.ids):
+            capacity = max(2 * self.size, 64)
+            self.ids = np.resize(self.ids, capacity)
+            self.boxes = np.resize(self.boxes, (capacity, 4))
+            self.num_coords = np.resize(self.num_coords, capacity)
+            self.tile_sizes = np.resize(self.tile_sizes, capacity)
+        row = self.size
+        self.ids[row] = item_id
+        self.boxes[row] = tuple(coords) * 2 if len(coords) == 2 else coords
+        self.num_coords[row] = len(coords)
+        self.tile_sizes[row] = tile_size
+        self.rows[item_id] = row
+        self.size += 1
+
+    def discard(self, item_ids:Iterable[int]) -> None:
+        for item_id in item_ids:
+            row = self.rows.pop(item_id, None)
+            if row is not None:
+                self.ids[row] = -1
+
+    def get_stale_rows_in(self, box:Tuple[float, float, float, float],
+                          tile_size:float) -> np.ndarray:
+        """Rows of the items overlapping box (in tiles) that are not placed at tile_size."""
+        left, top, right, bottom = box
+        boxes = self.boxes[:self.size]
+        mask = (self.tile_sizes[:self.size] != tile_size) & (self.ids[:self.size] >= 0) & \
+            (boxes[:, 2] >= left) & (boxes[:, 0] <= right) & \
+            (boxes[:, 3] >= top) & (boxes[:, 1] <= bottom)
+        return np.flatnonzero(mask)
+
+    def get_stale_rows(self, item_ids:Iterable[int], tile_size:float) -> np.ndarray:
+        rows = np.asarray([self.rows[item_id] for item_id in item_ids if item_id in self.rows],
+                          dtype=np.int64)
+        return rows[self.tile_sizes[rows] != tile_size]
+
+    def place(self, rows:np.ndarray, tile_size:float) -> List[Tuple[int, List[float]]]:
+        """Screen coordinates of rows at tile_size, which is recorded as their placement."""
+        screen = self.boxes[rows] * tile_size
+        self.tile_sizes[rows] = tile_size
+        return [(item_id, coords[:num].tolist()) for (item_id, coords, num)
+                in zip(self.ids[rows].tolist(), screen, self.num_coords[rows].tolist())]
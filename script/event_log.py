@@ -0,0 +1,126 @@
+# -*- coding: UTF-8 -*-
+""" Event log of task assignments and finishes
+This script contains the event table behind the event panels of PlanViz2024: one flat array per
+field, sorted by time, with per-agent and per-task indexes, and the views that list its rows up
+to the current time.
+All rights reserved.
+"""
+
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+import numpy as np
+from virtual_list import VirtualListbox
+
+EVENT_TYPES:Tuple[str, ...] = ("assigned", "errand_finished", "task_finished")
+EVENT_NAMES:Tuple[str, ...] = ("Assigned", "E-Finished", "T-Finished")
+EVENT_HEADER:str = f"{'Time':<6}{'Agent':<8}{'Event':<12}{'Task ID':<8}"
+
+
+def group_rows(keys:np.ndarray) -> Dict[int, np.ndarray]:
+    """Rows of each key, in ascending order."""
+    order = np.argsort(keys, kind="stable")
+    uniq_keys, starts = np.unique(keys[order], return_index=True)
+    return dict(zip(uniq_keys.tolist(), np.split(order, starts[1:])))
+
+
+class EventLog:
+    """ The assignments of first errands and all errand finishes, as shown in the event panels.
+
+    Rows are sorted by time. Within a time, they are in reverse panel order (the panels list the
+    assignments before the finishes, each by global task id), so that a panel lists its rows
+    backward from the last one up to the current time.
+    """
+    def __init__(self, events:Dict[str, Dict[int, Dict[int, int]]], seq_tasks:Dict,
+                 max_seq_num:int):
+        records:List[Tuple[int, int, int, int]] = []  # (time, global task id, agent, type)
+        if max_seq_num > 0:
+            for (tstep, cur_events) in events["assigned"].items():
+                records.extend((tstep, global_task_id, ag_id, 0)
+                               for (global_task_id, ag_id) in cur_events.items()
+                               if global_task_id % max_seq_num == 0)
+            for (tstep, cur_events) in events["finished"].items():
+                for (global_task_id, ag_id) in cur_events.items():
+                    task_id, seq_id = divmod(global_task_id, max_seq_num)
+                    is_last = seq_id == len(seq_tasks[task_id].tasks) - 1
+                    records.append((tstep, global_task_id, ag_id, 2 if is_last else 1))
+
+        table = np.asarray(records, dtype=np.int64).reshape(-1, 4)
+        order = np.lexsort((-table[:, 1], -np.minimum(table[:, 3], 1), table[:, 0]))
+        table = table[order]
+        self.times = table[:, 0].copy()
+        self.agents = table[:, 2].copy()
+        self.types = table[:, 3].astype(np.int8)
+        self.task_ids = table[:, 1] // max(max_seq_num, 1)
+        self.seq_ids = table[:, 1] % max(max_seq_num, 1)
+        self.agent_rows = group_rows(self.agents)
+        self.task_rows = group_rows(self.task_ids)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def get_agent_rows(self, ag_id:int) -> np.ndarray:
+        return self.agent_rows.get(ag_id, np.zeros(0, dtype=np.int64))
+
+    def get_task_rows(self, task_ids:Iterable[int], types:Iterable[str]) -> np.ndarray:
+        """Rows of the given event types of any of task_ids, in ascending order."""
+        rows = [self.task_rows[task_id] for task_id in set(task_ids) if task_id in self.task_rows]
+        if not rows:
+            return np.zeros(0, dtype=np.int64)
+        rows = np.unique(np.concatenate(rows))
+        type_codes = [EVENT_TYPES.index(event_type) for event_type in types]
+        return rows[np.isin(self.types[rows], type_codes)]
+
+    def get_text(self, row:int) -> str:
+        return f"{self.times[row]:<6}{self.agents[row]:<8}" \
+            f"{EVENT_NAMES[self.types[row]]:<12}{self.task_ids[row]:<8}"
+
+    def get_event(self, row:int) -> Tuple[int, int, int, int, str]:
+        """(time, agent, task id, seq id, event type) of a row."""
+        return (int(self.times[row]), int(self.agents[row]), int(self.task_ids[row]),
+                int(self.seq_ids[row]), EVENT_TYPES[self.types[row]])
+
+
+class EventListView:
+    """ Rows of an EventLog up to a time, listed newest first in a VirtualListbox.
+
+    The listbox lists rows[start:end] backward, so moving to another time only changes the range
+    and redraws the rows in view.
+    """
+    def __init__(self, vlist:VirtualListbox, log:EventLog, rows:np.ndarray, key:Hashable=None):
+        self.vlist = vlist
+        self.log = log
+        self.rows = rows
+        self.times = log.times[rows]
+        self.key = key  # What the rows were selected by
+        self.start = 0
+        self.end = 0
+        self.highlight_tstep:Optional[int] = None
+
+    def get_row(self, pos:int) -> int:
+        """Log row listed at pos."""
+        return int(self.rows[self.end - 1 - pos])
+
+    def get_text(self, pos:int) -> str:
+        return self.log.get_text(self.get_row(pos))
+
+    def get_background(self, pos:int) -> str:
+        return "yellow" if self.log.times[self.get_row(pos)] == self.highlight_tstep else ""
+
+    def get_event(self, index:int) -> Optional[Tuple[int, int, int, int, str]]:
+        """The event at a listbox index, or None for the header lines."""
+        pos = self.vlist.get_pos(index)
+        if pos is None:
+            return None
+        return self.log.get_event(self.get_row(pos))
+
+    def update(self, end_tstep:int, highlight_tstep:int, limit:int=None) -> int:
+        """ List the last limit rows (all by default) up to end_tstep, and highlight the rows at
+        highlight_tstep.
+
+        Returns:
+            int: number of rows listed.
+        """
+        self.end = int(np.searchsorted(self.times, end_tstep, side="right"))
+        self.start = 0 if limit is None else max(0, self.end - limit)
+        self.highlight_tstep = highlight_tstep
+        self.vlist.set_rows(self.end - self.start, self.get_text, self.get_background)
+        return self.end - self.start
@@ -0,0 +1,175 @@
+# -*- coding: UTF-8 -*-
+""" Ragged storage for per-agent motion codes and states
+This script contains the flat buffers behind exec_paths, plan_paths and the motion codes of
+PlanConfig2024. Per-agent arrays are zero-copy views into these buffers.
+All rights reserved.
+"""
+
+from typing import List, Tuple
+import numpy as np
+from util import INT_MAX
+
+FLOAT32_MAX_CELLS = 256  # Map side from which tick states no longer fit float32 within 1e-5
+
+
+def pack_ragged(arrays:List[np.ndarray], dtype, width:int=0) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatenate per-agent arrays into one flat block plus (len+1) offsets."""
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    for idx, arr in enumerate(arrays):
+        offsets[idx + 1] = offsets[idx] + len(arr)
+    shape = (int(offsets[-1]), width) if width > 0 else (int(offsets[-1]),)
+    flat = np.empty(shape, dtype=dtype)
+    for idx, arr in enumerate(arrays):
+        flat[offsets[idx]:offsets[idx + 1]] = arr
+    return flat, offsets
+
+
+def unpack_ragged(flat:np.ndarray, offsets:np.ndarray) -> List[np.ndarray]:
+    """Split a flat block back into per-agent views without copying."""
+    return [flat[offsets[idx]:offsets[idx + 1]] for idx in range(len(offsets) - 1)]
+
+
+def get_state_dtype(is_tick:bool, height:int, width:int) -> np.dtype:
+    """The most compact dtype that holds the (row, col, direction) states of a map.
+
+    Timestep states are integers and fit int16 on maps below 32k cells per side. Tick states are
+    rounded to 6 decimals. Below 256 cells per side, float32 keeps integer cells exact and rounds
+    fractions by at most half its ulp there, i.e., under 1e-5 of a cell. From 256 cells on, its
+    ulp reaches 3e-5, so larger maps keep float64.
+    """
+    if is_tick:
+        if max(height, width) < FLOAT32_MAX_CELLS:
+            return np.dtype(np.float32)
+        return np.dtype(np.float64)
+    if max(height, width) < np.iinfo(np.int16).max:
+        return np.dtype(np.int16)
+    return np.dtype(np.int32)
+
+
+class CodeStore:
+    """ Read-only motion codes of all agents: one flat int32 array plus (num_agents+1) offsets.
+    """
+    def __init__(self, flat:np.ndarray, offsets:np.ndarray):
+        self.flat = flat
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.lengths = np.diff(self.offsets)
+
+    @classmethod
+    def from_arrays(cls, arrays:List[np.ndarray]) -> "CodeStore":
+        return cls(*pack_ragged(arrays, np.int32))
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def __contains__(self, ag_id:int) -> bool:
+        return 0 <= ag_id < len(self.lengths)
+
+    def __getitem__(self, ag_id:int) -> np.ndarray:
+        return self.flat[self.offsets[ag_id]:self.offsets[ag_id + 1]]
+
+
+class PathStore:
+    """ Ragged per-agent state sequences (row, col, direction).
+
+    All states live in one flat (rows, 3) buffer. Agent i owns the rows
+    [offsets[i], offsets[i] + capacities[i]) of it, of which the first lengths[i] are filled.
+    The numba kernels append into the buffer in place after reserve(), which doubles the
+    capacities when the buffer has to grow, so that appending is amortized O(1) per state.
+    The buffer may use a compact dtype (see get_state_dtype), so the unrounded last state of each
+    agent is also kept in float64 in tails, and extensions continue from there without any drift.
+    """
+    def __init__(self, num_agents:int, dtype):
+        self.dtype = np.dtype(dtype)
+        self.states = np.empty((0, 3), dtype=self.dtype)
+        self.offsets = np.zeros(num_agents, dtype=np.int64)
+        self.lengths = np.zeros(num_agents, dtype=np.int64)
+        self.capacities = np.zeros(num_agents, dtype=np.int64)
+        self.limits = np.full(num_agents, INT_MAX, dtype=np.int64)  # Most states an agent can reach
+        self.tails = np.zeros((num_agents, 3), dtype=np.float64)
+
+    @classmethod
+    def from_ragged(cls, states:np.ndarray, offsets:np.ndarray,
+                    tails:np.ndarray=None) -> "PathStore":
+        """Wrap a packed (flat, offsets) pair, e.g. memory-mapped from the cache, without copying."""
+        store = cls(len(offsets) - 1, states.dtype)
+        store.states = states
+        store.offsets = np.asarray(offsets[:-1], dtype=np.int64)
+        store.lengths = np.diff(offsets).astype(np.int64)
+        store.capacities = store.lengths.copy()
+        if tails is not None:
+            store.tails = np.array(tails, dtype=np.float64)
+        else:
+            filled = np.flatnonzero(store.lengths)
+            store.tails[filled] = store.states[store.offsets[filled] + store.lengths[filled] - 1]
+        return store
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def grow_capacities(self, required:np.ndarray) -> np.ndarray:
+        return np.maximum(required, np.minimum(2 * self.capacities, self.limits))
+
+    def reserve(self, extra_counts:np.ndarray) -> bool:
+        """Make room for extra_counts more states per agent.
+
+        Returns:
+            bool: True if the buffer was reallocated, i.e., all the views have to be refreshed.
+        """
+        required = self.lengths + extra_counts
+        if self.states.flags.writeable and np.all(required <= self.capacities):
+            return False
+
+        new_capacities = self.grow_capacities(required)
+        new_offsets = np.zeros(len(new_capacities), dtype=np.int64)
+        new_offsets[1:] = np.cumsum(new_capacities)[:-1]
+        new_states = np.empty((int(new_capacities.sum()), 3), dtype=self.dtype)
+        # Gather the filled rows of all agents at once
+        owners = np.repeat(np.arange(len(self), dtype=np.int64), self.lengths)
+        rows = np.arange(len(owners), dtype=np.int64) - np.repeat(
+            np.cumsum(self.lengths) - self.lengths, self.lengths
+        )
+        new_states[new_offsets[owners] + rows] = self.states[self.offsets[owners] + rows]
+        self.states = new_states
+        self.offsets = new_offsets
+        self.capacities = new_capacities
+        return True
+
+    def append(self, other:"PathStore", skip_counts:np.ndarray) -> bool:
+        """Append the states of each agent in other but the first skip_counts[i] of them.
+
+        Returns:
+            bool: True if the buffer was reallocated, see reserve().
+        """
+        counts = np.maximum(other.lengths - skip_counts, 0)
+        if not np.any(counts):
+            return False
+        reallocated = self.reserve(counts)
+        owners = np.repeat(np.arange(len(self), dtype=np.int64), counts)
+        rows = np.arange(len(owners), dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+        self.states[self.offsets[owners] + self.lengths[owners] + rows] = \
+            other.states[other.offsets[owners] + skip_counts[owners] + rows]
+        self.lengths += counts
+        appended = counts > 0
+        self.tails[appended] = other.tails[appended]
+        return reallocated
+
+    def drop_front(self, counts:np.ndarray) -> None:
+        """Drop the first counts[i] states of each agent in place. The dropped rows are released
+        at the next reallocation, which only gathers the filled rows.
+        """
+        self.offsets += counts
+        self.lengths -= counts
+        self.capacities -= counts
+
+    def view(self, ag_id:int) -> np.ndarray:
+        return self.states[self.offsets[ag_id]:self.offsets[ag_id] + self.lengths[ag_id]]
+
+    def first_states(self, agent_ids:np.ndarray) -> np.ndarray:
+        return self.states[self.offsets[agent_ids]].astype(np.float64)
+
+    def last_states(self) -> np.ndarray:
+        return self.tails.copy()
+
+    def to_ragged(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Pack the filled states into a (flat, offsets) pair without spare capacity."""
+        return pack_ragged([self.view(ag_id) for ag_id in range(len(self))], self.dtype, 3)
@@ -0,0 +1,106 @@
+# -*- coding: UTF-8 -*-
+""" On-disk cache for decoded plan paths
+This script contains the .pvz cache format of PlanViz. A cache file stores a JSON header followed by
+contiguous NumPy blocks, so that every block can be memory-mapped on the next launch.
+All rights reserved.
+"""
+
+import os
+import json
+import struct
+import hashlib
+from typing import Dict, Optional
+import numpy as np
+
+CACHE_SUFFIX = ".pvz"
+CACHE_MAGIC = b"PVZ1"
+CACHE_FORMAT_VERSION = 5
+CACHE_ALIGNMENT = 64
+HASH_CHUNK_SIZE = 1 << 24
+
+
+def get_cache_file(plan_file:str, key:Dict) -> str:
+    """One cache file per plan file and load options; the file identity is validated on read."""
+    options = {name: value for name, value in key.items() if name != "file"}
+    options_digest = hashlib.blake2b(json.dumps(options, sort_keys=True).encode("UTF-8"),
+                                     digest_size=4).hexdigest()
+    return f"{plan_file}.{options_digest}{CACHE_SUFFIX}"
+
+
+def get_file_identity(in_file:str) -> Dict[str, int]:
+    """Size, modification time and inode of a file: a change of the file changes one of them,
+    and reading them costs a single stat call whatever the size of the file.
+    """
+    stat = os.stat(in_file)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "inode": stat.st_ino}
+
+
+def compute_file_hash(in_file:str) -> str:
+    """Hash of the whole file, for the optional check of a cache against the file contents."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file=in_file, mode="rb") as fin:
+        while True:
+            chunk = fin.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _align(pos:int) -> int:
+    return (pos + CACHE_ALIGNMENT - 1) // CACHE_ALIGNMENT * CACHE_ALIGNMENT
+
+
+def write_cache(cache_file:str, key:Dict, blocks:Dict[str, np.ndarray],
+                file_hash:str=None) -> None:
+    """Write the cache atomically: [magic][header length][JSON header][aligned blocks]."""
+    layout = {}
+    header = {"format": CACHE_FORMAT_VERSION, "key": key, "hash": file_hash, "blocks": layout}
+    # The header size depends on the offsets, so lay out the blocks after a generous upper bound
+    data_start = _align(len(CACHE_MAGIC) + 8 + len(json.dumps(header)) + 96 * len(blocks) + 256)
+    offset = data_start
+    for name, block in blocks.items():
+        layout[name] = {"dtype": block.dtype.str, "shape": list(block.shape), "offset": offset}
+        offset = _align(offset + block.nbytes)
+    header_bytes = json.dumps(header).encode("UTF-8")
+    if len(CACHE_MAGIC) + 8 + len(header_bytes) > data_start:
+        raise ValueError("Cache header does not fit before the data blocks.")
+
+    tmp_file = cache_file + ".tmp"
+    with open(file=tmp_file, mode="wb") as fout:
+        fout.write(CACHE_MAGIC)
+        fout.write(struct.pack("<Q", len(header_bytes)))
+        fout.write(header_bytes)
+        for name, block in blocks.items():
+            fout.seek(layout[name]["offset"])
+            fout.write(np.ascontiguousarray(block).tobytes())
+        fout.truncate(max(offset, fout.tell()))
+    os.replace(tmp_file, cache_file)
+
+
+def read_cache(cache_file:str, key:Dict, file_hash:str=None) -> Optional[Dict[str, np.ndarray]]:
+    """Memory-map the blocks of a cache file if it exists and matches the key, and the file hash
+    if given.
+    """
+    if not os.path.isfile(cache_file):
+        return None
+
+    with open(file=cache_file, mode="rb") as fin:
+        if fin.read(len(CACHE_MAGIC)) != CACHE_MAGIC:
+            return None
+        header_len = struct.unpack("<Q", fin.read(8))[0]
+        header = json.loads(fin.read(header_len).decode("UTF-8"))
+    if header.get("format") != CACHE_FORMAT_VERSION or header.get("key") != key:
+        return None
+    if file_hash is not None and header.get("hash") != file_hash:
+        return None
+
+    blocks = {}
+    for name, meta in header["blocks"].items():
+        shape = tuple(meta["shape"])
+        if int(np.prod(shape)) == 0:
+            blocks[name] = np.empty(shape, dtype=np.dtype(meta["dtype"]))
+            continue
+        blocks[name] = np.memmap(cache_file, dtype=np.dtype(meta["dtype"]), mode="r",
+                                 offset=meta["offset"], shape=shape)
+    return blocks
@@ -9,7 +9,12 @@ import sys
 import logging
 import re
 from bisect import bisect_right
-from typing import List, Tuple, Dict, Set
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+from typing import Iterable, List, Tuple, Dict, Set
 import tkinter as tk
 import json
 import math
@@ -17,15 +22,25 @@ import numpy as np
 import pandas as pd
 from matplotlib.colors import Normalize
 from matplotlib import cm
-from PIL import Image
+from PIL import Image, ImageDraw, ImageFont, ImageTk
 from util import (
-    TASK_COLORS, AGENT_COLORS, AgentStatus, DIRECTION, OBSTACLES, MAP_CONFIG, INT_MAX, DBL_MAX,
+    TASK_COLORS, ERRAND_STATES, AGENT_COLORS, AgentStatus, DIRECTION, OBSTACLES, MAP_CONFIG, INT_MAX, DBL_MAX,
     get_map_name, get_dir_loc, state_transition, state_transition_mapf,
-    BaseObj, Agent, Task, SequentialTask, compute_exec_paths, compute_plan_next_states)
+    BaseObj, Agent, Task, SequentialTask, compute_exec_paths, compute_plan_next_states,
+    compute_exec_paths_nogil, compute_plan_next_states_nogil, compute_keyframes,
+    count_segmented_rle_ticks, fill_segmented_rle_codes)
+from plan_reader import PATH_FIELDS, LazyJsonArray, PlanFileReader, read_plan_header
+from plan_cache import get_cache_file, get_file_identity, compute_file_hash, read_cache, write_cache
+from path_store import CodeStore, PathStore, get_state_dtype
+from canvas_index import CanvasItemIndex
+from event_log import EventLog
 
 MOTION_CODE = {"F": 0, "R": 1, "C": 2, "W": 3, "T": 3}
 MOTION_CODE_MAPF = {"U": 0, "L": 1, "R": 2, "D": 3, "W": 4, "T": 4}
 SEGMENTED_RLE_CHUNK_PATTERN = re.compile(r"\[\(([^)]*)\):\(([^)]*)\)\]")
+SEGMENTED_RLE_BATCH_SIZE = 1024
+PATH_KEYFRAME_INTERVAL = 256
+PATH_REBASE_INTERVALS = 2
 
 
 COORD_LABEL_LIMIT = 1_000
@@ -35,6 +50,8 @@ VIEWPORT_TARGET_VISIBLE_COLS = 80
 VIEWPORT_TARGET_VISIBLE_ROWS = 45
 MINIMAP_WIDTH = 220
 MINIMAP_HEIGHT = 160
+ENV_VIEW_MARGIN_PX = 256  # Pixels rendered around the viewport in the environment image
+GRID_COLOR = (190, 190, 190)  # Tk "grey"
 
 
 def load_map_grid(map_file: str) -> Tuple[int, int, int, List[List[int]]]:
@@ -81,6 +98,14 @@ def build_base_env_image(env_map: List[List[int]]) -> Image.Image:
     return image
 
 
+@lru_cache(maxsize=16)
+def get_label_font(size:int) -> ImageFont.ImageFont:
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 has a single bitmap font
+        return ImageFont.load_default()
+
+
 class PlanConfig2023:
     """ Plan configuration for loading and rendering functions.
     """
@@ -792,7 +817,8 @@ class PlanConfig2024:
     This is for LORR 2025, and I am like a clown (not even a joker).
     """
     def __init__(self, map_file, plan_file, team_size, start_tstep, end_tstep, window_size,
-                 ppm, moves, delay, version=None, event_limit=10):
+                 ppm, moves, delay, version=None, event_limit=None, use_cache=True, jobs=1,
+                 agent_layer=False, speed=0.0, verify_cache=False):
         print("===== Initialize PlanConfig2 =====")
 
         map_name = get_map_name(map_file)
@@ -800,7 +826,18 @@ class PlanConfig2024:
         self.start_tstep:int = start_tstep
         self.end_tstep:int = end_tstep
         self.window_size:int = window_size
-        self.event_limit:int = event_limit
+        self.event_limit:int | None = event_limit  # None: list all
+        self.use_cache:bool = use_cache
+        self.verify_cache:bool = verify_cache
+        self.jobs:int = max(1, jobs)
+        self.use_agent_layer:bool = agent_layer
+        self.playback_speed:float = max(0.0, speed)
+        self.plan_file:str = plan_file
+        self.shared_code_blocks:List[shared_memory.SharedMemory] = []
+        self.path_cache_file:str = ""
+        self.path_cache_key:Dict | None = None
+        self.path_cache_hash:str | None = None  # Hash of the plan file, only if verify_cache
+        self.path_cache_blocks:Dict[str, np.ndarray] | None = None  # Of a matching cache file
 
         self.agent_model:str = ""
         self.version = version
@@ -832,14 +869,44 @@ class PlanConfig2024:
         self.rendered_tasks: Set[Tuple[int, int]] = set()
         self.events:Dict[str, Dict[int, Dict[int,int]]] = {"assigned": {}, "finished": {}}
         self.event_tracker = {"aTime": [], "aid": 0, "fTime": [], "fid": 0}
+        # Event times per errand, in rows sorted by global task id (see build_errand_index)
+        self.errand_ids = np.zeros(0, dtype=np.int64)
+        self.errand_task_ids = np.zeros(0, dtype=np.int64)
+        self.errand_seq_ids = np.zeros(0, dtype=np.int64)
+        self.errand_assign_tsteps = np.zeros(0, dtype=np.int64)
+        self.errand_finish_tsteps = np.zeros(0, dtype=np.int64)
+        self.event_log = EventLog(self.events, self.seq_tasks, self.max_seq_num)
         self.actual_schedule:Dict[int, List[Tuple[int]]] = {}  # timestep -> (task id, agent id)
-
-        self.grids:List = []
+        # Assignments of each agent sorted by (time, task id), see get_current_task
+        self.agent_assign_tsteps:Dict[int, np.ndarray] = {}
+        self.agent_assign_tasks:Dict[int, np.ndarray] = {}
+        # Finish time of every errand of each task (inf if not finished), see get_first_errand
+        self.task_finish_tsteps:Dict[int, np.ndarray] = {}
+
+        self.obstacle_mask:np.ndarray = np.zeros((0, 0), dtype=bool)
+        self.show_env_grid:bool = True
+        self.env_image_obj = None
+        self.env_photo = None
+        self.env_view_bbox:Tuple[int, int, int, int] | None = None  # World pixels of env_photo
+        self.env_view_key:Tuple[float, bool] | None = None  # (tile size, grid) of env_photo
+        self.env_view_image:Image.Image | None = None  # Drawing of env_photo at env_view_key
+        self.env_view_scaled:bool = False  # Whether env_photo is stretched to another tile size
+        self.item_index = CanvasItemIndex()  # Static items that zooming re-places lazily
         self.start_loc  = {}
         self.plan_paths = {}
         self.exec_paths = {}
-        self.actual_path_codes = {}
-        self.plan_path_codes = {}
+        self.actual_path_codes:CodeStore = CodeStore.from_arrays([])
+        self.plan_path_codes:CodeStore = CodeStore.from_arrays([])
+        self.exec_store:PathStore = PathStore(0, np.int32)
+        self.plan_store:PathStore = PathStore(0, np.int32)
+        self.keyframe_store:PathStore = PathStore(0, np.float64)
+        self.keyframe_interval:int = PATH_KEYFRAME_INTERVAL if window_size is not None else INT_MAX
+        self.path_base_tstep:int = self.start_tstep
+        self.path_end_tstep:int = self.start_tstep  # Last timestep the stores cover
+        self.path_prefetcher:ThreadPoolExecutor | None = None
+        # (exec ends, plan ends, target timestep, extension) of the extension on the worker
+        self.path_prefetch:Tuple[np.ndarray, np.ndarray, int, Future] | None = None
+        self.active_agents:Dict[int, np.ndarray] = {}  # Timestep -> agents moving after it
         self.conflicts  = {}
         self.agent_assigned_task = {}
         self.agent_shown_task_arrow = {}
@@ -850,6 +917,10 @@ class PlanConfig2024:
         self.shown_tasks_seq:Set[int] = set()
         self.conflict_agents:Set[int] = set()
         self.error_agents_by_timestep:Dict[int, Set[int]] = {}
+        # Rows of the error panel, sorted by time (see build_conflict_table)
+        self.conflict_tsteps = np.zeros(0, dtype=np.int64)
+        self.conflict_texts:List[str] = []
+        self.conflict_errors:List[List] = []
         self.finished_agents_by_timestep:Dict[int, Set[int]] = {}
         self.delay_intervals:Dict[int, List[Tuple[int, int]]] = {}
         self.delay_interval_starts:Dict[int, List[int]] = {}
@@ -963,7 +1034,8 @@ class PlanConfig2024:
         return (round(row, 6), round(col, 6), round(ori, 6))
 
 
-    def decode_segmented_rle_codes(self, path_str:str, path_label:str,
+    @staticmethod
+    def decode_segmented_rle_codes(path_str:str, path_label:str,
                                    char_to_code: np.ndarray, wait_code: int) -> np.ndarray:
         """Decode segmented-rle-v1 path string:
         [(startTick,x,y,dir,counter):(A 10,W 20)]...
@@ -1038,34 +1110,57 @@ class PlanConfig2024:
         return codes
 
 
-    def extract_agent_codes(self, data:Dict, path_field:str, team_size:int,
-                            char_to_code: np.ndarray, wait_code: int):
-        """Extract per-agent motion code arrays from actualPaths/plannerPaths.
-        Supports:
-        - segmented-rle-v1 string chunks in the path field (tick mode), and
-        - legacy comma-separated motions.
+    @staticmethod
+    def decode_segmented_rle_batch(path_strs:List[str], path_field:str, first_ag_id:int,
+                                   char_to_code: np.ndarray, wait_code: int) -> List[np.ndarray]:
+        """Decode a batch of segmented-rle-v1 path strings with the numba kernels.
+        The codes of all agents in the batch share one flat buffer. Strings that the kernel does not
+        accept are decoded by decode_segmented_rle_codes, which reports the exact error.
         """
-        if path_field not in data:
-            raise KeyError(f"Missing {path_field}.")
+        encoded = [path_str.encode("UTF-8") for path_str in path_strs]
+        bounds = np.zeros(len(encoded) + 1, dtype=np.int64)
+        bounds[1:] = np.cumsum([len(path_bytes) for path_bytes in encoded])
+        buf = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        tick_counts = np.empty(len(encoded), dtype=np.int64)
+        count_segmented_rle_ticks(buf, bounds, char_to_code, wait_code, tick_counts)
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.maximum(tick_counts, 0))
+        codes = np.empty(offsets[-1], dtype=np.int32)
+        fill_segmented_rle_codes(buf, bounds, char_to_code, wait_code, tick_counts, offsets, codes)
+
+        codes_by_agent = []
+        for row_idx, path_str in enumerate(path_strs):
+            if tick_counts[row_idx] < 0:
+                codes_by_agent.append(
+                    PlanConfig2024.decode_segmented_rle_codes(
+                        path_str, f"{path_field}[{first_ag_id + row_idx}]", char_to_code, wait_code
+                    )
+                )
+            else:
+                codes_by_agent.append(codes[offsets[row_idx]:offsets[row_idx + 1]])
+        return codes_by_agent
 
-        legacy_paths = data[path_field]
-        if not isinstance(legacy_paths, list):
-            raise ValueError(f"{path_field} must be a list.")
-        if len(legacy_paths) < team_size:
-            raise ValueError(f"{path_field} must contain at least {team_size} entries.")
 
+    @staticmethod
+    def decode_agent_paths(path_strs:Iterable, path_field:str, first_ag_id:int, is_tick:bool,
+                           char_to_code: np.ndarray, wait_code: int) -> List[np.ndarray]:
+        """Decode consecutive path strings, starting from agent first_ag_id, into motion codes."""
         codes_by_agent = []
-        for ag_id in range(team_size):
-            path_str = legacy_paths[ag_id]
+        rle_batch = []
+        rle_batch_start = first_ag_id
+        for ag_id, path_str in enumerate(path_strs, start=first_ag_id):
             if not isinstance(path_str, str):
                 raise ValueError(f"{path_field}[{ag_id}] must be a string.")
 
-            if self.time_unit == "tick":
-                codes_by_agent.append(
-                    self.decode_segmented_rle_codes(
-                        path_str, f"{path_field}[{ag_id}]", char_to_code, wait_code
-                    )
-                )
+            if is_tick:
+                rle_batch.append(path_str)
+                if len(rle_batch) >= SEGMENTED_RLE_BATCH_SIZE:
+                    codes_by_agent.extend(PlanConfig2024.decode_segmented_rle_batch(
+                        rle_batch, path_field, rle_batch_start, char_to_code, wait_code
+                    ))
+                    rle_batch = []
+                    rle_batch_start = ag_id + 1
             else:
                 action_str = "".join(part.strip() for part in path_str.split(",") if part.strip())
                 if action_str:
@@ -1073,9 +1168,78 @@ class PlanConfig2024:
                     codes_by_agent.append(char_to_code[action_bytes])
                 else:
                     codes_by_agent.append(np.empty(0, dtype=np.int32))
+        if rle_batch:
+            codes_by_agent.extend(PlanConfig2024.decode_segmented_rle_batch(
+                rle_batch, path_field, rle_batch_start, char_to_code, wait_code
+            ))
         return codes_by_agent
 
 
+    def check_path_field(self, data:Dict, path_field:str, team_size:int) -> None:
+        if path_field not in data:
+            raise KeyError(f"Missing {path_field}.")
+
+        legacy_paths = data[path_field]
+        if not isinstance(legacy_paths, (list, LazyJsonArray)):
+            raise ValueError(f"{path_field} must be a list.")
+        if len(legacy_paths) < team_size:
+            raise ValueError(f"{path_field} must contain at least {team_size} entries.")
+
+
+    def extract_agent_codes(self, data:Dict, path_field:str, team_size:int,
+                            char_to_code: np.ndarray, wait_code: int):
+        """Extract per-agent motion code arrays from actualPaths/plannerPaths.
+        Supports:
+        - segmented-rle-v1 string chunks in the path field (tick mode), and
+        - legacy comma-separated motions.
+        """
+        self.check_path_field(data, path_field, team_size)
+        return self.decode_agent_paths(
+            islice(data[path_field], team_size), path_field, 0, self.time_unit == "tick",
+            char_to_code, wait_code
+        )
+
+
+    def extract_agent_codes_parallel(self, data:Dict, path_fields:List[str], team_size:int,
+                                     char_to_code: np.ndarray, wait_code: int):
+        """Decode path fields with a pool of self.jobs worker processes.
+        Each worker reads a contiguous shard of agents straight from the plan file and writes the
+        codes into its own shared memory block; the returned arrays are views into these blocks.
+        """
+        shards = []
+        shard_size = max(1, math.ceil(team_size / self.jobs))
+        for path_field in path_fields:
+            self.check_path_field(data, path_field, team_size)
+            spans = list(islice(data[path_field].reader.iter_element_spans(data[path_field].start),
+                                team_size))
+            for first_ag_id in range(0, team_size, shard_size):
+                shards.append((path_field, first_ag_id, spans[first_ag_id:first_ag_id + shard_size]))
+
+        if os.name == "posix":  # Share one tracker so that blocks unlinked here are not reported
+            resource_tracker.ensure_running()
+        codes_by_field = {path_field: [] for path_field in path_fields}
+        # Spawn rather than fork: the numba threading layer is not fork-safe
+        with ProcessPoolExecutor(max_workers=self.jobs,
+                                 mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [
+                executor.submit(decode_path_shard, self.plan_file, path_field, spans, first_ag_id,
+                                self.time_unit == "tick", char_to_code, wait_code)
+                for path_field, first_ag_id, spans in shards
+            ]
+            for (path_field, _, spans), future in zip(shards, futures):
+                shm_name = future.result()
+                shm = shared_memory.SharedMemory(name=shm_name)
+                shm.unlink()  # The mapping stays valid while self.shared_code_blocks holds it
+                self.shared_code_blocks.append(shm)
+                offsets = np.ndarray((len(spans) + 1,), dtype=np.int64, buffer=shm.buf)
+                codes = np.ndarray((int(offsets[-1]),), dtype=np.int32, buffer=shm.buf,
+                                   offset=offsets.nbytes)
+                codes_by_field[path_field].extend(
+                    codes[offsets[row_idx]:offsets[row_idx + 1]] for row_idx in range(len(spans))
+                )
+        return [codes_by_field[path_field] for path_field in path_fields]
+
+
     def get_motion_config(self):
         is_mapf = (self.agent_model == "MAPF")
         motion_map = MOTION_CODE_MAPF if is_mapf else MOTION_CODE
@@ -1083,38 +1247,6 @@ class PlanConfig2024:
         return is_mapf, motion_map, wait_code
 
 
-    def build_motion_batch(self, code_store: Dict[int, np.ndarray], agent_ids: List[int],
-                           start_indices: List[int], step_counts: List[int], wait_code: int):
-        max_steps = max(step_counts, default=0)
-        motion_batch = np.full((len(agent_ids), max_steps), wait_code, dtype=np.int32)
-        for row_idx, ag_id in enumerate(agent_ids):
-            cur_count = step_counts[row_idx]
-            if cur_count <= 0:
-                continue
-            start_idx = start_indices[row_idx]
-            motion_batch[row_idx, :cur_count] = code_store[ag_id][start_idx:start_idx + cur_count]
-        return motion_batch
-
-
-    def build_plan_base_state_batch(self, agent_ids: List[int], start_timesteps: List[int],
-                                    step_counts: List[int]) -> np.ndarray:
-        max_steps = max(step_counts, default=0)
-        base_states = np.zeros((len(agent_ids), max_steps, 3), dtype=np.float64)
-        for row_idx, ag_id in enumerate(agent_ids):
-            cur_count = step_counts[row_idx]
-            if cur_count <= 0:
-                continue
-            exec_path = self.exec_paths[ag_id]
-            start_idx = max(start_timesteps[row_idx] - self.start_tstep, 0)
-            end_idx = min(start_idx + cur_count, len(exec_path))
-            copied_count = max(0, end_idx - start_idx)
-            if copied_count > 0:
-                base_states[row_idx, :copied_count] = exec_path[start_idx:end_idx]
-            if copied_count < cur_count:
-                base_states[row_idx, copied_count:cur_count] = exec_path[-1]
-        return base_states
-
-
     def load_map(self, map_file:str) -> None:
         print("Loading map from " + map_file, end = '... ')
 
@@ -1220,225 +1352,488 @@ class PlanConfig2024:
         self.initial_focus_bbox = (min_row, max_row, min_col, max_col)
 
 
+    def get_path_cache_key(self, plan_file:str) -> Dict:
+        """The plan file and the options the cached blocks depend on, e.g., the map size, which
+        decides the state dtype. actionModel is the first field of a plan, so it is read at once.
+        """
+        return {
+            "file": get_file_identity(plan_file),
+            "version": self.version,
+            "map_size": [self.height, self.width],
+            "agent_model": read_plan_header(plan_file, ["actionModel"]).get("actionModel"),
+            "team_size": repr(self.team_size),
+            "start": repr(self.start_tstep),
+            "end": repr(self.end_tstep),
+            "window": repr(self.window_size),
+            "keyframe_interval": self.keyframe_interval,
+        }
+
+
+    def read_plan_cache(self) -> Dict | None:
+        """The fields of the plan other than the paths if the cache matches, without opening the
+        plan file. The cached paths are then loaded by load_paths.
+        """
+        try:
+            blocks = read_cache(self.path_cache_file, self.path_cache_key, self.path_cache_hash)
+            if blocks is None:
+                return None
+            data = json.loads(blocks["fields"].tobytes().decode("UTF-8"))
+        except (OSError, ValueError, KeyError) as err:
+            print(f"Ignoring unreadable cache {self.path_cache_file} ({err})", end="... ")
+            return None
+        self.path_cache_blocks = blocks
+        return data
+
+
+    def load_path_cache(self) -> bool:
+        blocks, self.path_cache_blocks = self.path_cache_blocks, None
+        if blocks is None:
+            return False
+
+        for ag_id in range(self.team_size):
+            start = blocks["start_states"][ag_id]
+            self.start_loc[ag_id] = (int(start[0]), int(start[1]), int(start[2]))
+        self.actual_path_codes = CodeStore(blocks["actual_codes"], blocks["actual_code_offsets"])
+        self.plan_path_codes = CodeStore(blocks["planner_codes"], blocks["planner_code_offsets"])
+        self.keyframe_store = PathStore.from_ragged(blocks["keyframes"],
+                                                    blocks["keyframe_offsets"])
+        # Read-only memmaps: the stores switch to writable buffers on their first extension
+        self.exec_store = PathStore.from_ragged(blocks["exec_states"], blocks["exec_state_offsets"],
+                                                blocks["exec_tails"])
+        self.plan_store = PathStore.from_ragged(blocks["plan_states"], blocks["plan_state_offsets"])
+        self.set_path_limits(self.exec_store, self.plan_store,
+                             np.arange(self.team_size, dtype=np.int64), self.start_tstep)
+        self.path_end_tstep = self.get_window_end(self.start_tstep)
+        self.refresh_path_views(range(self.team_size))
+        self.makespan = int(blocks["makespan"][0])
+        return True
+
+
+    def save_path_cache(self, data:Dict) -> None:
+        if self.path_cache_key is None:
+            return
+        fields = {name: value for (name, value) in data.items() if name not in PATH_FIELDS}
+        blocks = {}
+        blocks["fields"] = np.frombuffer(json.dumps(fields).encode("UTF-8"), dtype=np.uint8)
+        blocks["start_states"] = np.asarray(
+            [self.start_loc[ag_id] for ag_id in range(self.team_size)], dtype=np.int32
+        ).reshape(-1, 3)
+        blocks["actual_codes"] = self.actual_path_codes.flat
+        blocks["actual_code_offsets"] = self.actual_path_codes.offsets
+        blocks["planner_codes"] = self.plan_path_codes.flat
+        blocks["planner_code_offsets"] = self.plan_path_codes.offsets
+        blocks["keyframes"], blocks["keyframe_offsets"] = self.keyframe_store.to_ragged()
+        blocks["exec_states"], blocks["exec_state_offsets"] = self.exec_store.to_ragged()
+        blocks["exec_tails"] = self.exec_store.tails
+        blocks["plan_states"], blocks["plan_state_offsets"] = self.plan_store.to_ragged()
+        blocks["makespan"] = np.asarray([self.makespan], dtype=np.int64)
+        try:
+            write_cache(self.path_cache_file, self.path_cache_key, blocks, self.path_cache_hash)
+        except OSError as err:
+            print(f"Unable to write cache {self.path_cache_file} ({err})", end="... ")
+
+
+    def release_shared_code_blocks(self) -> None:
+        for shm in self.shared_code_blocks:
+            shm.close()
+        self.shared_code_blocks = []
+
+
+    def refresh_path_views(self, agent_ids:Iterable[int]) -> None:
+        """Re-slice exec_paths, plan_paths and the agent paths from the path stores.
+        Needed after the stores grow, since the views have a fixed length.
+        """
+        self.active_agents.clear()
+        for ag_id in agent_ids:
+            ag_id = int(ag_id)
+            self.exec_paths[ag_id] = self.exec_store.view(ag_id)
+            self.plan_paths[ag_id] = self.plan_store.view(ag_id)
+            if ag_id in self.agents:
+                agent = self.agents[ag_id]
+                using_exec_path = (agent.path is agent.exec_path)
+                using_plan_path = (agent.path is agent.plan_path)
+                agent.exec_path = self.exec_paths[ag_id]
+                agent.plan_path = self.plan_paths[ag_id]
+                if using_exec_path:
+                    agent.path = agent.exec_path
+                elif using_plan_path:
+                    agent.path = agent.plan_path
+
+
+    def extend_exec_paths(self, exec_store:PathStore, agent_ids:np.ndarray,
+                          first_steps:np.ndarray, step_counts:np.ndarray,
+                          skip_counts:np.ndarray, starts:np.ndarray,
+                          background:bool=False) -> bool:
+        """Append executed states to exec_store. Returns True if the store was reallocated."""
+        is_mapf, _, _ = self.get_motion_config()
+        extra_counts = np.zeros(self.team_size, dtype=np.int64)
+        extra_counts[agent_ids] = step_counts + 1 - skip_counts
+        reallocated = exec_store.reserve(extra_counts)
+        kernel = compute_exec_paths_nogil if background else compute_exec_paths
+        kernel(
+            agent_ids, self.actual_path_codes.flat, self.actual_path_codes.offsets,
+            first_steps, step_counts, skip_counts, starts,
+            exec_store.states, exec_store.offsets, exec_store.lengths,
+            exec_store.tails, is_mapf, self.time_unit == "tick", self.ticks_per_timestep
+        )
+        return reallocated
+
+
+    def extend_plan_paths(self, plan_store:PathStore, exec_store:PathStore,
+                          agent_ids:np.ndarray, first_steps:np.ndarray, step_counts:np.ndarray,
+                          write_starts:np.ndarray, starts:np.ndarray,
+                          base_indices:np.ndarray, background:bool=False) -> bool:
+        """Append planned next states to plan_store. Returns True if the store was reallocated."""
+        is_mapf, _, _ = self.get_motion_config()
+        extra_counts = np.zeros(self.team_size, dtype=np.int64)
+        extra_counts[agent_ids] = step_counts + write_starts
+        reallocated = plan_store.reserve(extra_counts)
+        kernel = compute_plan_next_states_nogil if background else compute_plan_next_states
+        kernel(
+            agent_ids, self.plan_path_codes.flat, self.plan_path_codes.offsets,
+            first_steps, step_counts, write_starts, starts,
+            exec_store.states, exec_store.offsets, exec_store.lengths, base_indices,
+            plan_store.states, plan_store.offsets, plan_store.lengths,
+            is_mapf, self.time_unit == "tick", self.ticks_per_timestep
+        )
+        return reallocated
+
+
+    def build_keyframes(self, starts:np.ndarray) -> None:
+        """Keep the executed states every keyframe_interval timesteps, so that any time window
+        can be rebuilt from the nearest keyframe. Only needed when paths are loaded by windows.
+        """
+        if self.window_size is None:
+            self.keyframe_store = PathStore.from_ragged(
+                starts.copy(), np.arange(self.team_size + 1, dtype=np.int64)
+            )
+            return
+
+        is_mapf, _, _ = self.get_motion_config()
+        key_counts = self.actual_path_codes.lengths // self.keyframe_interval + 1
+        key_offsets = np.zeros(self.team_size + 1, dtype=np.int64)
+        key_offsets[1:] = np.cumsum(key_counts)
+        keyframes = np.empty((int(key_offsets[-1]), 3), dtype=np.float64)
+        compute_keyframes(
+            self.actual_path_codes.flat, self.actual_path_codes.offsets, starts,
+            self.keyframe_interval, keyframes, key_offsets,
+            is_mapf, self.time_unit == "tick", self.ticks_per_timestep
+        )
+        self.keyframe_store = PathStore.from_ragged(keyframes, key_offsets)
+
+
+    def compute_path_window(self, agent_ids:Iterable[int], base_tstep:int, window_end:int,
+                            background:bool=False) -> Tuple[PathStore, PathStore]:
+        """Rebuild the executed and planned states of agent_ids for [base_tstep, window_end],
+        starting from the last keyframe before base_tstep. Set background on worker threads.
+        base_tstep and window_end may also be arrays with one timestep per agent.
+
+        Returns:
+            Tuple[PathStore, PathStore]: New exec and plan stores, indexed from base_tstep.
+        """
+        state_dtype = get_state_dtype(self.time_unit == "tick", self.height, self.width)
+        agent_ids = np.asarray(list(agent_ids), dtype=np.int64)
+        exec_store = PathStore(self.team_size, state_dtype)
+        plan_store = PathStore(self.team_size, state_dtype)
+
+        # An agent whose path ends before base_tstep keeps its last state
+        exec_counts = np.minimum(window_end, self.actual_path_codes.lengths[agent_ids])
+        stored_from = np.minimum(base_tstep, exec_counts)
+        self.set_path_limits(exec_store, plan_store, agent_ids, base_tstep)
+        key_ids = stored_from // self.keyframe_interval
+        key_steps = key_ids * self.keyframe_interval
+        self.extend_exec_paths(
+            exec_store, agent_ids, key_steps, exec_counts - key_steps, stored_from - key_steps,
+            self.keyframe_store.states[self.keyframe_store.offsets[agent_ids] + key_ids],
+            background
+        )
+
+        plan_counts = np.maximum(
+            0, np.minimum(window_end, self.plan_path_codes.lengths[agent_ids]) - base_tstep
+        )
+        self.extend_plan_paths(
+            plan_store, exec_store, agent_ids, np.zeros(len(agent_ids), dtype=np.int64) + base_tstep,
+            plan_counts, np.ones(len(agent_ids), dtype=np.int64),
+            exec_store.first_states(agent_ids), np.zeros(len(agent_ids), dtype=np.int64),
+            background
+        )
+        return exec_store, plan_store
+
+
+    def set_path_limits(self, exec_store:PathStore, plan_store:PathStore,
+                        agent_ids:np.ndarray, base_tstep:int) -> None:
+        """Cap the growth of the stores at the number of states the agents can reach from base_tstep."""
+        code_lengths = self.actual_path_codes.lengths[agent_ids]
+        exec_store.limits[agent_ids] = code_lengths - np.minimum(base_tstep, code_lengths) + 1
+        plan_store.limits[agent_ids] = np.maximum(
+            0, self.plan_path_codes.lengths[agent_ids] - base_tstep
+        ) + 1
+
+
+    def get_window_end(self, base_tstep:int) -> int:
+        if self.window_size is not None:
+            return min(base_tstep + self.window_size, self.end_tstep)
+        return self.end_tstep
+
+
     def load_paths(self, data:Dict):
         print("Loading paths", end="... ")
-        is_mapf, motion_map, wait_code = self.get_motion_config()
+        if self.load_path_cache():
+            print("Done! (from cache)")
+            return
+
+        _, motion_map, wait_code = self.get_motion_config()
         char_to_code = np.full(256, wait_code, dtype=np.int32)
         for action, code in motion_map.items():
             char_to_code[ord(action)] = code
-        is_tick = (self.time_unit == "tick")
-        agent_ids = list(range(self.team_size))
 
-        actual_codes_by_agent = self.extract_agent_codes(
-            data, "actualPaths", self.team_size, char_to_code, wait_code
-        )
-        planner_codes_by_agent = self.extract_agent_codes(
-            data, "plannerPaths", self.team_size, char_to_code, wait_code
-        )
-        if self.window_size is not None:
-            current_window_end = min(self.start_tstep + self.window_size, self.end_tstep)
+        if self.jobs > 1 and all(isinstance(data.get(path_field), LazyJsonArray)
+                                 for path_field in PATH_FIELDS):
+            actual_codes_by_agent, planner_codes_by_agent = self.extract_agent_codes_parallel(
+                data, ["actualPaths", "plannerPaths"], self.team_size, char_to_code, wait_code
+            )
         else:
-            current_window_end = self.end_tstep
+            actual_codes_by_agent = self.extract_agent_codes(
+                data, "actualPaths", self.team_size, char_to_code, wait_code
+            )
+            planner_codes_by_agent = self.extract_agent_codes(
+                data, "plannerPaths", self.team_size, char_to_code, wait_code
+            )
+        self.actual_path_codes = CodeStore.from_arrays(actual_codes_by_agent)
+        self.plan_path_codes = CodeStore.from_arrays(planner_codes_by_agent)
+        del actual_codes_by_agent, planner_codes_by_agent  # Drop the views into shared memory
+        self.release_shared_code_blocks()
 
-        start_states = []
-        exec_step_counts = []
         for ag_id in range(self.team_size):
             start = data["start"][ag_id]
-            start_state = (int(start[0]), int(start[1]), DIRECTION[start[2]])
-            self.start_loc[ag_id] = start_state
-            start_states.append(start_state)
-
-            actual_codes = actual_codes_by_agent[ag_id]
-            planner_codes = planner_codes_by_agent[ag_id]
-            self.actual_path_codes[ag_id] = actual_codes
-            self.plan_path_codes[ag_id] = planner_codes
-
-            actual_limit = min(current_window_end, len(actual_codes))
-            if self.makespan < len(actual_codes):
-                self.makespan = len(actual_codes)
-            exec_step_counts.append(actual_limit)
-
-        starts_batch = np.zeros((len(start_states), 3), dtype=np.float64)
-        for row_idx, state in enumerate(start_states):
-            starts_batch[row_idx, 0] = float(state[0])
-            starts_batch[row_idx, 1] = float(state[1])
-            starts_batch[row_idx, 2] = float(state[2])
-        exec_counts_arr = np.asarray(exec_step_counts, dtype=np.int32)
-        exec_motion_batch = self.build_motion_batch(
-            self.actual_path_codes, agent_ids, [0] * self.team_size, exec_step_counts, wait_code
-        )
-        exec_results = np.zeros((self.team_size, max(exec_step_counts, default=0) + 1, 3), dtype=np.float64)
-        compute_exec_paths(
-            exec_motion_batch, starts_batch, exec_results, exec_counts_arr,
-            is_mapf, is_tick, self.ticks_per_timestep
+            self.start_loc[ag_id] = (int(start[0]), int(start[1]), DIRECTION[start[2]])
+        self.makespan = max(self.makespan, int(self.actual_path_codes.lengths.max(initial=-1)))
+
+        starts = np.asarray([self.start_loc[ag_id] for ag_id in range(self.team_size)],
+                            dtype=np.float64).reshape(-1, 3)
+        self.build_keyframes(starts)
+        self.exec_store, self.plan_store = self.compute_path_window(
+            range(self.team_size), self.start_tstep, self.get_window_end(self.start_tstep)
         )
+        self.path_base_tstep = self.start_tstep
+        self.path_end_tstep = self.get_window_end(self.start_tstep)
+        self.refresh_path_views(range(self.team_size))
 
-        for row_idx, ag_id in enumerate(agent_ids):
-            end_idx = exec_step_counts[row_idx] + 1
-            start_idx = min(self.start_tstep, end_idx - 1)
-            exec_path_block = exec_results[row_idx, start_idx:end_idx]
-            if is_tick:
-                self.exec_paths[ag_id] = np.round(exec_path_block, 6)
-            else:
-                self.exec_paths[ag_id] = np.rint(exec_path_block).astype(np.int32)
+        self.save_path_cache(data)
+        print("Done!")
 
-        plan_step_counts = []
-        for ag_id in agent_ids:
-            plan_limit = min(current_window_end, len(self.plan_path_codes[ag_id]))
-            plan_step_counts.append(max(0, plan_limit - self.start_tstep))
+    def rebase_paths(self, base_tstep:int) -> None:
+        """Drop the stored states and rebuild the time window from base_tstep on keyframes."""
+        self.exec_store, self.plan_store = self.compute_path_window(
+            range(self.team_size), base_tstep, self.get_window_end(base_tstep)
+        )
+        self.path_base_tstep = base_tstep
+        self.path_end_tstep = self.get_window_end(base_tstep)
+        self.path_prefetch = None  # Extends the old stores
+        for agent in self.agents.values():  # Path objects are indexed from the old base
+            for path_obj in agent.path_objs:
+                self.canvas.delete(path_obj.obj)
+            self.item_index.discard(path_obj.obj for path_obj in agent.path_objs)
+            agent.path_objs = []
+        self.refresh_path_views(range(self.team_size))
+
+    def trim_paths(self, base_tstep:int) -> None:
+        """Move the stored window forward to base_tstep by dropping the states before it, in place
+        of rebuilding the window on keyframes.
+        """
+        shift = base_tstep - self.path_base_tstep
+        # An agent whose path ends before base_tstep keeps its last state
+        exec_drops = np.maximum(np.minimum(shift, self.exec_store.lengths - 1), 0)
+        plan_drops = np.maximum(np.minimum(shift, self.plan_store.lengths - 1), 0)
+        self.exec_store.drop_front(exec_drops)
+        self.plan_store.drop_front(plan_drops)
+        # As in a rebuilt window, the first planned state is the executed one
+        self.plan_store.reserve(np.zeros(self.team_size, dtype=np.int64))  # Unless read-only
+        planned = np.flatnonzero(self.plan_store.lengths > 0)
+        self.plan_store.states[self.plan_store.offsets[planned]] = \
+            self.exec_store.states[self.exec_store.offsets[planned]]
+        self.set_path_limits(self.exec_store, self.plan_store,
+                             np.arange(self.team_size, dtype=np.int64), base_tstep)
+        self.path_base_tstep = base_tstep
+        for (ag_id, agent) in self.agents.items():  # Path objects are indexed from the base
+            dropped = agent.path_objs[:exec_drops[ag_id]]
+            for path_obj in dropped:
+                self.canvas.delete(path_obj.obj)
+            self.item_index.discard(path_obj.obj for path_obj in dropped)
+            agent.path_objs = agent.path_objs[exec_drops[ag_id]:]
+        self.refresh_path_views(range(self.team_size))
+
+    def prepare_paths(self, timestep:int) -> None:
+        """Make the agent paths cover [timestep, timestep + window_size].
+        Seeking before the stored states, or beyond them, rebuilds the window from the nearest
+        keyframe, so that the cost is bounded by the keyframe interval. Playing forward drops the
+        states it has passed and extends the stored ones, so that the memory is bounded by the
+        window without ever rebuilding it.
+        """
+        if self.window_size is None:
+            return
+        timestep = min(max(timestep, self.start_tstep), self.end_tstep)
+        base_tstep = max(self.start_tstep,
+                         timestep // self.keyframe_interval * self.keyframe_interval)
+        if timestep < self.path_base_tstep or timestep > self.path_end_tstep:
+            self.rebase_paths(base_tstep)
+        elif timestep - self.path_base_tstep >= PATH_REBASE_INTERVALS * self.keyframe_interval:
+            self.trim_paths(base_tstep)
+        target_tstep = self.get_window_end(timestep)
+        if target_tstep > self.path_end_tstep:
+            self.append_prefetched_paths()
+            self.ensure_paths_through(target_tstep)
+        self.prefetch_paths()
+
+    def prefetch_paths(self) -> None:
+        """Compute the next keyframe interval of states beyond the stored ones on a worker thread,
+        ahead of playback. The worker only creates new stores for the extension;
+        append_prefetched_paths appends them on the Tk thread.
+        """
+        if self.path_prefetch is not None or self.path_end_tstep >= self.end_tstep:
+            return
+        if self.path_prefetcher is None:
+            self.path_prefetcher = ThreadPoolExecutor(max_workers=1,
+                                                      thread_name_prefix="path-prefetch")
+        exec_ends, plan_ends = self.get_path_ends()
+        target_tstep = min(self.path_end_tstep + self.keyframe_interval, self.end_tstep)
+        future = self.path_prefetcher.submit(
+            self.compute_path_extension, self.get_path_agents(), exec_ends, plan_ends,
+            self.exec_store.last_states(), target_tstep, True
+        )
+        self.path_prefetch = (exec_ends, plan_ends, target_tstep, future)
 
-        plan_motion_batch = self.build_motion_batch(
-            self.plan_path_codes, agent_ids, [self.start_tstep] * self.team_size, plan_step_counts, wait_code
+    def append_prefetched_paths(self) -> None:
+        """Append the extension of the worker if it is done. Never waits for the worker: until it
+        is done, prepare_paths extends the paths itself, and the states they have gained by then
+        are skipped from the extension.
+        """
+        if self.path_prefetch is None or not self.path_prefetch[3].done():
+            return
+        (exec_ends, plan_ends, target_tstep, future), self.path_prefetch = self.path_prefetch, None
+        self.append_path_extension(*future.result(), exec_ends, plan_ends)
+        self.path_end_tstep = max(self.path_end_tstep, target_tstep)
+
+    def get_plan_states(self, agent_ids:np.ndarray, tsteps:np.ndarray) -> np.ndarray:
+        """Planned states of agent_ids at tsteps, rebuilt on demand outside the stored window.
+        The rebuilds are batched into one window per round, each round taking one timestep of
+        every agent left.
+        """
+        states = np.empty((len(agent_ids), 3), dtype=self.plan_store.dtype)
+        indices = tsteps - self.path_base_tstep
+        # The first state of a rebased window is executed rather than planned
+        stored = (indices >= 0) & (indices < self.plan_store.lengths[agent_ids]) & \
+            ((indices > 0) | (self.path_base_tstep == self.start_tstep))
+        states[stored] = self.plan_store.states[self.plan_store.offsets[agent_ids[stored]] +
+                                                indices[stored]]
+        pending = np.flatnonzero(~stored)
+        while len(pending) > 0:
+            _, firsts = np.unique(agent_ids[pending], return_index=True)
+            rows = pending[firsts]
+            row_agents = agent_ids[rows]
+            base_tsteps = np.maximum(self.start_tstep, tsteps[rows] - 1)
+            _, plan_store = self.compute_path_window(row_agents, base_tsteps, tsteps[rows])
+            states[rows] = plan_store.states[plan_store.offsets[row_agents] + np.minimum(
+                tsteps[rows] - base_tsteps, plan_store.lengths[row_agents] - 1
+            )]
+            pending = np.delete(pending, firsts)
+        return states
+
+    def get_exec_states(self, timestep:int, agent_ids:np.ndarray) -> np.ndarray:
+        """Executed states of agent_ids at timestep, clamped to their stored paths."""
+        store = self.exec_store
+        indices = np.clip(timestep - self.path_base_tstep, 0, store.lengths[agent_ids] - 1)
+        return store.states[store.offsets[agent_ids] + indices]
+
+    def get_active_agents(self, timestep:int) -> np.ndarray:
+        """Ids of the agents whose executed state changes from timestep to timestep+1.
+        Computed with one gather over the exec store and cached until the path views change.
+        """
+        if timestep not in self.active_agents:
+            agent_ids = np.flatnonzero(self.exec_store.lengths > 0)
+            moved = np.any(self.get_exec_states(timestep, agent_ids) !=
+                           self.get_exec_states(timestep + 1, agent_ids), axis=1)
+            self.active_agents[timestep] = agent_ids[moved]
+        return self.active_agents[timestep]
+
+    def get_path_agents(self, agent_ids:Iterable[int]=None) -> np.ndarray:
+        if agent_ids is None:
+            agent_ids = range(self.team_size)
+        return np.asarray([ag_id for ag_id in agent_ids if ag_id in self.actual_path_codes],
+                          dtype=np.int64)
+
+    def get_path_ends(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Timesteps of the last stored exec and plan states of all agents."""
+        return (self.path_base_tstep + self.exec_store.lengths - 1,
+                self.path_base_tstep + self.plan_store.lengths - 1)
+
+    def compute_path_extension(self, agent_ids:np.ndarray, exec_ends:np.ndarray,
+                               plan_ends:np.ndarray, tails:np.ndarray, target_timestep:int,
+                               background:bool=False) -> Tuple[PathStore, PathStore]:
+        """Compute the states of agent_ids after exec_ends and plan_ends through target_timestep,
+        continuing from the unrounded last states in tails. Set background on worker threads.
+
+        Returns:
+            Tuple[PathStore, PathStore]: New exec and plan stores with the extension only. The exec
+            states start with the last stored one, which the planned states are computed from.
+        """
+        state_dtype = get_state_dtype(self.time_unit == "tick", self.height, self.width)
+        exec_ext = PathStore(self.team_size, state_dtype)
+        plan_ext = PathStore(self.team_size, state_dtype)
+        exec_counts = np.maximum(
+            np.minimum(target_timestep, self.actual_path_codes.lengths[agent_ids])
+            - exec_ends[agent_ids], 0
         )
-        plan_start_states = [self.exec_paths[ag_id][0] for ag_id in agent_ids]
-        plan_starts_batch = np.zeros((len(plan_start_states), 3), dtype=np.float64)
-        for row_idx, state in enumerate(plan_start_states):
-            plan_starts_batch[row_idx, 0] = float(state[0])
-            plan_starts_batch[row_idx, 1] = float(state[1])
-            plan_starts_batch[row_idx, 2] = float(state[2])
-        plan_base_states = self.build_plan_base_state_batch(
-            agent_ids, [self.start_tstep] * self.team_size, plan_step_counts
+        plan_counts = np.maximum(
+            np.minimum(target_timestep, self.plan_path_codes.lengths[agent_ids])
+            - plan_ends[agent_ids], 0
         )
-        plan_results = np.zeros((self.team_size, max(plan_step_counts, default=0) + 1, 3), dtype=np.float64)
-        compute_plan_next_states(
-            plan_motion_batch, plan_starts_batch, plan_base_states, plan_results,
-            np.asarray(plan_step_counts, dtype=np.int32),
-            is_mapf, is_tick, self.ticks_per_timestep
+        extended = (exec_counts > 0) | (plan_counts > 0)
+        agent_ids = agent_ids[extended]
+        if len(agent_ids) == 0:
+            return exec_ext, plan_ext
+
+        self.extend_exec_paths(
+            exec_ext, agent_ids, exec_ends[agent_ids], exec_counts[extended],
+            np.zeros(len(agent_ids), dtype=np.int64), tails[agent_ids], background
         )
+        self.extend_plan_paths(
+            plan_ext, exec_ext, agent_ids, plan_ends[agent_ids], plan_counts[extended],
+            np.zeros(len(agent_ids), dtype=np.int64),
+            np.zeros((len(agent_ids), 3), dtype=np.float64),
+            np.maximum(plan_ends[agent_ids] - exec_ends[agent_ids], 0), background
+        )
+        return exec_ext, plan_ext
 
-        for row_idx, ag_id in enumerate(agent_ids):
-            plan_path_block = plan_results[row_idx, :plan_step_counts[row_idx] + 1]
-            if is_tick:
-                self.plan_paths[ag_id] = np.round(plan_path_block, 6)
-            else:
-                self.plan_paths[ag_id] = np.rint(plan_path_block).astype(np.int32)
-
-        print("Done!")
+    def append_path_extension(self, exec_ext:PathStore, plan_ext:PathStore,
+                              exec_ends:np.ndarray, plan_ends:np.ndarray) -> None:
+        """Append an extension computed after exec_ends and plan_ends, skipping the states that
+        the stores have gained since.
+        """
+        cur_exec_ends, cur_plan_ends = self.get_path_ends()
+        exec_skips = np.maximum(cur_exec_ends - exec_ends, 0) + 1
+        plan_skips = np.maximum(cur_plan_ends - plan_ends, 0)
+        extended_ids = np.flatnonzero((exec_ext.lengths > exec_skips) |
+                                      (plan_ext.lengths > plan_skips))
+        if len(extended_ids) == 0:
+            return
+        reallocated = self.exec_store.append(exec_ext, exec_skips)
+        reallocated |= self.plan_store.append(plan_ext, plan_skips)
+        self.refresh_path_views(range(self.team_size) if reallocated else extended_ids)
 
     def ensure_paths_through(self, target_timestep: int, agent_ids: List[int]=None) -> None:
-        if agent_ids is None:
-            agent_ids = list(range(self.team_size))
         target_timestep = min(target_timestep, self.end_tstep)
-        if target_timestep < self.start_tstep:
+        if target_timestep < self.path_base_tstep:
             return
+        if agent_ids is None:
+            self.path_end_tstep = max(self.path_end_tstep, target_timestep)
 
-        is_mapf, _, wait_code = self.get_motion_config()
-        is_tick = (self.time_unit == "tick")
-
-        exec_agent_ids = []
-        exec_start_indices = []
-        exec_step_counts = []
-        exec_start_states = []
-        for ag_id in agent_ids:
-            if ag_id not in self.actual_path_codes:
-                continue
-            current_exec_end = self.start_tstep + len(self.exec_paths[ag_id]) - 1
-            exec_limit = min(target_timestep, len(self.actual_path_codes[ag_id]))
-            step_count = max(0, exec_limit - current_exec_end)
-            if step_count <= 0:
-                continue
-            exec_agent_ids.append(ag_id)
-            exec_start_indices.append(current_exec_end)
-            exec_step_counts.append(step_count)
-            exec_start_states.append(self.exec_paths[ag_id][-1])
-
-        if exec_agent_ids:
-            exec_motion_batch = self.build_motion_batch(
-                self.actual_path_codes, exec_agent_ids, exec_start_indices, exec_step_counts, wait_code
-            )
-            exec_results = np.zeros(
-                (len(exec_agent_ids), max(exec_step_counts, default=0) + 1, 3),
-                dtype=np.float64
-            )
-            exec_starts_batch = np.zeros((len(exec_start_states), 3), dtype=np.float64)
-            for row_idx, state in enumerate(exec_start_states):
-                exec_starts_batch[row_idx, 0] = float(state[0])
-                exec_starts_batch[row_idx, 1] = float(state[1])
-                exec_starts_batch[row_idx, 2] = float(state[2])
-            compute_exec_paths(
-                exec_motion_batch,
-                exec_starts_batch,
-                exec_results,
-                np.asarray(exec_step_counts, dtype=np.int32),
-                is_mapf,
-                is_tick,
-                self.ticks_per_timestep
-            )
-            for row_idx, ag_id in enumerate(exec_agent_ids):
-                exec_path_suffix = exec_results[row_idx, 1:exec_step_counts[row_idx] + 1]
-                if is_tick:
-                    exec_path_suffix = np.round(exec_path_suffix, 6)
-                else:
-                    exec_path_suffix = np.rint(exec_path_suffix).astype(np.int32)
-                self.exec_paths[ag_id] = np.concatenate(
-                    (self.exec_paths[ag_id], exec_path_suffix),
-                    axis=0
-                )
-                if ag_id in self.agents:
-                    agent = self.agents[ag_id]
-                    using_exec_path = (agent.path is agent.exec_path)
-                    agent.exec_path = self.exec_paths[ag_id]
-                    if using_exec_path:
-                        agent.path = agent.exec_path
-
-        plan_agent_ids = []
-        plan_start_indices = []
-        plan_step_counts = []
-        for ag_id in agent_ids:
-            if ag_id not in self.plan_path_codes:
-                continue
-            current_plan_end = self.start_tstep + len(self.plan_paths[ag_id]) - 1
-            plan_limit = min(target_timestep, len(self.plan_path_codes[ag_id]))
-            step_count = max(0, plan_limit - current_plan_end)
-            if step_count <= 0:
-                continue
-            plan_agent_ids.append(ag_id)
-            plan_start_indices.append(current_plan_end)
-            plan_step_counts.append(step_count)
-
-        if plan_agent_ids:
-            plan_motion_batch = self.build_motion_batch(
-                self.plan_path_codes, plan_agent_ids, plan_start_indices, plan_step_counts, wait_code
-            )
-            plan_start_states = [self.plan_paths[ag_id][-1] for ag_id in plan_agent_ids]
-            plan_starts_batch = np.zeros((len(plan_start_states), 3), dtype=np.float64)
-            for row_idx, state in enumerate(plan_start_states):
-                plan_starts_batch[row_idx, 0] = float(state[0])
-                plan_starts_batch[row_idx, 1] = float(state[1])
-                plan_starts_batch[row_idx, 2] = float(state[2])
-            plan_base_states = self.build_plan_base_state_batch(
-                plan_agent_ids, plan_start_indices, plan_step_counts
-            )
-            plan_results = np.zeros(
-                (len(plan_agent_ids), max(plan_step_counts, default=0) + 1, 3),
-                dtype=np.float64
-            )
-            compute_plan_next_states(
-                plan_motion_batch,
-                plan_starts_batch,
-                plan_base_states,
-                plan_results,
-                np.asarray(plan_step_counts, dtype=np.int32),
-                is_mapf,
-                is_tick,
-                self.ticks_per_timestep
-            )
-            for row_idx, ag_id in enumerate(plan_agent_ids):
-                plan_path_suffix = plan_results[row_idx, 1:plan_step_counts[row_idx] + 1]
-                if is_tick:
-                    plan_path_suffix = np.round(plan_path_suffix, 6)
-                else:
-                    plan_path_suffix = np.rint(plan_path_suffix).astype(np.int32)
-                self.plan_paths[ag_id] = np.concatenate(
-                    (self.plan_paths[ag_id], plan_path_suffix),
-                    axis=0
-                )
-                if ag_id in self.agents:
-                    agent = self.agents[ag_id]
-                    using_plan_path = (agent.path is agent.plan_path)
-                    agent.plan_path = self.plan_paths[ag_id]
-                    if using_plan_path:
-                        agent.path = agent.plan_path
+        exec_ends, plan_ends = self.get_path_ends()
+        self.append_path_extension(
+            *self.compute_path_extension(self.get_path_agents(agent_ids), exec_ends, plan_ends,
+                                         self.exec_store.tails, target_timestep),
+            exec_ends, plan_ends
+        )
 
     def load_errors(self, data:Dict):
         print("Loading errors", end="... ")
@@ -1485,9 +1880,60 @@ class PlanConfig2024:
                     self.error_agents_by_timestep[tstep] = set()
                     self.error_agents_by_timestep[tstep].add(agent1)
                     self.error_agents_by_timestep[tstep].add(agent2)
+        self.build_conflict_table()
         print("Done!")
 
 
+    def build_conflict_table(self) -> None:
+        """ Sort the errors of the shown agents into the rows of the error panel, with their texts
+        formatted once. A row is the id of its error: rows are sorted by time and, within a time,
+        in reverse loading order, so that the panel lists them backward up to the current time.
+        """
+        # (tstep, agent1, agent2, task id, description, error) of the errors in the panel
+        shown:List[Tuple[int, int, int, int, str, List]] = []
+        for tstep in sorted(self.conflicts):
+            if not self.start_tstep <= tstep <= self.end_tstep:
+                continue
+            for err in self.conflicts[tstep]:
+                if len(err) == 5:
+                    task_id, agent1, agent2, _, description = err
+                else:
+                    task_id = -1
+                    agent1, agent2, _, description = err
+                if agent1 > (self.team_size-1) or agent2 > (self.team_size-1):
+                    continue
+                shown.append((tstep, agent1, agent2, task_id, description, err))
+
+        # Look up the planned states of all vertex and edge conflicts at once
+        lookups = [(agent1, tstep if description == "vertex conflict" else tstep-1)
+                   for (tstep, agent1, _, _, description, _) in shown
+                   if description in ("vertex conflict", "edge conflict")]
+        lookups = np.asarray(lookups, dtype=np.int64).reshape(-1, 2)
+        plan_states = iter(self.get_plan_states(lookups[:, 0], lookups[:, 1]))
+
+        rows:List[Tuple[int, int, str, List]] = []  # (tstep, loading order, text, error)
+        for (tstep, agent1, agent2, task_id, description, err) in shown:
+            conf_str = f"{tstep:<6}{agent1:<5}{agent2:<5}"
+            if description == "vertex conflict":
+                plan_state = next(plan_states)
+                conf_str += "v: (" + str(plan_state[0]) + "," + str(plan_state[1]) + ")"
+            elif description == "edge conflict":
+                plan_state = next(plan_states)
+                _loc = "(" + str(plan_state[0]) + "," + str(plan_state[1]) + ")"
+                conf_str += "e: " + _loc + "->" + _loc
+            elif description == "incorrect vector size":
+                conf_str += "Planner timeout"
+            elif "already assigned" in description:
+                conf_str += f"T({task_id}) !-> a1 "
+            else:
+                conf_str += description
+            rows.append((tstep, -len(rows), conf_str, err))
+        rows.sort(key=lambda row: row[:2])
+        self.conflict_tsteps = np.asarray([row[0] for row in rows], dtype=np.int64)
+        self.conflict_texts = [row[2] for row in rows]
+        self.conflict_errors = [row[3] for row in rows]
+
+
     def load_delay_intervals(self, data:Dict):
         print("Loading delay intervals", end="... ")
 
@@ -1584,6 +2030,10 @@ class PlanConfig2024:
                     self.events["assigned"][assign_tstep][global_task_id] = ag_id
                     self.seq_tasks[task_id].tasks[seq_id].events["assigned"]["agent"] = ag_id
                     self.seq_tasks[task_id].tasks[seq_id].events["assigned"]["timestep"] = assign_tstep
+            assignments = np.asarray(self.agent_assigned_task[ag_id], dtype=np.int64).reshape(-1, 2)
+            assignments = assignments[np.lexsort((assignments[:, 1], assignments[:, 0]))]
+            self.agent_assign_tsteps[ag_id] = assignments[:, 0]
+            self.agent_assign_tasks[ag_id] = assignments[:, 1]
         self.event_tracker["aTime"] = list(sorted(self.events["assigned"].keys()))
         self.event_tracker["aTime"].append(-1)
 
@@ -1605,10 +2055,69 @@ class PlanConfig2024:
             self.finished_agents_by_timestep[finish_tstep].add(ag_id)
             self.seq_tasks[task_id].tasks[seq_id].events["finished"]["agent"] = ag_id
             self.seq_tasks[task_id].tasks[seq_id].events["finished"]["timestep"] = finish_tstep
+        self.task_finish_tsteps = {
+            task_id: np.asarray([task.events["finished"]["timestep"] for task in seq_task.tasks],
+                                dtype=np.float64)
+            for (task_id, seq_task) in self.seq_tasks.items()
+        }
         self.event_tracker["fTime"] = list(sorted(self.events["finished"].keys()))
         self.event_tracker["fTime"].append(-1)
 
 
+    def get_current_task(self, ag_id:int, tstep:int) -> int:
+        """The last task assigned to an agent up to tstep, or -1 if none."""
+        assign_tsteps = self.agent_assign_tsteps.get(ag_id)
+        if assign_tsteps is None:
+            return -1
+        idx = bisect_right(assign_tsteps, tstep)
+        return int(self.agent_assign_tasks[ag_id][idx-1]) if idx > 0 else -1
+
+
+    def get_first_errand(self, task_id:int, tstep:int) -> Tuple[int, float]:
+        """The first errand of a task that is not finished at tstep and its finish time (1e9 if it
+        never finishes), or (-1, -1) if all of them are. The errands of a task finish in order.
+        """
+        finish_tsteps = self.task_finish_tsteps[task_id]
+        seq_id = bisect_right(finish_tsteps, tstep)
+        if seq_id == len(finish_tsteps):
+            return (-1, -1)
+        return (seq_id, min(finish_tsteps[seq_id], 1e9))
+
+
+    def build_errand_index(self) -> None:
+        """Index the first assigned and finished time of every errand.
+        The states of all the errands at any time are then one comparison, see get_errand_states.
+        """
+        self.errand_ids = np.asarray(sorted(self.max_seq_num * task_id + seq_id
+                                            for (task_id, seq_task) in self.seq_tasks.items()
+                                            for seq_id in range(len(seq_task.tasks))),
+                                     dtype=np.int64)
+        self.errand_task_ids, self.errand_seq_ids = np.divmod(self.errand_ids, max(self.max_seq_num, 1))
+        self.errand_assign_tsteps = np.full(len(self.errand_ids), INT_MAX, dtype=np.int64)
+        self.errand_finish_tsteps = np.full(len(self.errand_ids), INT_MAX, dtype=np.int64)
+        for (event_type, tsteps) in (("assigned", self.errand_assign_tsteps),
+                                     ("finished", self.errand_finish_tsteps)):
+            for (tstep, events) in self.events[event_type].items():
+                global_task_ids = np.fromiter(events.keys(), dtype=np.int64, count=len(events))
+                np.minimum.at(tsteps, np.searchsorted(self.errand_ids, global_task_ids), tstep)
+
+
+    def get_errand_row(self, task_id:int, seq_id:int) -> int:
+        """Row of an errand in errand_ids and the arrays indexed alike"""
+        return int(np.searchsorted(self.errand_ids, self.max_seq_num * task_id + seq_id))
+
+
+    def get_errand_states(self, assign_tstep:int, finish_tstep:int=None) -> np.ndarray:
+        """State codes (see ERRAND_STATES) of all the errands in errand_ids, counting the
+        assignments up to assign_tstep and the finishes up to finish_tstep (default: the same).
+        """
+        if finish_tstep is None:
+            finish_tstep = assign_tstep
+        states = (self.errand_assign_tsteps <= assign_tstep).astype(np.int8)
+        states[self.errand_finish_tsteps <= finish_tstep] = ERRAND_STATES.index("finished")
+        return states
+
+
     def load_sequential_tasks(self, data:Dict):
         print("Loading tasks", end="...")
         self.grid2task = {}
@@ -1643,9 +2152,8 @@ class PlanConfig2024:
         tobj = self.render_obj(
             tid, tloc, "rectangle", TASK_COLORS["unassigned"], tk.DISABLED, 0, str(tid)
         )
+        self.index_static_obj(tobj, 0)
         task.task_obj = tobj
-        if self.grids:
-            self.canvas.tag_lower(tobj.obj, self.grids[0])
         self.canvas.itemconfig(tobj.text, state=tk.HIDDEN)
         self.rendered_tasks.add((task_id, seq_id))
         if tobj.obj not in self.grid2task:
@@ -1654,10 +2162,23 @@ class PlanConfig2024:
 
 
     def load_plan(self, plan_file):
-        data = {}
-        with open(file=plan_file, mode="r", encoding="UTF-8") as fin:
-            data = json.load(fin)
-
+        if self.use_cache:
+            self.path_cache_key = self.get_path_cache_key(plan_file)
+            self.path_cache_file = get_cache_file(plan_file, self.path_cache_key)
+            if self.verify_cache:
+                self.path_cache_hash = compute_file_hash(plan_file)
+            data = self.read_plan_cache()
+            if data is not None:
+                self.load_plan_data(data)
+                return
+
+        # Path arrays are decoded per agent while loading, the rest of the fields eagerly
+        with PlanFileReader(plan_file) as reader:
+            data = reader.read_fields(lazy_fields=PATH_FIELDS)
+            self.load_plan_data(data)
+
+
+    def load_plan_data(self, data:Dict):
         if self.time_unit == "tick":
             self.ticks_per_timestep = self.get_ticks_per_timestep(data)
             self.delay = max((self.delay / self.ticks_per_timestep) * 2.0, 0.001)
@@ -1687,6 +2208,8 @@ class PlanConfig2024:
         self.load_sequential_tasks(data)
         self.load_schedule(data)
         self.load_events(data)
+        self.build_errand_index()
+        self.event_log = EventLog(self.events, self.seq_tasks, self.max_seq_num)
 
 
     def render_obj(self, idx:int, loc:Tuple[int], shape:str="rectangle",
@@ -1740,69 +2263,134 @@ class PlanConfig2024:
 
     def render_env(self) -> None:
         print("Rendering the environment ... ", end="")
-        # Render grids
-        for rid in range(self.height):  # Render horizontal lines
-            _line_ = self.canvas.create_line(0,
-                                             rid * self.tile_size,
-                                             self.width * self.tile_size,
-                                             rid * self.tile_size,
-                                             tags="grid",
-                                             state= tk.NORMAL,
-                                             fill="grey")
-            self.grids.append(_line_)
-        for cid in range(self.width):  # Render vertical lines
-            _line_ = self.canvas.create_line(cid * self.tile_size,
-                                             0,
-                                             cid * self.tile_size,
-                                             self.height * self.tile_size,
-                                             tags="grid",
-                                             state= tk.NORMAL,
-                                             fill="grey")
-            self.grids.append(_line_)
+        self.obstacle_mask = np.asarray(self.env_map, dtype=np.int8).reshape(self.height,
+                                                                             self.width) == 0
+        self.env_image_obj = self.canvas.create_image(0, 0, anchor="nw", tags="env",
+                                                      state=tk.DISABLED)
+        self.render_env_view((0, 0, self.viewport_width_px, self.viewport_height_px))
+        print("Done!")
 
-        # Render features
-        for rid, cur_row in enumerate(self.env_map):
-            for cid, cur_ele in enumerate(cur_row):
-                if cur_ele == 0:  # obstacles
-                    self.canvas.create_rectangle(cid * self.tile_size,
-                                                 rid * self.tile_size,
-                                                 (cid+1) * self.tile_size,
-                                                 (rid+1) * self.tile_size,
-                                                 state=tk.DISABLED,
-                                                 outline="",
-                                                 fill="black")
 
-        if self.show_coord_labels:
-            for cid in range(self.width):
-                self.canvas.create_text((cid+0.5) * self.tile_size,
-                                        (self.height+0.5) * self.tile_size,
-                                        text=str(cid),
-                                        fill="black",
-                                        tag="text",
-                                        state=tk.DISABLED,
-                                        font=("Arial", int(self.tile_size // 2)))
-            for rid in range(self.height):
-                self.canvas.create_text((self.width+0.5) * self.tile_size,
-                                        (rid+0.5) * self.tile_size,
-                                        text=str(rid),
-                                        fill="black",
-                                        tag="text",
-                                        state=tk.DISABLED,
-                                        font=("Arial", int(self.tile_size // 2)))
-
-        self.canvas.create_line(self.width * self.tile_size,
-                                0,
-                                self.width * self.tile_size,
-                                self.height * self.tile_size,
-                                state=tk.DISABLED,
-                                fill="black")
-        self.canvas.create_line(0,
-                                self.height * self.tile_size,
-                                self.width * self.tile_size,
-                                self.height * self.tile_size,
-                                state=tk.DISABLED,
-                                fill="black")
-        print("Done!")
+    def render_env_view(self, bbox:Tuple[float, float, float, float]) -> None:
+        """Show the environment around the visible world bbox (left, top, right, bottom) as one
+        image item. The image covers ENV_VIEW_MARGIN_PX more on each side, so it is only
+        re-rasterized when the view leaves it, the tile size changes, or the grid is toggled.
+        """
+        left, top, right, bottom = bbox
+        view_key = (self.tile_size, self.show_env_grid)
+        if self.env_view_key == view_key and self.env_view_bbox is not None and \
+            not self.env_view_scaled:
+            img_left, img_top, img_right, img_bottom = self.env_view_bbox
+            if img_left <= left and img_top <= top and right <= img_right and bottom <= img_bottom:
+                return
+
+        self.update_world_view_metrics()
+        img_left = max(0, int(left) - ENV_VIEW_MARGIN_PX)
+        img_top = max(0, int(top) - ENV_VIEW_MARGIN_PX)
+        img_right = min(self.world_width_px, int(math.ceil(right)) + ENV_VIEW_MARGIN_PX)
+        img_bottom = min(self.world_height_px, int(math.ceil(bottom)) + ENV_VIEW_MARGIN_PX)
+        if img_right <= img_left or img_bottom <= img_top:
+            return
+
+        self.env_view_image = self.build_env_view_image(img_left, img_top, img_right, img_bottom)
+        self.env_photo = ImageTk.PhotoImage(self.env_view_image)
+        self.canvas.itemconfig(self.env_image_obj, image=self.env_photo)
+        self.canvas.coords(self.env_image_obj, img_left, img_top)
+        self.canvas.tag_lower(self.env_image_obj)
+        self.env_view_bbox = (img_left, img_top, img_right, img_bottom)
+        self.env_view_key = view_key
+        self.env_view_scaled = False
+
+
+    def scale_env_view(self, bbox:Tuple[float, float, float, float]) -> None:
+        """Stretch the last drawing of the environment to the current tile size around the visible
+        world bbox, with a nearest-neighbour resize. This keeps the map in step with the agents
+        while zooming, until render_env_view draws it again.
+        """
+        if self.env_view_image is None:
+            return
+        scale = self.tile_size / self.env_view_key[0]
+        img_left, img_top, img_right, img_bottom = self.env_view_bbox
+        left = max(img_left, int(bbox[0] / scale))
+        top = max(img_top, int(bbox[1] / scale))
+        right = min(img_right, int(math.ceil(bbox[2] / scale)))
+        bottom = min(img_bottom, int(math.ceil(bbox[3] / scale)))
+        self.env_view_scaled = True
+        if right <= left or bottom <= top:
+            self.canvas.itemconfig(self.env_image_obj, image="")
+            return
+
+        image = self.env_view_image.crop(
+            (left - img_left, top - img_top, right - img_left, bottom - img_top)
+        ).resize((max(1, round((right - left) * scale)), max(1, round((bottom - top) * scale))),
+                 Image.Resampling.NEAREST)
+        self.env_photo = ImageTk.PhotoImage(image)
+        self.canvas.itemconfig(self.env_image_obj, image=self.env_photo)
+        self.canvas.coords(self.env_image_obj, left * scale, top * scale)
+
+
+    def build_env_view_image(self, left:int, top:int, right:int, bottom:int) -> Image.Image:
+        """Rasterize the grid lines, obstacles, borders and coordinate labels that cover the world
+        pixels [left, right) x [top, bottom) at the current tile size.
+        """
+        xs = np.arange(left, right, dtype=np.float64)
+        ys = np.arange(top, bottom, dtype=np.float64)
+        cols = np.floor(xs / self.tile_size).astype(np.int64)
+        rows = np.floor(ys / self.tile_size).astype(np.int64)
+        # The first pixel of each cell is where its grid line is drawn
+        col_starts = cols != np.floor((xs - 1) / self.tile_size)
+        row_starts = rows != np.floor((ys - 1) / self.tile_size)
+        in_cols = (cols >= 0) & (cols < self.width)
+        in_rows = (rows >= 0) & (rows < self.height)
+
+        # Palette indices: 0 empty, 1 grid line, 2 obstacle or border
+        pixels = np.zeros((len(ys), len(xs)), dtype=np.uint8)
+        map_rows = np.flatnonzero(in_rows)
+        map_cols = np.flatnonzero(in_cols)
+        if len(map_rows) > 0 and len(map_cols) > 0:
+            # rows and cols are sorted, so the map part is one block of the image
+            row_slice = slice(map_rows[0], map_rows[-1] + 1)
+            col_slice = slice(map_cols[0], map_cols[-1] + 1)
+            cells = self.obstacle_mask[rows[map_rows[0]]:rows[map_rows[-1]] + 1,
+                                       cols[map_cols[0]]:cols[map_cols[-1]] + 1]
+            pixels[row_slice, col_slice] = np.where(cells, 2, 0).astype(np.uint8)[
+                rows[row_slice] - rows[map_rows[0]]
+            ][:, cols[col_slice] - cols[map_cols[0]]]
+            if self.show_env_grid:  # Obstacles are drawn over the grid lines
+                line_cols = np.flatnonzero(in_cols & col_starts)
+                line_rows = np.flatnonzero(in_rows & row_starts)
+                pixels[row_slice, line_cols] = np.maximum(pixels[row_slice, line_cols], 1)
+                pixels[line_rows, col_slice] = np.maximum(pixels[line_rows, col_slice], 1)
+            pixels[row_slice, (cols == self.width) & col_starts] = 2
+            pixels[(rows == self.height) & row_starts, col_slice] = 2
+        image = Image.fromarray(pixels, "P")
+        image.putpalette((255, 255, 255) + GRID_COLOR + (0, 0, 0))
+        image = image.convert("RGB")
+
+        label_size = int(self.tile_size // 2)
+        if self.show_coord_labels and label_size > 0:
+            draw = ImageDraw.Draw(image)
+            label_font = get_label_font(label_size)
+            label_y = (self.height + 0.5) * self.tile_size - top
+            if 0 <= label_y < bottom - top:
+                for cid in np.unique(cols[in_cols]).tolist():
+                    draw.text(((cid + 0.5) * self.tile_size - left, label_y), str(cid),
+                              fill="black", font=label_font, anchor="mm")
+            label_x = (self.width + 0.5) * self.tile_size - left
+            if 0 <= label_x < right - left:
+                for rid in np.unique(rows[in_rows]).tolist():
+                    draw.text((label_x, (rid + 0.5) * self.tile_size - top), str(rid),
+                              fill="black", font=label_font, anchor="mm")
+        return image
+
+
+    def index_static_obj(self, obj:BaseObj, offset:float, with_text:bool=True) -> None:
+        """Record an object from render_obj that never moves, so that zooming can re-place it."""
+        loc = obj.loc
+        self.item_index.add(obj.obj, (loc[1]+offset, loc[0]+offset, loc[1]+1-offset, loc[0]+1-offset),
+                            self.tile_size)
+        if with_text:
+            self.item_index.add(obj.text, (loc[1]+0.5, loc[0]+0.5), self.tile_size)
 
 
     def render_agents(self):
@@ -1812,6 +2400,7 @@ class PlanConfig2024:
 
         for ag_id in range(self.team_size):
             start = self.render_obj(ag_id, self.start_loc[ag_id], "oval", "grey", tk.DISABLED)
+            self.index_static_obj(start, 0.05)
             start_objs.append(start)
 
         if self.team_size != len(self.exec_paths):
@@ -1850,8 +2439,10 @@ class PlanConfig2024:
             if _pid_ > 0 and p_loc == (self.exec_paths[ag_id][_pid_-1][0],
                                        self.exec_paths[ag_id][_pid_-1][1]):
                 p_obj = self.render_obj(ag_id, p_loc, "rectangle", "purple", tk.DISABLED, 0.25)
+                self.index_static_obj(p_obj, 0.25, False)
             else:  # non-wait action, smaller rectangle
                 p_obj = self.render_obj(ag_id, p_loc, "rectangle", "purple", tk.DISABLED, 0.4)
+                self.index_static_obj(p_obj, 0.4, False)
             if p_obj is not None:
                 self.canvas.tag_lower(p_obj.obj)
                 self.canvas.itemconfigure(p_obj.obj, state=tk.HIDDEN)
@@ -1859,3 +2450,32 @@ class PlanConfig2024:
                 ag_path.append(p_obj)
 
         self.agents[ag_id].path_objs = ag_path
+
+
+def decode_path_shard(plan_file:str, path_field:str, spans:List[Tuple[int, int]], first_ag_id:int,
+                      is_tick:bool, char_to_code:np.ndarray, wait_code:int) -> str:
+    """Worker of PlanConfig2024.extract_agent_codes_parallel.
+
+    Decode the path strings at the given byte spans of the plan file and write them into a new
+    shared memory block laid out as [int64 offsets (len(spans)+1)][int32 codes].
+
+    Returns:
+        str: The name of the shared memory block, which the caller attaches to and unlinks.
+    """
+    with PlanFileReader(plan_file) as reader:
+        codes_by_agent = PlanConfig2024.decode_agent_paths(
+            (reader.decode_value(start, end) for start, end in spans),
+            path_field, first_ag_id, is_tick, char_to_code, wait_code
+        )
+
+    offsets = np.zeros(len(codes_by_agent) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(codes) for codes in codes_by_agent])
+    shm = shared_memory.SharedMemory(create=True,
+                                     size=max(1, offsets.nbytes + int(offsets[-1]) * 4))
+    np.ndarray(offsets.shape, dtype=np.int64, buffer=shm.buf)[:] = offsets
+    flat = np.ndarray((int(offsets[-1]),), dtype=np.int32, buffer=shm.buf, offset=offsets.nbytes)
+    for row_idx, codes in enumerate(codes_by_agent):
+        flat[offsets[row_idx]:offsets[row_idx + 1]] = codes
+    del flat
+    shm.close()
+    return shm.name
@@ -0,0 +1,203 @@
+# -*- coding: UTF-8 -*-
+""" Incremental reader for plan files
+This script contains a streaming JSON reader for PlanViz, so that the header fields of a large plan
+file can be read without materializing the path arrays.
+All rights reserved.
+"""
+
+import os
+import re
+import json
+import mmap
+from typing import Dict, Iterable, Iterator, Tuple
+
+PATH_FIELDS: Tuple[str, str] = ("actualPaths", "plannerPaths")
+
+STRUCTURAL_PATTERN = re.compile(rb'["\[\]{}]')
+SCALAR_END_PATTERN = re.compile(rb"[,\]}\s]")
+WHITESPACE = frozenset(b" \t\r\n")
+
+
+class LazyJsonArray:
+    """A top-level JSON array that is decoded one element at a time on iteration.
+    """
+    def __init__(self, reader, field:str, start:int, end:int):
+        self.reader = reader
+        self.field = field
+        self.start = start
+        self.end = end
+        self._length = None
+
+    def __len__(self) -> int:
+        if self._length is None:
+            self._length = sum(1 for _ in self.reader.iter_element_spans(self.start))
+        return self._length
+
+    def __iter__(self) -> Iterator:
+        for elem_start, elem_end in self.reader.iter_element_spans(self.start):
+            yield self.reader.decode_value(elem_start, elem_end)
+
+
+class PlanFileReader:
+    """ Scan a plan file through a read-only memory map.
+
+    Top-level fields are located by skipping over their raw bytes, so that only the requested fields
+    are decoded into Python objects. Lazy fields are returned as LazyJsonArray and decoded per element.
+    """
+    def __init__(self, plan_file:str):
+        self.plan_file = plan_file
+        self.fin = open(file=plan_file, mode="rb")
+        if os.fstat(self.fin.fileno()).st_size > 0:
+            self.buf = mmap.mmap(self.fin.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.buf = b""
+        self.size = len(self.buf)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if isinstance(self.buf, mmap.mmap):
+            self.buf.close()
+        self.fin.close()
+
+    def error(self, pos:int, reason:str) -> ValueError:
+        return ValueError(f"Invalid plan file {self.plan_file} at byte {pos}: {reason}.")
+
+    def skip_whitespace(self, pos:int) -> int:
+        while pos < self.size and self.buf[pos] in WHITESPACE:
+            pos += 1
+        return pos
+
+    def expect(self, pos:int, char:bytes) -> int:
+        pos = self.skip_whitespace(pos)
+        if pos >= self.size or self.buf[pos] != char[0]:
+            raise self.error(pos, f"expected '{char.decode()}'")
+        return pos + 1
+
+    def string_end(self, pos:int) -> int:
+        """Return the index after the closing quote of the string starting at pos."""
+        cursor = pos + 1
+        while True:
+            cursor = self.buf.find(b'"', cursor)
+            if cursor < 0:
+                raise self.error(pos, "unterminated string")
+            backslashes = 0
+            while self.buf[cursor - 1 - backslashes] == 0x5C:  # '\\'
+                backslashes += 1
+            cursor += 1
+            if backslashes % 2 == 0:
+                return cursor
+
+    def value_end(self, pos:int) -> int:
+        """Return the index after the JSON value starting at pos without decoding it."""
+        if pos >= self.size:
+            raise self.error(pos, "unexpected end of file")
+        head = self.buf[pos]
+        if head == 0x22:  # '"'
+            return self.string_end(pos)
+        if head not in (0x5B, 0x7B):  # scalar: number, true, false, null
+            match = SCALAR_END_PATTERN.search(self.buf, pos)
+            return self.size if match is None else match.start()
+
+        depth = 0
+        cursor = pos
+        while True:
+            match = STRUCTURAL_PATTERN.search(self.buf, cursor)
+            if match is None:
+                raise self.error(pos, "unterminated array or object")
+            token = self.buf[match.start()]
+            if token == 0x22:
+                cursor = self.string_end(match.start())
+                continue
+            cursor = match.end()
+            if token in (0x5B, 0x7B):
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return cursor
+
+    def decode_value(self, start:int, end:int):
+        raw = self.buf[start:end]
+        if raw[:1] == b'"' and b"\\" not in raw:  # Fast path for plain path strings
+            return raw[1:-1].decode("UTF-8")
+        return json.loads(raw)
+
+    def iter_members(self) -> Iterator[Tuple[str, int, int]]:
+        """Yield (key, value_start, value_end) for each top-level field."""
+        pos = self.expect(0, b"{")
+        pos = self.skip_whitespace(pos)
+        if pos < self.size and self.buf[pos] == 0x7D:  # '}'
+            return
+        while True:
+            key_start = self.skip_whitespace(pos)
+            if key_start >= self.size or self.buf[key_start] != 0x22:
+                raise self.error(key_start, "expected a field name")
+            key_end = self.string_end(key_start)
+            key = self.decode_value(key_start, key_end)
+            value_start = self.skip_whitespace(self.expect(key_end, b":"))
+            value_end = self.value_end(value_start)
+            yield key, value_start, value_end
+
+            pos = self.skip_whitespace(value_end)
+            if pos < self.size and self.buf[pos] == 0x2C:  # ','
+                pos += 1
+                continue
+            self.expect(pos, b"}")
+            return
+
+    def iter_element_spans(self, start:int) -> Iterator[Tuple[int, int]]:
+        """Yield (element_start, element_end) for each element of the array starting at start."""
+        pos = self.expect(start, b"[")
+        pos = self.skip_whitespace(pos)
+        if pos < self.size and self.buf[pos] == 0x5D:  # ']'
+            return
+        while True:
+            elem_start = self.skip_whitespace(pos)
+            elem_end = self.value_end(elem_start)
+            yield elem_start, elem_end
+
+            pos = self.skip_whitespace(elem_end)
+            if pos < self.size and self.buf[pos] == 0x2C:
+                pos += 1
+                continue
+            self.expect(pos, b"]")
+            return
+
+    def read_fields(self, lazy_fields:Iterable[str]=(),
+                    wanted_fields:Iterable[str]=None) -> Dict:
+        """Read top-level fields of the plan file.
+
+        Args:
+            lazy_fields (Iterable[str], optional): Array fields returned as LazyJsonArray.
+            wanted_fields (Iterable[str], optional): Only decode these fields, and stop scanning
+                once all of them are found. Defaults to None (all fields).
+
+        Returns:
+            Dict: The decoded fields.
+        """
+        lazy_fields = set(lazy_fields)
+        wanted = None if wanted_fields is None else set(wanted_fields)
+        data = {}
+        for key, value_start, value_end in self.iter_members():
+            if wanted is not None and key not in wanted:
+                continue
+            if key in lazy_fields:
+                if self.buf[value_start] != 0x5B:
+                    raise self.error(value_start, f"{key} must be a list")
+                data[key] = LazyJsonArray(self, key, value_start, value_end)
+            else:
+                data[key] = self.decode_value(value_start, value_end)
+            if wanted is not None and wanted.issubset(data.keys()):
+                break
+        return data
+
+
+def read_plan_header(plan_file:str, fields:Iterable[str]) -> Dict:
+    """Read only the given top-level fields of a plan file."""
+    with PlanFileReader(plan_file) as reader:
+        return reader.read_fields(wanted_fields=fields)
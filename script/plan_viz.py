@@ -7,15 +7,32 @@ All rights reserved.
 import math
 import re
 from bisect import bisect_right
-from typing import List, Tuple, Dict, Set, Optional
+from functools import lru_cache
+from typing import Iterable, List, Tuple, Dict, Set, Optional
 import tkinter as tk
 from tkinter import ttk,font
 import time
 import platform
-from PIL import Image, ImageTk
-from util import (AGENT_COLORS, AgentStatus, DIR_OFFSET, TASK_COLORS, TEXT_SIZE, get_angle,
-                  get_dir_loc, get_rotation)
+import numpy as np
+from PIL import Image, ImageColor, ImageTk
+from util import (AGENT_COLORS, AgentStatus, DIR_OFFSET, ERRAND_STATES, TASK_COLORS, TEXT_SIZE,
+                  get_angle, get_dir_loc, get_rotation)
 from plan_config import PlanConfig2023, PlanConfig2024
+from event_log import EVENT_HEADER, EventListView
+from virtual_list import VirtualListbox
+
+
+@lru_cache(maxsize=None)
+def get_rgb(color:str) -> Tuple[int, int, int]:
+    return ImageColor.getrgb(color)[:3]
+
+
+@lru_cache(maxsize=None)
+def get_sprite_offsets(size:int) -> Tuple[np.ndarray, np.ndarray]:
+    """Row and column offsets of the pixels of a filled circle with a diameter of size pixels."""
+    center = np.arange(size) + 0.5 - size / 2
+    inside = center[:, None] ** 2 + center[None, :] ** 2 <= (size / 2) ** 2 + 0.25
+    return np.nonzero(inside)
 
 
 class PlanViz2023:
@@ -1001,6 +1018,21 @@ class PlanViz2024:
     AGENT_START_OBJ_TAG = "agent_start_obj"
     AGENT_TEXT_TAG = "agent_text"
     AGENT_START_TEXT_TAG = "agent_start_text"
+    AGENT_CULLED_TAG = "agent_culled"
+    TASK_ARROW_TAG = "task_arrow"
+    TASK_SHOWN_TAG = "task_shown"  # Boxes of the visible tasks
+    TASK_SHOWN_TEXT_TAG = "task_shown_text"  # Indices of the visible tasks
+    TASK_CHANGED_TAG = "task_changed"  # Boxes changing visibility, see set_errands_visibility
+    CULL_MARGIN = 2  # Tiles around the viewport in which agents are still drawn
+    ZOOM_SETTLE_MS = 150  # Wheel idle time before the fonts and the map are redrawn
+    PLAYBACK_FPS = 60  # Most frames per second of the step animation
+    AGENT_LAYER_TAG = "agent_layer"
+    # Levels of detail of the agents, switched by the tile size
+    LOD_FULL = 2  # Ovals, indices and direction markers
+    LOD_SHAPES = 1  # Ovals only, below LOD_LABEL_MIN_TILE
+    LOD_PIXELS = 0  # Sprites in a single image item, below LOD_SHAPE_MIN_TILE or with agent_layer
+    LOD_LABEL_MIN_TILE = 10
+    LOD_SHAPE_MIN_TILE = 4
 
     def __init__(self, plan_config, _grid, _ag_idx, _task_idx, _static, _conf_ag):
         print("===== Initialize PlanViz2    =====")
@@ -1088,23 +1120,28 @@ class PlanViz2024:
         self.time_label.config(text=f"Time: {int(timeline_value):03d}")
 
 
-    def agent_has_selected_conflict(self, ag_idx:int) -> bool:
+    def get_selected_conflict_agents(self) -> Set[int]:
+        selected_agents = set()
         for conf in self.shown_conflicts.values():
-            if not conf[1]:
-                continue
-            if len(conf[0]) == 5:
-                _, agent1, agent2, _, _ = conf[0]
+            if len(conf) == 5:
+                _, agent1, agent2, _, _ = conf
             else:
-                agent1, agent2, _, _ = conf[0]
-            if ag_idx == agent1 or ag_idx == agent2:
-                return True
-        return False
+                agent1, agent2, _, _ = conf
+            selected_agents.update((agent1, agent2))
+        return selected_agents
 
 
-    def update_agent_colors(self) -> None:
+    def update_agent_colors(self, agent_ids:Iterable[int]=None) -> None:
+        """ Recolor the given agents, by default all the agents that are not culled.
+        """
+        redraw_layer = agent_ids is None
+        if agent_ids is None:
+            agent_ids = [ag_idx for ag_idx in self.pcf.agents if ag_idx not in self.culled_agents]
         current_error_agents = self.pcf.error_agents_by_timestep.get(self.pcf.cur_tstep, set())
-        for ag_idx, agent in self.pcf.agents.items():
-            shown_color = AGENT_COLORS[self.pcf.get_agent_status(ag_idx, self.pcf.cur_tstep).color_key]
+        selected_conflict_agents = self.get_selected_conflict_agents()
+        for ag_idx in agent_ids:
+            agent = self.pcf.agents[ag_idx]
+            color_key = self.pcf.get_agent_status(ag_idx, self.pcf.cur_tstep).color_key
             outline_color = ""
             outline_width = 1
 
@@ -1112,21 +1149,43 @@ class PlanViz2024:
                 outline_color = AGENT_COLORS["collide"]
                 outline_width = 2
             if self.show_all_conf_ag.get() and ag_idx in current_error_agents:
-                shown_color = AGENT_COLORS["collide"]
-            elif self.agent_has_selected_conflict(ag_idx):
-                shown_color = AGENT_COLORS["collide"]
+                color_key = "collide"
+            elif ag_idx in selected_conflict_agents:
+                color_key = "collide"
+            shown_color = AGENT_COLORS[color_key]
+            self.agent_color_idx[ag_idx] = self.agent_color_keys[color_key]
+            agent.agent_obj.color = shown_color
+            if self.agent_lod == self.LOD_PIXELS:
+                continue  # Only the agent layer shows the color
 
             self.pcf.canvas.itemconfig(agent.agent_obj.obj, fill=shown_color)
             self.pcf.canvas.itemconfig(agent.agent_obj.obj,
                                        outline=outline_color,
                                        width=outline_width)
-            agent.agent_obj.color = shown_color
+        if redraw_layer:
+            self.render_agent_layer()
 
 
     def init_pcf(self, plan_config):
         # Load the yaml file or the input arguments
         self.pcf:PlanConfig2024 = plan_config
         self._init_agent_canvas_tags()
+        self.culled_agents:Set[int] = set()  # Agents hidden outside the viewport
+        self.agents_in_motion = False
+        self.zoom_settle_job = None
+        self.agent_lod = self.LOD_FULL
+        self.agent_layer_obj = None
+        self.agent_layer_photo = None
+        self.step_anim:Optional[Dict] = None  # The step being animated, see start_step_animation
+        self.step_job = None
+        self.next_step_time:Optional[float] = None  # Playback start time of the next step
+        # Status colors of the agent layer: RGBA per AGENT_COLORS key, and the key index per agent
+        self.agent_color_keys:Dict[str, int] = {key: idx for idx, key in enumerate(AGENT_COLORS)}
+        self.agent_color_lut = np.asarray([(*get_rgb(color), 255) for color in AGENT_COLORS.values()],
+                                          dtype=np.uint8)
+        self.agent_color_idx = np.zeros(max(self.pcf.agents, default=-1) + 1, dtype=np.uint8)
+        # Whether the box of each errand is visible, by errand row (see build_errand_index)
+        self.task_visible = np.zeros(len(self.pcf.errand_ids), dtype=bool)
         
         if platform.system() == "Darwin":
             self.pcf.canvas.event_add("<<RightClick>>", "<Button-2>")
@@ -1338,6 +1397,15 @@ class PlanViz2024:
         self.update_button.grid(row=self.row_idx, column=2, sticky="w")
         self.row_idx += 1
 
+        # ---------- Set the playback speed ------------------------ #
+        speed_label = tk.Label(self.frame, text="Speed (/s)", font=("Arial",TEXT_SIZE))
+        speed_label.grid(row=self.row_idx, column=0, columnspan=1, sticky="w")
+        self.playback_speed = tk.DoubleVar(value=self.pcf.playback_speed)
+        self.speed_entry = tk.Entry(self.frame, width=5, textvariable=self.playback_speed,
+                                    font=("Arial",TEXT_SIZE))
+        self.speed_entry.grid(row=self.row_idx, column=1, sticky="w")
+        self.row_idx += 1
+
         self.init_color_legend()
 
         # ---------- Show the list of errors ----------------------- #
@@ -1345,7 +1413,8 @@ class PlanViz2024:
         err_label.grid(row=self.row_idx, column=0, columnspan=3, sticky="w")
         self.row_idx += 1
 
-        self.shown_conflicts:Dict[str, List[List,bool]] = {}
+        self.shown_conflicts:Dict[int, List] = {}  # Conflict id -> error, of the selected rows
+        self.conflict_range:Tuple[int, int] = (0, 0)  # Listed conflict ids, listed backward
         self.conflict_listbox = tk.Listbox(self.frame,
                                            width=35,
                                            height=9,
@@ -1357,8 +1426,9 @@ class PlanViz2024:
         self.conflict_listbox.bind("<Double-1>", self.move_to_conflict)
 
         scrollbar = tk.Scrollbar(self.frame, orient="vertical", width=20)
-        self.conflict_listbox.config(yscrollcommand = scrollbar.set)
-        scrollbar.config(command=self.conflict_listbox.yview)
+        self.conflict_vlist = VirtualListbox(self.conflict_listbox, scrollbar,
+                                             (f"{'Time':<6}{'a1':<5}{'a2':<5}{'Event':<12}", "-" * 34),
+                                             font=self.listbox_monospace_font)
         scrollbar.grid(row=self.row_idx, column=3, sticky="ns")
         self.row_idx += 1
 
@@ -1367,7 +1437,8 @@ class PlanViz2024:
         event_label.grid(row=self.row_idx, column=0, columnspan=3, sticky="w")
         self.row_idx += 1
 
-        self.shown_events:Dict[str, Tuple[int,int,int,int,str]] = {}
+        self.virtual_lists:Dict[str, VirtualListbox] = {}  # Listbox path -> virtual list
+        self.event_list_views:Dict[str, EventListView] = {}  # Listbox path -> view
         self.event_listbox = tk.Listbox(self.frame,
                                         width=35,
                                         height=9,
@@ -1379,8 +1450,7 @@ class PlanViz2024:
         self.event_listbox.bind("<Double-1>", self.move_to_event)
 
         scrollbar = tk.Scrollbar(self.frame, orient="vertical", width=20)
-        self.event_listbox.config(yscrollcommand = scrollbar.set)
-        scrollbar.config(command=self.event_listbox.yview)
+        self.add_event_vlist(self.event_listbox, scrollbar)
         scrollbar.grid(row=self.row_idx, column=3, sticky="ns")
         self.row_idx += 1
 
@@ -1458,11 +1528,11 @@ class PlanViz2024:
         if self.pcf.use_viewport_mode:
             self.pcf.window.update_idletasks()
             self.center_view_on_initial_focus()
-            self.update_minimap_viewport()
+            self.on_view_changed()
 
 
     def on_canvas_configure(self, _):
-        self.update_minimap_viewport()
+        self.on_view_changed()
 
 
     def sync_viewport_with_panel_width(self) -> None:
@@ -1505,6 +1575,191 @@ class PlanViz2024:
                                    self.pcf.minimap_offset_y_px + bottom * self.pcf.minimap_scale)
 
 
+    def on_view_changed(self) -> None:
+        self.pcf.update_world_view_metrics()
+        self.update_minimap_viewport()
+        self.place_static_items_in_view()
+        self.pcf.render_env_view(self.get_visible_world_bbox())
+        self.update_agent_culling()
+        self.render_agent_layer()
+
+
+    def get_culled_agents(self) -> Set[int]:
+        """ Agents farther than CULL_MARGIN tiles outside the visible area in viewport mode.
+        """
+        if not self.pcf.use_viewport_mode or not self.pcf.agents:
+            return set()
+
+        self.pcf.update_world_view_metrics()
+        left, top, right, bottom = self.get_visible_world_bbox()
+        ag_ids = np.fromiter(self.pcf.agents.keys(), dtype=np.int64, count=len(self.pcf.agents))
+        states = self.pcf.get_exec_states(self.pcf.cur_tstep, ag_ids)
+        rows = states[:, 0].astype(np.float64) * self.pcf.tile_size
+        cols = states[:, 1].astype(np.float64) * self.pcf.tile_size
+        margin = (self.CULL_MARGIN + 1) * self.pcf.tile_size
+        outside = (cols + margin < left) | (cols - margin > right) | \
+            (rows + margin < top) | (rows - margin > bottom)
+        return set(ag_ids[outside].tolist())
+
+
+    def get_agent_canvas_items(self, agent) -> List[int]:
+        items = [agent.agent_obj.obj, agent.agent_obj.text]
+        if agent.dir_obj:
+            items.append(agent.dir_obj)
+        return items
+
+
+    def snap_agent_canvas_items(self, agent) -> None:
+        """ Place the canvas items of an agent at its current location.
+        """
+        loc = agent.agent_obj.loc
+        tile_size = self.pcf.tile_size
+        self.pcf.canvas.coords(agent.agent_obj.obj,
+                               (loc[1]+0.05) * tile_size, (loc[0]+0.05) * tile_size,
+                               (loc[1]+0.95) * tile_size, (loc[0]+0.95) * tile_size)
+        self.pcf.canvas.coords(agent.agent_obj.text,
+                               (loc[1]+0.5) * tile_size, (loc[0]+0.5) * tile_size)
+        if agent.dir_obj:
+            dir_loc = get_dir_loc(loc)
+            self.pcf.canvas.coords(agent.dir_obj, *[val * tile_size for val in dir_loc])
+
+
+    def update_agent_culling(self) -> None:
+        """ Hide the agents that left the viewport and show the ones that entered it.
+        Culled agents are neither moved nor recolored, so the entering ones are snapped to their
+        current location and recolored here. Only the agents that change sides are touched.
+        """
+        if self.agents_in_motion:
+            return  # Updated once the current step is done
+
+        culled = self.get_culled_agents()
+        entered = self.culled_agents - culled
+        exited = culled - self.culled_agents
+        self.culled_agents = culled
+
+        for ag_idx in exited:
+            for item in self.get_agent_canvas_items(self.pcf.agents[ag_idx]):
+                self.pcf.canvas.addtag_withtag(self.AGENT_CULLED_TAG, item)
+        if exited:
+            self.pcf.canvas.itemconfig(self.AGENT_CULLED_TAG, state=tk.HIDDEN)
+
+        obj_state, text_state, dir_state = self.get_agent_item_states()
+        for ag_idx in entered:
+            agent = self.pcf.agents[ag_idx]
+            self.snap_agent_canvas_items(agent)
+            for item in self.get_agent_canvas_items(agent):
+                self.pcf.canvas.dtag(item, self.AGENT_CULLED_TAG)
+            self.pcf.canvas.itemconfig(agent.agent_obj.obj, state=obj_state)
+            self.pcf.canvas.itemconfig(agent.agent_obj.text, state=text_state)
+            if agent.dir_obj:
+                self.pcf.canvas.itemconfig(agent.dir_obj, state=dir_state)
+        if entered:
+            self.update_agent_colors(entered)
+
+
+    def get_agent_lod(self) -> int:
+        if self.pcf.use_agent_layer or self.pcf.tile_size < self.LOD_SHAPE_MIN_TILE:
+            return self.LOD_PIXELS
+        if self.pcf.tile_size < self.LOD_LABEL_MIN_TILE:
+            return self.LOD_SHAPES
+        return self.LOD_FULL
+
+
+    def get_agent_item_states(self) -> Tuple[str, str, str]:
+        """ States of the agent ovals, indices and direction markers at the current level of detail.
+        """
+        obj_state = tk.HIDDEN if self.agent_lod == self.LOD_PIXELS else tk.NORMAL
+        text_state = tk.DISABLED if (self.show_ag_idx.get() is True and
+                                     self.agent_lod == self.LOD_FULL) else tk.HIDDEN
+        dir_state = tk.DISABLED if self.agent_lod == self.LOD_FULL else tk.HIDDEN
+        return obj_state, text_state, dir_state
+
+
+    def apply_agent_lod(self, force:bool=False) -> None:
+        """ Switch the agent items to the level of detail of the current tile size.
+        The agent items are not moved at LOD_PIXELS, so they are snapped back when leaving it.
+        """
+        lod = self.get_agent_lod()
+        if lod == self.agent_lod and not force:
+            return
+        prev_lod, self.agent_lod = self.agent_lod, lod
+        if prev_lod == self.LOD_PIXELS and lod != self.LOD_PIXELS:
+            for (ag_idx, agent) in self.pcf.agents.items():
+                if ag_idx not in self.culled_agents:
+                    self.snap_agent_canvas_items(agent)
+            self.update_agent_colors()
+
+        obj_state, text_state, dir_state = self.get_agent_item_states()
+        self.pcf.canvas.itemconfig(self.AGENT_OBJ_TAG, state=obj_state)
+        self.pcf.canvas.itemconfig(self.AGENT_TEXT_TAG, state=text_state)
+        self.pcf.canvas.itemconfig(self.AGENT_DIR_TAG, state=dir_state)
+        self.pcf.canvas.itemconfig(self.AGENT_CULLED_TAG, state=tk.HIDDEN)
+
+
+    def render_agent_layer(self, tstep:float=None) -> None:
+        """ Rasterize the agents in view into a single image item at LOD_PIXELS.
+
+        Each agent is stamped as a circle sprite in the layer color of its status, so the cost
+        depends on the number of pixels rather than the number of canvas items. A fractional
+        tstep interpolates the agents between two timesteps, e.g., during the animation.
+        """
+        if self.agent_lod != self.LOD_PIXELS or not self.pcf.agents:
+            if self.agent_layer_obj is not None:
+                self.pcf.canvas.itemconfig(self.agent_layer_obj, state=tk.HIDDEN)
+            return
+
+        left, top, right, bottom = self.get_visible_world_bbox()
+        left, top = max(0, int(left)), max(0, int(top))
+        right = min(int(self.pcf.width * self.pcf.tile_size), int(math.ceil(right)))
+        bottom = min(int(self.pcf.height * self.pcf.tile_size), int(math.ceil(bottom)))
+        if right <= left or bottom <= top:
+            return
+
+        if tstep is None:
+            tstep = self.pcf.cur_tstep
+        base_tstep = math.floor(tstep)
+        ag_ids = np.fromiter(self.pcf.agents.keys(), dtype=np.int64, count=len(self.pcf.agents))
+        states = self.pcf.get_exec_states(base_tstep, ag_ids).astype(np.float64)
+        if tstep > base_tstep:
+            states += (self.pcf.get_exec_states(base_tstep + 1, ag_ids) - states) * \
+                (tstep - base_tstep)
+
+        tile_size = self.pcf.tile_size
+        if tile_size < self.LOD_SHAPE_MIN_TILE:
+            sprite_size = max(1, int(tile_size))
+        else:  # Same size as the agent ovals
+            sprite_size = max(1, int(tile_size * 0.9))
+        sprite_rows, sprite_cols = get_sprite_offsets(sprite_size)
+        offset = (tile_size - sprite_size) / 2
+        rows = np.floor(states[:, 0] * tile_size + offset - top).astype(np.int64)
+        cols = np.floor(states[:, 1] * tile_size + offset - left).astype(np.int64)
+        colors = self.agent_color_lut[self.agent_color_idx[ag_ids]]
+
+        pixels = np.zeros((bottom - top, right - left, 4), dtype=np.uint8)
+        in_view = (rows + sprite_size > 0) & (rows < bottom - top) & \
+            (cols + sprite_size > 0) & (cols < right - left)
+        rows, cols, colors = rows[in_view], cols[in_view], colors[in_view]
+        chunk = max(1, (1 << 20) // len(sprite_rows))  # Bound the (agents, sprite pixels) arrays
+        for start in range(0, len(rows), chunk):
+            pix_rows = rows[start:start+chunk, None] + sprite_rows[None, :]
+            pix_cols = cols[start:start+chunk, None] + sprite_cols[None, :]
+            inside = (pix_rows >= 0) & (pix_rows < bottom - top) & \
+                (pix_cols >= 0) & (pix_cols < right - left)
+            pix_colors = np.broadcast_to(colors[start:start+chunk, None, :],
+                                         (*pix_rows.shape, 4))
+            pixels[pix_rows[inside], pix_cols[inside]] = pix_colors[inside]
+
+        self.agent_layer_photo = ImageTk.PhotoImage(Image.fromarray(pixels, "RGBA"))
+        if self.agent_layer_obj is None:
+            self.agent_layer_obj = self.pcf.canvas.create_image(
+                left, top, anchor="nw", tags=self.AGENT_LAYER_TAG, state=tk.DISABLED
+            )
+        self.pcf.canvas.itemconfig(self.agent_layer_obj, image=self.agent_layer_photo,
+                                   state=tk.DISABLED)
+        self.pcf.canvas.coords(self.agent_layer_obj, left, top)
+        self.pcf.canvas.tag_raise(self.agent_layer_obj)
+
+
     def center_view_on_world(self, center_x:float, center_y:float):
         if not self.pcf.use_viewport_mode:
             return
@@ -1522,7 +1777,7 @@ class PlanViz2024:
 
         self.pcf.canvas.xview_moveto(left / self.pcf.world_width_px)
         self.pcf.canvas.yview_moveto(top / self.pcf.world_height_px)
-        self.update_minimap_viewport()
+        self.on_view_changed()
 
 
     def center_view_on_initial_focus(self):
@@ -1699,92 +1954,63 @@ class PlanViz2024:
                 continue
             self.event_count_value_labels[event_type].config(text=str(count_value))
 
-    def set_error_listbox_height(self, error_count: int) -> None:
-        min_rows = 2
-        max_visible_errors = 15
-        max_rows = max(min_rows, max_visible_errors + 2)
-        total_rows = max(min_rows, min(error_count + 2, max_rows))
-        self.conflict_listbox.config(height=total_rows)
-
     def update_error_list(self, error_listbox):
         if error_listbox == None:
             return
-        end_tstep = self.pcf.cur_tstep
-        conf_id = 0
-        shown_conflict_count = 0
-        error_listbox.delete(0, tk.END)
-        selected_conflicts = {
-            conf_str for conf_str, conf in self.shown_conflicts.items() if conf[1]
-        }
-        self.shown_conflicts = {}
-        error_listbox.config(font=self.listbox_monospace_font)
-        header = f"{'Time':<6}{'a1':<5}{'a2':<5}{'Event':<12}"
-        error_listbox.insert(conf_id, header)
-        conf_id += 1
-        error_listbox.insert(conf_id, "-" * 34)  # Separator line
-        conf_id += 1
-        if self.pcf.event_limit == 0:
-            self.set_error_listbox_height(0)
-            return
-        # [task_id, robot1, robot2, timestep, description]
-        for tstep in sorted(
-            (cur_tstep for cur_tstep in self.pcf.conflicts.keys() if cur_tstep <= end_tstep),
-            reverse=True
-        ):
-            if tstep < self.pcf.start_tstep:
-                continue
-            if tstep > self.pcf.end_tstep:
-                break
+        # Conflict ids are the rows of the time-sorted conflict table (see build_conflict_table)
+        end = int(np.searchsorted(self.pcf.conflict_tsteps, self.pcf.cur_tstep, side="right"))
+        start = 0 if self.pcf.event_limit is None else max(0, end - self.pcf.event_limit)
+        self.conflict_range = (start, end)
+        self.shown_conflicts = {conf_id: conf for (conf_id, conf) in self.shown_conflicts.items()
+                                if start <= conf_id < end}
+        self.conflict_vlist.set_rows(
+            end - start,
+            lambda pos: self.pcf.conflict_texts[self.get_conflict_id(pos)],
+            lambda pos: "yellow" if self.pcf.conflict_tsteps[self.get_conflict_id(pos)] \
+                == self.pcf.cur_tstep else "",
+            lambda pos: self.get_conflict_id(pos) in self.shown_conflicts)
+
+
+    def get_conflict_id(self, pos:int) -> int:
+        """Id of the conflict listed at pos of the error panel"""
+        return self.conflict_range[1] - 1 - pos
+
+
+    def add_event_vlist(self, event_listbox, scrollbar) -> VirtualListbox:
+        vlist = VirtualListbox(event_listbox, scrollbar, (EVENT_HEADER, "-" * 34),
+                               font=self.listbox_monospace_font)
+        self.virtual_lists[str(event_listbox)] = vlist
+        return vlist
+
+
+    def get_event_list_view(self, event_listbox, key:Tuple) -> EventListView:
+        """ The view of event_listbox over the event log rows selected by key, which is
+        ("all",), ("agent", agent id) or (event type, task ids...)
+        """
+        view = self.event_list_views.get(str(event_listbox))
+        if view is None or view.vlist.listbox is not event_listbox or view.key != key:
+            event_log = self.pcf.event_log
+            if key[0] == "all":
+                rows = np.arange(len(event_log))
+            elif key[0] == "agent":
+                rows = event_log.get_agent_rows(key[1])
+            elif key[0] == "finished":
+                rows = event_log.get_task_rows(key[1:], ("errand_finished", "task_finished"))
+            else:
+                rows = event_log.get_task_rows(key[1:], (key[0],))
+            view = EventListView(self.virtual_lists[str(event_listbox)], event_log, rows, key)
+            self.event_list_views[str(event_listbox)] = view
+        return view
 
-            for conf in self.pcf.conflicts[tstep]:
-                if len(conf) == 5:
-                    task_id, agent1, agent2, tstep_std, description = conf
-                if len(conf) == 4:
-                    agent1, agent2, tstep_std, description = conf
-                if agent1 > (self.pcf.team_size-1) or agent2 > (self.pcf.team_size-1):
-                    continue
-                assert tstep == tstep_std
-                pid = tstep - self.pcf.start_tstep
-                conf_str = f"{tstep:<6}{agent1:<5}{agent2:<5}"
-                if description == "vertex conflict":
-                    _loc = "("+ str(self.pcf.agents[agent1].plan_path[pid][0]) + "," +\
-                        str(self.pcf.agents[agent1].plan_path[pid][1]) +")"
-                    conf_str += "v: " + _loc
-                elif description == "edge conflict":
-                    _loc1 = "(" + str(self.pcf.agents[agent1].plan_path[pid-1][0]) + "," +\
-                        str(self.pcf.agents[agent1].plan_path[pid-1][1]) + ")"
-                    _loc2 = "(" + str(self.pcf.agents[agent1].plan_path[pid-1][0]) + "," +\
-                        str(self.pcf.agents[agent1].plan_path[pid-1][1]) + ")"
-                    conf_str += "e: " + _loc1 + "->" + _loc2
-                elif description == "incorrect vector size":
-                    conf_str += "Planner timeout"
-                elif "already assigned" in description:
-                    conf_str += f"T({task_id}) !-> a1 "
-                else:
-                    conf_str += description
-                self.conflict_listbox.insert(conf_id, conf_str)
-                if tstep == self.pcf.cur_tstep:
-                    self.conflict_listbox.itemconfigure(conf_id, background='yellow')
-                self.shown_conflicts[conf_str] = [conf, conf_str in selected_conflicts]
-                conf_id += 1
-                shown_conflict_count += 1
-                if shown_conflict_count >= self.pcf.event_limit:
-                    self.set_error_listbox_height(shown_conflict_count)
-                    return
-        self.set_error_listbox_height(shown_conflict_count)
 
-    def set_event_listbox_height(self, event_listbox, event_count: int) -> None:
-        if event_listbox == None or (not event_listbox.winfo_exists()):
-            return
+    def get_listbox_event(self, event_listbox, index:int) -> Optional[Tuple[int,int,int,int,str]]:
+        """(tstep, ag_id, task_id, seq_id, status) of the event at index of event_listbox"""
+        view = self.event_list_views.get(str(event_listbox))
+        if view is None or view.vlist.listbox is not event_listbox:
+            return None
+        return view.get_event(index)
 
-        min_rows = 2
-        max_visible_events = 15
-        max_rows = max(min_rows, max_visible_events + 2)
-        total_rows = max(min_rows, min(event_count + 2, max_rows))
-        event_listbox.config(height=total_rows)
 
-        
-    
     def update_event_list(self, event_listbox, pop):
         if event_listbox == None or (not event_listbox.winfo_exists()):
             return
@@ -1792,118 +2018,26 @@ class PlanViz2024:
         end_tstep = self.pcf.cur_tstep
         is_main_event_list = event_listbox == self.event_listbox
 
-        self.shown_events:Dict[str, Tuple[int,int,int,int,str]] = {}
-        self.eve_id = 0
-        event_listbox.delete(0, tk.END)
-        event_listbox.config(font=self.listbox_monospace_font)
-        header = f"{'Time':<6}{'Agent':<8}{'Event':<12}{'Task ID':<8}"
-        event_listbox.insert(self.eve_id, header)
-        self.eve_id += 1
-        event_listbox.insert(self.eve_id, "-" * 34)  # Separator line
-        self.eve_id += 1
-        shown_event_count = 0
-        time_list = list(self.pcf.events["assigned"])
-        time_list.extend(x for x in self.pcf.events["finished"] if x not in time_list)
-        time_list = sorted((tstep for tstep in time_list if tstep <= end_tstep), reverse=True)
-        if self.pcf.event_limit == 0:
-            self.set_event_listbox_height(event_listbox, 0)
-            self.update_event_count_label(end_tstep, is_main_event_list)
-            return
-        for tstep in time_list:
-            if tstep in self.pcf.events["assigned"]:
-                cur_events= self.pcf.events["assigned"][tstep]
-                for global_task_id in sorted(cur_events.keys(), reverse=False):
-                    task_id = global_task_id // self.pcf.max_seq_num
-                    seq_id = global_task_id % self.pcf.max_seq_num
-                    ag_id = cur_events[global_task_id]
-                    if pop and \
-                       (ag_id != self.right_click_agent): 
-                        continue
-                    if seq_id == 0:
-                        e_str = f"{tstep:<6}{ag_id:<8}{'Assigned':<12}{task_id:<8}"
-                        self.shown_events[e_str] = (tstep, ag_id, task_id, seq_id, "assigned")
-                        event_listbox.insert(self.eve_id, e_str)
-                        if tstep == self.pcf.cur_tstep:
-                            event_listbox.itemconfigure(self.eve_id, background='yellow')
-                            
-                        self.eve_id += 1
-                        shown_event_count += 1
-                        if shown_event_count >= self.pcf.event_limit:
-                            self.set_event_listbox_height(event_listbox, shown_event_count)
-                            self.update_event_count_label(end_tstep, is_main_event_list)
-                            return
-            if tstep in self.pcf.events["finished"]:
-                cur_events = self.pcf.events["finished"][tstep]
-                for global_task_id in sorted(cur_events.keys(), reverse=False):
-                    task_id = global_task_id // self.pcf.max_seq_num
-                    if pop and self.right_click_agent < 0 and not (task_id in self.right_click_all_tasks_idx): continue
-                    seq_id = global_task_id % self.pcf.max_seq_num
-                    ag_id = cur_events[global_task_id]
-                    if pop and (self.right_click_agent > -1 and ag_id != self.right_click_agent): continue
-                    if seq_id == len(self.pcf.seq_tasks[task_id].tasks) - 1:
-                        e_str = f"{tstep:<6}{ag_id:<8}{'T-Finished':<12}{task_id:<8}"
-                        self.shown_events[e_str] = (tstep, ag_id, task_id, seq_id, "task_finished")
-                    else:
-                        e_str = f"{tstep:<6}{ag_id:<8}{'E-Finished':<12}{task_id:<8}"
-                        self.shown_events[e_str] = (tstep, ag_id, task_id, seq_id, "errand_finished")
-                        
-                    event_listbox.insert(self.eve_id, e_str)
-                    if tstep == self.pcf.cur_tstep:
-                            event_listbox.itemconfigure(self.eve_id, background='yellow')
-                    self.eve_id += 1
-                    shown_event_count += 1
-                    if shown_event_count >= self.pcf.event_limit:
-                        self.set_event_listbox_height(event_listbox, shown_event_count)
-                        self.update_event_count_label(end_tstep, is_main_event_list)
-                        return
-        self.set_event_listbox_height(event_listbox, shown_event_count)
+        if not pop:
+            key = ("all",)
+        elif self.right_click_agent > -1:
+            key = ("agent", self.right_click_agent)
+        else:
+            key = ("finished", *sorted(set(self.right_click_all_tasks_idx)))
+        view = self.get_event_list_view(event_listbox, key)
+        view.update(end_tstep, self.pcf.cur_tstep, self.pcf.event_limit)
         self.update_event_count_label(end_tstep, is_main_event_list)
-            
+
 
     def update_location_event_list(self, event_listbox):
         """Update location event list to show task-related events"""
         if event_listbox == None or (not event_listbox.winfo_exists()):
             return
-        
+
         self.max_event_t = max(self.pcf.cur_tstep, self.max_event_t)
-        end_tstep = self.max_event_t
-        
-        # Clear and refill the location event listbox
-        event_listbox.delete(0, tk.END)
-        event_listbox.config(font=self.listbox_monospace_font)
-        
-        # Add header in the same format as update_event_list
-        header = f"{'Time':<6}{'Agent':<8}{'Event':<12}{'Task ID':<8}"
-        event_listbox.insert(0, header)
-        event_listbox.insert(1, "-" * 34)  # Separator line
-        eve_id = 2
-        shown_event_count = 0
-        
-        # Similar to update_event_list, iterate through timesteps and events
-        time_list = list(self.pcf.events["assigned"])
-        time_list.extend(x for x in self.pcf.events["finished"] if x not in time_list)
-        time_list = sorted(time_list, reverse=False)
-        
-        for tstep in range(end_tstep, -1, -1):
-            # Check assignment events
-            if tstep in self.pcf.events["assigned"]:
-                cur_events = self.pcf.events["assigned"][tstep]
-                for global_task_id in sorted(cur_events.keys(), reverse=False):
-                    task_id = global_task_id // self.pcf.max_seq_num
-                    seq_id = global_task_id % self.pcf.max_seq_num
-                    ag_id = cur_events[global_task_id]
-                    
-                    # Check if task is in the selected task list
-                    if (not (task_id in self.right_click_all_tasks_idx)): 
-                        continue
-                    if seq_id == 0:
-                        e_str = f"{tstep:<6}{ag_id:<8}{'Assigned':<12}{task_id:<8}"
-                        event_listbox.insert(eve_id, e_str)
-                        if tstep == self.pcf.cur_tstep:
-                            event_listbox.itemconfigure(eve_id, background='yellow')
-                        eve_id += 1
-                        shown_event_count += 1
-        self.set_event_listbox_height(event_listbox, shown_event_count)
+        key = ("assigned", *sorted(set(self.right_click_all_tasks_idx)))
+        view = self.get_event_list_view(event_listbox, key)
+        view.update(self.max_event_t, self.pcf.cur_tstep)
 
     def change_task_color(self, task_id:int, seq_id:int, color:str) -> None:
         """ Change the color of the task
@@ -1912,8 +2046,7 @@ class PlanViz2024:
             task_id (int): the index in self.pcf.seq_tasks
             color   (str): the color to be changed
         """
-        # Lazy render if not yet rendered
-        self.pcf.lazy_render_task(task_id, seq_id)
+        self.render_task(task_id, seq_id)
 
         # Change the color of the task
         cur_task_obj = self.pcf.seq_tasks[task_id].tasks[seq_id].task_obj.obj
@@ -1922,16 +2055,14 @@ class PlanViz2024:
         # return cur_task_obj
 
     def select_conflict(self, event):
-        selected_indices = event.widget.curselection()  # Get all selected indices
-
-        for conf in self.shown_conflicts.values():  # Reset all the conflicts to non-selected
-            conf[1] = False
-
-        for _sid_ in selected_indices:  # Mark the selected conflicting agents to red
-            conf_str = self.conflict_listbox.get(_sid_)
-            if conf_str not in self.shown_conflicts:
-                continue
-            self.shown_conflicts[conf_str][1] = True
+        # Only the rows in view can change, the others keep their selection
+        selected_positions = set(self.conflict_vlist.get_selected_positions())
+        for pos in self.conflict_vlist.get_shown_positions():  # Mark the selected agents to red
+            conf_id = self.get_conflict_id(pos)
+            if pos in selected_positions:
+                self.shown_conflicts[conf_id] = self.pcf.conflict_errors[conf_id]
+            else:
+                self.shown_conflicts.pop(conf_id, None)
 
         self.update_agent_colors()
 
@@ -1946,15 +2077,6 @@ class PlanViz2024:
                 self.pcf.canvas.itemconfigure(_p_.obj, state=tk.HIDDEN)
         self.pcf.shown_path_agents.clear()
         self.pcf.shown_tasks_seq.clear()
-        
-        self.pcf.event_tracker["aid"] = 0
-        self.pcf.event_tracker["fid"] = 0
-
-        # Hide all the tasks
-        for task_id, seq_task in self.pcf.seq_tasks.items():
-            for seq_id, task in enumerate(seq_task.tasks):
-                task.state = "unassigned"
-                self.hide_single_task(task_id, seq_id)
 
         self.max_event_t = 0
         self.update_curtime()
@@ -1984,13 +2106,16 @@ class PlanViz2024:
         _sid_ = event.widget.curselection()  # get all selected indices
         if len(_sid_) < 1:
             return
-        _sid_ = _sid_[0]
-        conf = self.shown_conflicts[self.conflict_listbox.get(_sid_)]
-        if len(conf[0]) == 5:
-            task_id, agent1, agent2, tstep_std, description = conf[0]
-        if len(conf[0]) == 4:
-            agent1, agent2, tstep_std, description = conf[0]
-        self.shown_conflicts[self.conflict_listbox.get(_sid_)][1] = True
+        pos = self.conflict_vlist.get_pos(_sid_[0])
+        if pos is None:
+            return
+        conf_id = self.get_conflict_id(pos)
+        conf = self.pcf.conflict_errors[conf_id]
+        if len(conf) == 5:
+            task_id, agent1, agent2, tstep_std, description = conf
+        if len(conf) == 4:
+            agent1, agent2, tstep_std, description = conf
+        self.shown_conflicts[conf_id] = conf
         primary_ag_idx = -1
         if 0 <= agent1 < self.pcf.team_size:
             primary_ag_idx = agent1
@@ -2043,16 +2168,13 @@ class PlanViz2024:
                 return
                 
         elif self.right_click_status == "right":
-            eve_str = self.pop_event_listbox.get(selected_idx)
+            event_listbox = self.pop_event_listbox
         else:
-            eve_str = self.event_listbox.get(selected_idx)
+            event_listbox = self.event_listbox
             
-        if "------" in eve_str: 
-            return
-        if eve_str not in self.shown_events:
+        cur_eve = self.get_listbox_event(event_listbox, selected_idx)  #  (tstep, ag_id, task_id, seq_id, status)
+        if cur_eve is None:
             return
-            
-        cur_eve:Tuple[int,int,int,int,str] = self.shown_events[eve_str] #  (tstep, ag_id, task_id, seq_id, status)
         new_t = max(cur_eve[0], 0)  # move to one timestep ahead the event
         self.clear_agent_selection(refresh=False)
         ag_idx = cur_eve[1]
@@ -2080,7 +2202,7 @@ class PlanViz2024:
 
         if self.dragging:
             self.pcf.canvas.scan_dragto(event.x, event.y, gain=1)
-            self.update_minimap_viewport()
+            self.on_view_changed()
 
     def on_button_release(self, event):
         # If you haven't dragged when you release it, and it doesn't trigger a double click, it will be treated as a single click.
@@ -2090,46 +2212,85 @@ class PlanViz2024:
     def __wheel(self, event):
         """ Zoom with mouse wheel
         """
-        scale = 1.0
+        tile_size = self.pcf.tile_size
         # Respond to Linux (event.num) or Windows (event.delta) wheel event
         if event.num == 5 or event.delta < 0:  # scroll down, smaller
             threshold = round(min(self.pcf.width, self.pcf.height) * self.pcf.tile_size)
             if threshold < 30:
                 return  # image is less than 30 pixels
-            scale /= 1.05
-            self.pcf.tile_size /= 1.05
+            tile_size /= 1.05
         if event.num == 4 or event.delta > 0:  # scroll up, bigger
-            scale *= 1.05
-            self.pcf.tile_size *= 1.05
-        self.pcf.canvas.scale("all", 0, 0, scale, scale)  # rescale all objects
-        for child_widget in self.pcf.canvas.find_withtag("text"):
-            self.pcf.canvas.itemconfigure(child_widget,
-                                          font=("Arial", int(self.pcf.tile_size // 2)))
-        for child_widget in self.pcf.canvas.find_withtag("hwy"):
-            self.pcf.canvas.itemconfigure(child_widget,
-                                          font=("Arial", int(self.pcf.tile_size*1.2)))
+            tile_size *= 1.05
+        self.zoom_canvas(tile_size)
+        if self.zoom_settle_job is not None:
+            self.pcf.canvas.after_cancel(self.zoom_settle_job)
+        self.zoom_settle_job = self.pcf.canvas.after(self.ZOOM_SETTLE_MS, self.settle_zoom)
+
+
+    def zoom_canvas(self, tile_size:float) -> None:
+        """ Change the tile size without rescaling every canvas item.
+
+        Agents and task arrows are rescaled by their tags. Static items are only re-placed in
+        view, and the rest when they come into view (see place_static_items_in_view). The fonts
+        are updated by settle_zoom, which also redraws the map. Until then the map is stretched
+        from its last drawing.
+        """
+        scale = tile_size / self.pcf.tile_size
+        for tag in (self.AGENT_OBJ_TAG, self.AGENT_DIR_TAG, self.AGENT_TEXT_TAG,
+                    self.TASK_ARROW_TAG):
+            self.pcf.canvas.scale(tag, 0, 0, scale, scale)
+        self.pcf.canvas.delete("hover_text")
+        self.pcf.tile_size = tile_size
         self.pcf.update_canvas_scrollregion()
+        self.pcf.scale_env_view(self.get_visible_world_bbox())
         self.update_minimap_viewport()
+        self.place_static_items_in_view()
+        self.update_agent_culling()
+        self.apply_agent_lod()
+        self.render_agent_layer()
+
+
+    def settle_zoom(self) -> None:
+        """ Apply the font size and redraw the map for the current tile size.
+        """
+        self.zoom_settle_job = None
+        self.pcf.canvas.itemconfigure("text", font=("Arial", int(self.pcf.tile_size // 2)))
+        self.pcf.canvas.itemconfigure("hwy", font=("Arial", int(self.pcf.tile_size*1.2)))
+        self.pcf.render_env_view(self.get_visible_world_bbox())
+
+
+    def place_static_items(self, rows:np.ndarray) -> None:
+        """ Move the item_index rows to their coordinates at the current tile size in one Tcl call.
+        """
+        if len(rows) == 0:
+            return
+        canvas = str(self.pcf.canvas)
+        script = [f"{canvas} coords {item_id} {' '.join(map(repr, coords))}"
+                  for (item_id, coords) in self.pcf.item_index.place(rows, self.pcf.tile_size)]
+        self.pcf.canvas.tk.eval("\n".join(script))
+
+
+    def place_static_items_in_view(self) -> None:
+        left, top, right, bottom = self.get_visible_world_bbox()
+        tile_size = self.pcf.tile_size
+        margin = self.CULL_MARGIN + 1
+        self.place_static_items(self.pcf.item_index.get_stale_rows_in(
+            (left / tile_size - margin, top / tile_size - margin,
+             right / tile_size + margin, bottom / tile_size + margin), tile_size
+        ))
 
 
     def resume_zoom(self):
         base_tile_size = self.pcf.default_tile_size
         if base_tile_size < 1:
             base_tile_size = self.pcf.ppm * self.pcf.moves
-        __scale = base_tile_size / self.pcf.tile_size
-        self.pcf.canvas.scale("all", 0, 0, __scale, __scale)
-        self.pcf.tile_size = base_tile_size
+        self.zoom_canvas(base_tile_size)
         self.pcf.update_viewport_metrics()
         self.pcf.canvas.configure(width=self.pcf.viewport_width_px,
                                   height=self.pcf.viewport_height_px)
-        for child_widget in self.pcf.canvas.find_withtag("text"):
-            self.pcf.canvas.itemconfigure(child_widget,
-                                          font=("Arial", int(self.pcf.tile_size // 2)))
-        for child_widget in self.pcf.canvas.find_withtag("hwy"):
-            self.pcf.canvas.itemconfigure(child_widget,
-                                          font=("Arial", int(self.pcf.tile_size*1.2)))
+        self.settle_zoom()
         self.pcf.update_canvas_scrollregion()
-        self.update_minimap_viewport()
+        self.on_view_changed()
         self.pcf.canvas.update()
 
     def clear_agent_selection(self, moving:bool=False, refresh:bool=True):
@@ -2227,8 +2388,7 @@ class PlanViz2024:
             self.pop_event_listbox.bind("<Double-1>", self.move_to_event)
             
             agent_scrollbar = tk.Scrollbar(self.pop_frame, orient="vertical", width=20)
-            self.pop_event_listbox.config(yscrollcommand = agent_scrollbar.set)
-            agent_scrollbar.config(command=self.pop_event_listbox.yview)
+            self.add_event_vlist(self.pop_event_listbox, agent_scrollbar)
             agent_scrollbar.grid(row=1, column=2, sticky="ns")
             
             # Second event list - location events  
@@ -2245,8 +2405,7 @@ class PlanViz2024:
             self.pop_location_listbox.bind("<Double-1>", self.move_to_event)
             
             location_scrollbar = tk.Scrollbar(self.pop_frame, orient="vertical", width=20)
-            self.pop_location_listbox.config(yscrollcommand = location_scrollbar.set)
-            location_scrollbar.config(command=self.pop_location_listbox.yview)
+            self.add_event_vlist(self.pop_location_listbox, location_scrollbar)
             location_scrollbar.grid(row=3, column=2, sticky="ns")
             
         else:
@@ -2290,6 +2449,9 @@ class PlanViz2024:
         grid_column = int(x_adjusted // self.pcf.tile_size)
         grid_row = int(y_adjusted // self.pcf.tile_size)
         grid_loc = [grid_column, grid_row]
+        if self.agent_lod == self.LOD_PIXELS:  # The agent items are left in place
+            return self.find_agent_at(y_adjusted / self.pcf.tile_size,
+                                      x_adjusted / self.pcf.tile_size)
         items = self.pcf.canvas.find_overlapping(x_adjusted-0.1, y_adjusted-0.1, 
                                                  x_adjusted+0.1, y_adjusted+0.1)
         ag_idx = -1
@@ -2306,34 +2468,32 @@ class PlanViz2024:
         return ag_idx
 
 
+    def find_agent_at(self, row:float, col:float) -> int:
+        """ Id of the agent whose tile covers the map position (row, col), in tiles, at the current
+        timestep, or -1. This is where render_agent_layer draws the agents at LOD_PIXELS.
+        """
+        if not self.pcf.agents:
+            return -1
+        ag_ids = np.fromiter(self.pcf.agents.keys(), dtype=np.int64, count=len(self.pcf.agents))
+        states = self.pcf.get_exec_states(self.pcf.cur_tstep, ag_ids).astype(np.float64)
+        dists = np.maximum(np.abs(states[:, 0] + 0.5 - row), np.abs(states[:, 1] + 0.5 - col))
+        hits = np.flatnonzero(dists <= 0.5)
+        if len(hits) == 0:
+            return -1
+        return int(ag_ids[hits[np.argmin(dists[hits])]])
+
+
     def get_agent_focus_context(self, ag_idx:int,
                                 cur_tstep:Optional[int]=None) -> Optional[Tuple[int, int, int]]:
-        if ag_idx not in self.pcf.agent_assigned_task:
-            return None
-
         if cur_tstep is None:
             cur_tstep = self.pcf.cur_tstep
 
-        current_task_idx = -1
-        for assign_t, task_idx in sorted(self.pcf.agent_assigned_task[ag_idx]):
-            if cur_tstep >= assign_t - 1:
-                current_task_idx = task_idx
-
+        current_task_idx = self.pcf.get_current_task(ag_idx, cur_tstep + 1)
         if current_task_idx == -1:
             return None
 
-        first_errand = -1
-        first_errand_t = -1
-        for seq_id, task in enumerate(self.pcf.seq_tasks[current_task_idx].tasks):
-            task_t = task.events["finished"]["timestep"]
-            if task_t == float("inf"):
-                task_t = 1e9
-            if cur_tstep < task_t:
-                first_errand = seq_id
-                first_errand_t = int(task_t)
-                break
-
-        return (current_task_idx, first_errand, first_errand_t)
+        first_errand, first_errand_t = self.pcf.get_first_errand(current_task_idx, cur_tstep)
+        return (current_task_idx, first_errand, int(first_errand_t))
 
 
     def clear_selected_agent_visuals(self, clear_task_visibility:bool=True) -> None:
@@ -2351,15 +2511,16 @@ class PlanViz2024:
                     self.hide_single_task(task_idx, seq_id)
 
 
-    def render_task_sequence(self, agent_idx:int, task_idx:int, first_errand:int) -> List[int]:
-        def get_center_coords(canvas, item_id):
-            coords = canvas.coords(item_id)
-            x_center = (coords[0] + coords[2]) / 2
-            y_center = (coords[1] + coords[3]) / 2
-            return x_center, y_center
+    def get_tile_center(self, loc:Tuple[float, ...]) -> Tuple[float, float]:
+        """ Canvas coordinates of the center of the tile at loc. Unlike the coordinates of the
+        agent items, which culling and the agent layer leave stale, they are always current.
+        """
+        return (loc[1]+0.5) * self.pcf.tile_size, (loc[0]+0.5) * self.pcf.tile_size
+
 
+    def render_task_sequence(self, agent_idx:int, task_idx:int, first_errand:int) -> List[int]:
         arrows = []
-        last_obj = self.pcf.agents[agent_idx].agent_obj.obj
+        last_loc = self.pcf.agents[agent_idx].agent_obj.loc
         for seq_id, seq_task in enumerate(self.pcf.seq_tasks[task_idx].tasks):
             task_t = seq_task.events["finished"]["timestep"]
             if self.pcf.cur_tstep >= task_t:
@@ -2371,13 +2532,14 @@ class PlanViz2024:
                 self.change_task_color(task_idx, seq_id, "orange")
 
             self.set_task_visibility(task_idx, seq_id, True)
-            x1, y1 = get_center_coords(self.pcf.canvas, last_obj)
-            last_obj = seq_task.task_obj.obj
-            x2, y2 = get_center_coords(self.pcf.canvas, last_obj)
+            x1, y1 = self.get_tile_center(last_loc)
+            last_loc = seq_task.loc
+            x2, y2 = self.get_tile_center(last_loc)
             arrow_id = self.pcf.canvas.create_line(x1, y1, x2, y2,
                                                    arrow=tk.LAST,
                                                    width=2,
-                                                   fill="#4eb1a6")
+                                                   fill="#4eb1a6",
+                                                   tags=self.TASK_ARROW_TAG)
             arrows.append(arrow_id)
 
         return arrows
@@ -2421,8 +2583,10 @@ class PlanViz2024:
                 if first_errand_t == -1:
                     continue
                 self.pcf.lazy_render_agent_path(ag_idx)
-                max_path_id = min(first_errand_t + 1, len(self.pcf.agents[ag_idx].path_objs))
-                for path_id in range(self.pcf.cur_tstep + 1, max_path_id):
+                max_path_id = min(first_errand_t + 1 - self.pcf.path_base_tstep,
+                                  len(self.pcf.agents[ag_idx].path_objs))
+                for path_id in range(self.pcf.cur_tstep + 1 - self.pcf.path_base_tstep,
+                                     max_path_id):
                     self.pcf.canvas.itemconfigure(self.pcf.agents[ag_idx].path_objs[path_id].obj,
                                                   state=tk.DISABLED)
                     self.pcf.canvas.tag_raise(self.pcf.agents[ag_idx].path_objs[path_id].obj)
@@ -2439,25 +2603,10 @@ class PlanViz2024:
 
 
     def show_colorful_errands(self, ag_idx, moving=False):
-        agent_tasks = self.pcf.agent_assigned_task[ag_idx]
-        agent_tasks = sorted(agent_tasks)
-        first_errand = -1
-        first_errand_t = -1
-        tsk_idx = -1
-        for t, i in agent_tasks:
-            if self.pcf.cur_tstep >= t-1:
-                tsk_idx = i
+        tsk_idx = self.pcf.get_current_task(ag_idx, self.pcf.cur_tstep + 1)
         if tsk_idx == -1:
-            return int(first_errand_t)
-        t = []
-        for i, task in enumerate(self.pcf.seq_tasks[tsk_idx].tasks):
-            task_t = task.events["finished"]["timestep"]
-            if task_t == float("inf"):
-                task_t = 1e9
-            if self.pcf.cur_tstep < task_t:
-                first_errand = i
-                first_errand_t = task_t
-                break
+            return -1
+        first_errand, first_errand_t = self.pcf.get_first_errand(tsk_idx, self.pcf.cur_tstep)
         self.pcf.agent_shown_task_arrow[ag_idx] = self.show_task_seq(ag_idx, tsk_idx, first_errand, moving)
         return int(first_errand_t)
 
@@ -2475,8 +2624,9 @@ class PlanViz2024:
             self.pcf.shown_path_agents.add(ag_idx)  # Add ag_id to the set
             if not self.show_agent_path.get(): 
                 return
-            ml = min(first_errand_t+1, len(self.pcf.agents[ag_idx].path_objs))
-            for _pid_ in range(self.pcf.cur_tstep+1, ml):
+            ml = min(first_errand_t+1 - self.pcf.path_base_tstep,
+                     len(self.pcf.agents[ag_idx].path_objs))
+            for _pid_ in range(self.pcf.cur_tstep+1 - self.pcf.path_base_tstep, ml):
                 self.pcf.canvas.itemconfigure(self.pcf.agents[ag_idx].path_objs[_pid_].obj,
                                               state=tk.DISABLED)
                 self.pcf.canvas.tag_raise(self.pcf.agents[ag_idx].path_objs[_pid_].obj)
@@ -2486,8 +2636,7 @@ class PlanViz2024:
 
     def mark_conf_agents(self) -> None:
         self.conflict_listbox.select_clear(0, self.conflict_listbox.size())
-        for conf in self.shown_conflicts.values():
-            conf[1] = False
+        self.shown_conflicts.clear()
         self.update_agent_colors()
 
 
@@ -2495,14 +2644,6 @@ class PlanViz2024:
         self.refresh_selected_agent_display()
 
     def show_task_seq(self, agent_idx, task_idx, first_errand, moving=False):
-        def get_center_coords(canvas, item_id):
-            # Get the coordinates of the bounding box of the item
-            coords = canvas.coords(item_id)
-            # Calculate the center
-            x_center = (coords[0] + coords[2]) / 2
-            y_center = (coords[1] + coords[3]) / 2
-            return x_center, y_center
-        
         arrows = []
         
         if task_idx in self.pcf.shown_tasks_seq and (not moving):
@@ -2513,7 +2654,7 @@ class PlanViz2024:
                 self.hide_single_task(task_idx, idx)
         else:
             self.pcf.shown_tasks_seq.add(task_idx)
-            last_obj = self.pcf.agents[agent_idx].agent_obj.obj
+            last_loc = self.pcf.agents[agent_idx].agent_obj.loc
             for idx, tsk in enumerate(self.pcf.seq_tasks[task_idx].tasks):
                 task_t = tsk.events["finished"]["timestep"]
                 if self.pcf.cur_tstep >= task_t:
@@ -2525,10 +2666,11 @@ class PlanViz2024:
                     self.change_task_color(task_idx,idx, "orange")
 
                 self.set_task_visibility(task_idx, idx, True)
-                x1, y1 = get_center_coords(self.pcf.canvas, last_obj)
-                last_obj = tsk.task_obj.obj
-                x2, y2 = get_center_coords(self.pcf.canvas, last_obj)
-                _arrow = self.pcf.canvas.create_line(x1, y1, x2, y2, arrow=tk.LAST, width=2, fill="#4eb1a6")
+                x1, y1 = self.get_tile_center(last_loc)
+                last_loc = tsk.loc
+                x2, y2 = self.get_tile_center(last_loc)
+                _arrow = self.pcf.canvas.create_line(x1, y1, x2, y2, arrow=tk.LAST, width=2,
+                                                     fill="#4eb1a6", tags=self.TASK_ARROW_TAG)
                 arrows.append(_arrow)
 
         # Hide tasks that are not in ag_id
@@ -2546,12 +2688,10 @@ class PlanViz2024:
         return arrows
 
     def show_grid(self) -> None:
-        if self.is_grid.get() is True:
-            for _line_ in self.pcf.grids:
-                self.pcf.canvas.itemconfig(_line_, state=tk.NORMAL)
-        else:
-            for _line_ in self.pcf.grids:
-                self.pcf.canvas.itemconfig(_line_, state=tk.HIDDEN)
+        # The grid lines are drawn into the environment image
+        self.pcf.show_env_grid = self.is_grid.get()
+        self.pcf.update_world_view_metrics()
+        self.pcf.render_env_view(self.get_visible_world_bbox())
 
 
     def show_heat_map(self) -> None:
@@ -2586,13 +2726,14 @@ class PlanViz2024:
 
 
     def show_agent_index(self) -> None:
-        _state_ = tk.DISABLED if self.show_ag_idx.get() is True else tk.HIDDEN
+        _state_ = self.get_agent_item_states()[1]
         _ts_ = tk.DISABLED if (self.show_ag_idx.get() is True and\
             self.show_static.get() is True) else tk.HIDDEN
         self.raise_agent_canvas_items()
 
         self.pcf.canvas.itemconfig(self.AGENT_TEXT_TAG, state=_state_)
         self.pcf.canvas.itemconfig(self.AGENT_START_TEXT_TAG, state=_ts_)
+        self.pcf.canvas.itemconfig(self.AGENT_CULLED_TAG, state=tk.HIDDEN)
 
     def raise_agent_canvas_items(self) -> None:
         self.pcf.canvas.tag_raise(self.AGENT_OBJ_TAG, "all")
@@ -2600,79 +2741,120 @@ class PlanViz2024:
         self.pcf.canvas.tag_raise(self.AGENT_START_OBJ_TAG, "all")
         self.pcf.canvas.tag_raise(self.AGENT_TEXT_TAG, "all")
         self.pcf.canvas.tag_raise(self.AGENT_START_TEXT_TAG, "all")
+        self.pcf.canvas.tag_raise(self.AGENT_LAYER_TAG, "all")
 
-    def set_task_visibility(self, task_id:int, seq_id:int, visible:bool) -> None:
-        self.pcf.lazy_render_task(task_id, seq_id)
+    def render_task(self, task_id:int, seq_id:int):
+        """ Lazy render a task if not yet rendered. A new task is visible, as lazy_render_task
+        creates it, and tagged accordingly.
+        """
         task = self.pcf.seq_tasks[task_id].tasks[seq_id]
+        if task.task_obj is None:
+            self.pcf.lazy_render_task(task_id, seq_id)
+            self.pcf.canvas.addtag_withtag(self.TASK_SHOWN_TAG, task.task_obj.obj)
+            self.pcf.canvas.addtag_withtag(self.TASK_SHOWN_TEXT_TAG, task.task_obj.text)
+            self.task_visible[self.pcf.get_errand_row(task_id, seq_id)] = True
+        return task
+
+
+    def set_task_visibility(self, task_id:int, seq_id:int, visible:bool) -> None:
+        task = self.render_task(task_id, seq_id)
         box_state = tk.DISABLED if visible else tk.HIDDEN
         text_state = tk.HIDDEN
         if visible and self.show_task_idx.get():
             text_state = tk.DISABLED
+        if visible:  # It may be shown out of view, e.g., as the target of a task arrow
+            self.place_static_items(self.pcf.item_index.get_stale_rows(
+                [task.task_obj.obj, task.task_obj.text], self.pcf.tile_size
+            ))
+            self.pcf.canvas.addtag_withtag(self.TASK_SHOWN_TAG, task.task_obj.obj)
+            self.pcf.canvas.addtag_withtag(self.TASK_SHOWN_TEXT_TAG, task.task_obj.text)
+        else:
+            self.pcf.canvas.dtag(task.task_obj.obj, self.TASK_SHOWN_TAG)
+            self.pcf.canvas.dtag(task.task_obj.text, self.TASK_SHOWN_TEXT_TAG)
+        self.task_visible[self.pcf.get_errand_row(task_id, seq_id)] = visible
 
         self.pcf.canvas.itemconfig(task.task_obj.obj, state=box_state)
         self.pcf.canvas.itemconfig(task.task_obj.text, state=text_state)
-        if self.pcf.grids:
-            self.pcf.canvas.tag_lower(task.task_obj.obj, self.pcf.grids[0])
-
-    def show_task_index(self) -> None:
-        for (task_id, seq_id) in list(self.pcf.rendered_tasks):
-            task = self.pcf.seq_tasks[task_id].tasks[seq_id]
-            if task.task_obj is None:
-                continue
-            obj_state = self.pcf.canvas.itemcget(task.task_obj.obj, "state")
-            self.set_task_visibility(task_id, seq_id, obj_state != tk.HIDDEN)
-        self.raise_agent_canvas_items()
 
 
-    def show_tasks(self) -> None:
-        for (task_id, seq_id) in list(self.pcf.rendered_tasks):
-            self.hide_single_task(task_id, seq_id)
-        mode = self.task_shown.get()
-        if mode == "none":
-            self.show_task_index()
+    def set_errands_visibility(self, rows:np.ndarray, visible:bool) -> None:
+        """ Show or hide the errands at rows (see build_errand_index) with a single Tcl call. The
+        changed boxes are tagged once, so that one itemconfigure covers all of them.
+        """
+        if len(rows) == 0:
             return
-        elif mode == "All Tasks":
-            for (task_id, seq_task) in self.pcf.seq_tasks.items():
-                for i, task in enumerate(seq_task.tasks):
-                    self.set_task_visibility(task_id, i, True)
-
-        elif mode == "Next Errand":
-            for ag_id in range(self.pcf.team_size):
-                if ag_id not in self.pcf.agent_assigned_task:
-                    continue
-                current_task_id = None
-                for assign_t, task_id in self.pcf.agent_assigned_task[ag_id]:
-                    if assign_t <= self.pcf.cur_tstep:
-                        current_task_id = task_id
+        errands = zip(self.pcf.errand_task_ids[rows].tolist(), self.pcf.errand_seq_ids[rows].tolist())
+        task_objs = [self.render_task(task_id, seq_id).task_obj for (task_id, seq_id) in errands]
+        boxes = " ".join(str(task_obj.obj) for task_obj in task_objs)
+        texts = " ".join(str(task_obj.text) for task_obj in task_objs)
+        canvas = str(self.pcf.canvas)
+        changed_tag = self.TASK_CHANGED_TAG
+        if visible:  # They may be shown out of view, e.g., as the targets of task arrows
+            self.place_static_items(self.pcf.item_index.get_stale_rows(
+                [item_id for task_obj in task_objs for item_id in (task_obj.obj, task_obj.text)],
+                self.pcf.tile_size
+            ))
+            script = [f"foreach i {{{boxes}}} {{{canvas} addtag {self.TASK_SHOWN_TAG} withtag $i; "
+                      f"{canvas} addtag {changed_tag} withtag $i}}",
+                      f"foreach i {{{texts}}} {{{canvas} addtag {self.TASK_SHOWN_TEXT_TAG} withtag $i}}",
+                      f"{canvas} itemconfigure {changed_tag} -state {tk.DISABLED}"]
+        else:
+            script = [f"foreach i {{{boxes} {texts}}} {{{canvas} addtag {changed_tag} withtag $i}}",
+                      f"{canvas} dtag {changed_tag} {self.TASK_SHOWN_TAG}",
+                      f"{canvas} dtag {changed_tag} {self.TASK_SHOWN_TEXT_TAG}",
+                      f"{canvas} itemconfigure {changed_tag} -state {tk.HIDDEN}"]
+        script.append(f"{canvas} dtag {changed_tag}")
+        self.pcf.canvas.tk.eval("\n".join(script))
+        self.task_visible[rows] = visible
 
-                if current_task_id is None:
-                    continue
 
-                seq_task = self.pcf.seq_tasks[current_task_id]
-                for i, task in enumerate(seq_task.tasks):
-                    task_t = task.events["finished"]["timestep"]
-                    if task.state in ["assigned", "newlyassigned"] and task_t > self.pcf.cur_tstep:
-                        self.set_task_visibility(current_task_id, i, True)
-                        break
+    def show_task_index(self) -> None:
+        text_state = tk.DISABLED if self.show_task_idx.get() else tk.HIDDEN
+        self.pcf.canvas.itemconfig(self.TASK_SHOWN_TEXT_TAG, state=text_state)
+        self.raise_agent_canvas_items()
 
-        elif mode == "Assigned Tasks":
-            for ag_id in range(self.pcf.team_size):
-                if ag_id not in self.pcf.agent_assigned_task:
-                    continue
-                current_task_id = None
-                for assign_t, task_id in self.pcf.agent_assigned_task[ag_id]:
-                    if assign_t <= self.pcf.cur_tstep:
-                        current_task_id = task_id
 
-                if current_task_id is None:
-                    continue
+    def get_visible_errands(self) -> np.ndarray:
+        """ Mask over the errand rows (see build_errand_index) of the tasks shown in the current
+        mode at the current time.
+        """
+        mode = self.task_shown.get()
+        cur_tstep = self.pcf.cur_tstep
+        if mode == "All Tasks":
+            return np.ones(len(self.pcf.errand_ids), dtype=bool)
+        visible = np.zeros(len(self.pcf.errand_ids), dtype=bool)
+        if mode not in ["Next Errand", "Assigned Tasks"]:
+            return visible
+
+        current_task_ids = {self.pcf.get_current_task(ag_id, cur_tstep)
+                            for ag_id in range(self.pcf.team_size)}
+        current_task_ids.discard(-1)
+        finish_tsteps = self.pcf.errand_finish_tsteps
+        if mode == "Next Errand":
+            unfinished = finish_tsteps > cur_tstep
+        else:
+            unfinished = finish_tsteps >= cur_tstep
+        rows = np.flatnonzero(
+            np.isin(self.pcf.errand_task_ids, list(current_task_ids)) & unfinished
+        )
+        rows = np.asarray([row for (row, task_id, seq_id)
+                           in zip(rows.tolist(), self.pcf.errand_task_ids[rows].tolist(),
+                                  self.pcf.errand_seq_ids[rows].tolist())
+                           if self.pcf.seq_tasks[task_id].tasks[seq_id].state
+                           in ["assigned", "newlyassigned"]], dtype=np.int64)
+        if mode == "Next Errand" and len(rows) > 0:  # Only the first errand of each task
+            _, first = np.unique(self.pcf.errand_task_ids[rows], return_index=True)
+            rows = rows[first]
+        visible[rows] = True
+        return visible
 
-                seq_task = self.pcf.seq_tasks[current_task_id]
-                for i, task in enumerate(seq_task.tasks):
-                    task_t = task.events["finished"]["timestep"]
-                    if task.state in ["assigned", "newlyassigned"] and task_t >= self.pcf.cur_tstep:
-                        self.set_task_visibility(current_task_id, i, True)
 
+    def show_tasks(self) -> None:
+        """ Show the tasks of the current mode, only updating the tasks whose visibility changes.
+        """
+        visible = self.get_visible_errands()
+        self.set_errands_visibility(np.flatnonzero(visible & ~self.task_visible), True)
+        self.set_errands_visibility(np.flatnonzero(~visible & self.task_visible), False)
         self.show_task_index()
 
 
@@ -2726,83 +2908,127 @@ class PlanViz2024:
         self.pcf.canvas.itemconfig(self.AGENT_START_TEXT_TAG, state=_ts_)
 
 
-    def move_agents_per_timestep(self) -> None:
-        """ Move agents forward from cur_tstep, adding cur_tstep by 1.
+    def get_agent_move_groups(self, agents:List, target_states:np.ndarray, substeps:int) -> Tuple:
+        """ Group the canvas items of the agents by their displacement per substep.
+
+        Agents that share a displacement are moved together with one Tcl loop, and agents that do
+        not move are left out.
+
+        Args:
+            agents (List): the agents to move.
+            target_states (np.ndarray): the (row, col, direction) state each agent moves to.
+            substeps (int): number of animation substeps.
+
+        Returns:
+            Tuple: (dx, dy, item ids) of the agent bodies and texts, and
+                (dx, dy, angle, rotation per substep, item ids) of the direction markers.
         """
-        if self.pcf.cur_tstep+1 > min(self.pcf.makespan, self.pcf.end_tstep):
-            return
+        cur_states = np.asarray([agent.agent_obj.loc for agent in agents],
+                                dtype=np.float64).reshape(-1, 3)
+        target_states = np.asarray(target_states, dtype=np.float64).reshape(-1, 3)
+        step = self.pcf.tile_size / substeps
+        # Columns: dx, dy, current angle, rotation per substep (same as get_angle, get_rotation)
+        moves = np.zeros((len(agents), 4), dtype=np.float64)
+        moves[:, 0] = (target_states[:, 1] - cur_states[:, 1]) * step
+        moves[:, 1] = (target_states[:, 0] - cur_states[:, 0]) * step
+        moves[:, 2] = np.where(cur_states[:, 2] == 3, -math.pi/2, cur_states[:, 2] * math.pi/2)
+        rotations = (target_states[:, 2] - cur_states[:, 2]) % 4.0
+        rotations[rotations > 2.0] -= 4.0
+        moves[:, 3] = rotations * (math.pi/2) / substeps
+
+        item_ids = np.asarray([agent.agent_obj.obj for agent in agents] +
+                              [agent.agent_obj.text for agent in agents], dtype=np.int64)
+        translated = (moves[:, 0] != 0) | (moves[:, 1] != 0)
+        item_groups = self.group_canvas_items(item_ids, np.tile(moves[:, :2], (2, 1)),
+                                              np.tile(translated, 2))
+
+        dir_groups = []
+        if self.pcf.agent_model == "MAPF_T":
+            dir_ids = np.asarray([agent.dir_obj for agent in agents], dtype=np.int64)
+            # The angle only matters for markers that rotate
+            moves[moves[:, 3] == 0, 2] = 0
+            dir_groups = self.group_canvas_items(dir_ids, moves, translated | (moves[:, 3] != 0))
+        return item_groups, dir_groups
 
-        if self.pcf.window_size is not None:
-            target_timestep = min(self.pcf.cur_tstep + self.pcf.window_size, self.pcf.end_tstep)
-            target_idx = target_timestep - self.pcf.start_tstep
-            if any(target_idx >= len(agent.path) for agent in self.pcf.agents.values()):
-                self.pcf.ensure_paths_through(target_timestep)
 
-        self.next_button.config(state=tk.DISABLED)
+    @staticmethod
+    def group_canvas_items(item_ids:np.ndarray, keys:np.ndarray, mask:np.ndarray) -> List:
+        """ Split the masked item ids into groups with equal key rows.
+
+        Returns:
+            List: (*key, space-separated item ids) per group.
+        """
+        item_ids = item_ids[mask]
+        if len(item_ids) == 0:
+            return []
+        uniq_keys, inverse = np.unique(keys[mask], axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.cumsum(np.bincount(inverse, minlength=len(uniq_keys)))[:-1]
+        return [(*(float(val) for val in key), " ".join(map(str, ids.tolist())))
+                for key, ids in zip(uniq_keys, np.split(item_ids[order], bounds))]
+
+
+    def move_agent_items(self, item_groups:List, dir_groups:List, substep:int,
+                         count:int=1) -> None:
+        """ Apply count animation substeps from substep on to all the moving agents with a single
+        Tcl call. Substeps merged this way move the agents straight to the last one.
+        """
         _rad_ = ((1 - 2*DIR_OFFSET) - 0.1*2) * self.pcf.tile_size/2
-        substeps = self.pcf.animation_substeps
-        if substeps < 1:
-            substeps = 1
+        canvas = str(self.pcf.canvas)
+        script = [f"foreach i {{{ids}}} {{{canvas} move $i {dx*count!r} {dy*count!r}}}"
+                  for (dx, dy, ids) in item_groups]
+        end = substep + count
+        for (dx, dy, angle, rotation, ids) in dir_groups:
+            _cos = math.cos(angle + rotation*end) - math.cos(angle + rotation*substep)
+            _sin = -1 * (math.sin(angle + rotation*end) - math.sin(angle + rotation*substep))
+            script.append(f"foreach i {{{ids}}} "
+                          f"{{{canvas} move $i {dx*count + _rad_*_cos!r} {dy*count + _rad_*_sin!r}}}")
+        if script:
+            self.pcf.canvas.tk.eval("\n".join(script))
+
+
+    def begin_forward_step(self) -> bool:
+        """ Prepare the animation from cur_tstep to cur_tstep+1.
+
+        Returns:
+            bool: False if the last timestep is reached.
+        """
+        if self.pcf.cur_tstep+1 > min(self.pcf.makespan, self.pcf.end_tstep):
+            return False
 
-        # Update the next timestep for each agent
-        next_tstep = {}
-        for (ag_id, agent) in self.pcf.agents.items():
-            next_t = min(self.pcf.cur_tstep+1 - self.pcf.start_tstep, len(agent.path)-1)
-            next_tstep[ag_id] = next_t
+        self.pcf.prepare_paths(self.pcf.cur_tstep)
 
-        for _m_ in range(substeps):
-            if _m_ == substeps // 2:
-                self.set_time_labels(self.pcf.cur_tstep+1)
+        self.next_button.config(state=tk.DISABLED)
 
-            for (ag_id, agent) in self.pcf.agents.items():
-                cur_angle = get_angle(agent.agent_obj.loc[2])
-                direction = (agent.path[next_tstep[ag_id]][1] - agent.agent_obj.loc[1],
-                             agent.path[next_tstep[ag_id]][0] - agent.agent_obj.loc[0])
-                cur_move = (direction[0] * (self.pcf.tile_size / substeps),
-                            direction[1] * (self.pcf.tile_size / substeps))
-                cur_rotation = get_rotation(agent.agent_obj.loc[2],
-                                            agent.path[next_tstep[ag_id]][2])
-                next_ang = cur_rotation*(math.pi/2)/(substeps)
+        # Update the next state of each agent that moves, the others wait in place
+        next_loc:Dict[int, Tuple] = {}
+        next_t = self.pcf.cur_tstep+1 - self.pcf.path_base_tstep
+        for ag_id in self.pcf.get_active_agents(self.pcf.cur_tstep).tolist():
+            if ag_id in self.pcf.agents:
+                agent = self.pcf.agents[ag_id]
+                state = agent.path[min(next_t, len(agent.path)-1)]
+                next_loc[ag_id] = (state[0], state[1], state[2])
+        self.start_step_animation(True, self.pcf.cur_tstep+1, next_loc)
+        return True
 
-                # Move agent
-                _cos = math.cos(cur_angle + next_ang * (_m_+1)) - math.cos(cur_angle+next_ang*_m_)
-                _sin = -1 * (math.sin(cur_angle+ next_ang*(_m_+1))-math.sin(cur_angle+next_ang*_m_))
-                self.pcf.canvas.move(agent.agent_obj.obj, cur_move[0], cur_move[1])
-                self.pcf.canvas.move(agent.agent_obj.text, cur_move[0], cur_move[1])
-                if self.pcf.agent_model == "MAPF_T":
-                    self.pcf.canvas.move(agent.dir_obj, cur_move[0], cur_move[1])
-                    self.pcf.canvas.move(agent.dir_obj, _rad_ * _cos, _rad_ * _sin)
-                    
-            self.render_selected_agent_context()
-                    
-            self.pcf.canvas.update()
-            time.sleep(self.pcf.delay)
 
-        # Update the location of each agent
-        for (ag_id, agent) in self.pcf.agents.items():
-            agent.agent_obj.loc = (agent.path[next_tstep[ag_id]][0],
-                                   agent.path[next_tstep[ag_id]][1],
-                                   agent.path[next_tstep[ag_id]][2])
+    def finish_forward_step(self) -> None:
         self.pcf.cur_tstep += 1
+        self.update_agent_culling()
         self.next_button.config(state=tk.NORMAL)
 
         # Change tasks' states after cur_tstep += 1
         if not self.pcf.event_tracker:
+            self.render_agent_layer()
             return
-        
-        self.update_event_list(self.event_listbox, 0)
-        self.update_event_list(self.pop_event_listbox, 1)
-        # If popup window location list exists, update it too
-        if self.pop_location_listbox and self.pop_location_listbox.winfo_exists():
-            # Extract grid location info from popup window title
-            title = self.pop_gui_window.title()
-            if "Location" in title:
-                # Parse coordinates from title "Event List - Location (x, y)"
-                match = re.search(r'Location \((\d+), (\d+)\)', title)
-                if match:
-                    grid_x, grid_y = int(match.group(1)), int(match.group(2))
-                    self.update_location_event_list(self.pop_location_listbox)
-        self.update_error_list(self.conflict_listbox)
+        self.apply_task_events()
+        self.update_step_panels()
+
+
+    def apply_task_events(self) -> None:
+        """ Apply the task assignments and finishes of cur_tstep.
+        """
         if self.pcf.cur_tstep == self.pcf.event_tracker["aTime"][self.pcf.event_tracker["aid"]]:
             # from unassigned to assigned
             for (global_task_id, ag_id) in self.pcf.events["assigned"][self.pcf.cur_tstep].items():
@@ -2827,16 +3053,37 @@ class PlanViz2024:
                     if len(tsk)-1 > seq_id:
                         self.show_single_task(task_id, seq_id+1)
             self.pcf.event_tracker["fid"] += 1
+
+
+    def update_step_panels(self) -> None:
+        """ Refresh the event and error panels and the agent colors for cur_tstep.
+        """
+        self.update_event_list(self.event_listbox, 0)
+        self.update_event_list(self.pop_event_listbox, 1)
+        # If popup window location list exists, update it too
+        if self.pop_location_listbox and self.pop_location_listbox.winfo_exists():
+            # Extract grid location info from popup window title
+            title = self.pop_gui_window.title()
+            if "Location" in title:
+                # Parse coordinates from title "Event List - Location (x, y)"
+                match = re.search(r'Location \((\d+), (\d+)\)', title)
+                if match:
+                    grid_x, grid_y = int(match.group(1)), int(match.group(2))
+                    self.update_location_event_list(self.pop_location_listbox)
+        self.update_error_list(self.conflict_listbox)
         self.render_selected_agent_context()
         self.update_agent_colors()
         self.raise_agent_canvas_items()
-        
 
-    def back_agents_per_timestep(self) -> None:
-        """ Move agents one step backward in time, reducing cur_tstep by 1.
+
+    def begin_backward_step(self) -> bool:
+        """ Revert the task states of cur_tstep and prepare the animation to cur_tstep-1.
+
+        Returns:
+            bool: False if the starting timestep is reached.
         """
         if self.pcf.cur_tstep == self.pcf.start_tstep:
-            return
+            return False
 
         self.prev_button.config(state=tk.DISABLED)
         prev_timestep = max(self.pcf.cur_tstep-1, 0)
@@ -2873,8 +3120,12 @@ class PlanViz2024:
 
         # Compute the previous location
         prev_loc:Dict[int, Tuple[int, int]] = {}
-        relative_prev_t = prev_timestep - self.pcf.start_tstep
-        for (ag_id, agent) in self.pcf.agents.items():
+        self.pcf.prepare_paths(prev_timestep)
+        relative_prev_t = prev_timestep - self.pcf.path_base_tstep
+        for ag_id in self.pcf.get_active_agents(prev_timestep).tolist():
+            if ag_id not in self.pcf.agents:
+                continue
+            agent = self.pcf.agents[ag_id]
             if relative_prev_t > len(agent.path)-1:
                 prev_loc[ag_id] = (agent.path[-1][0],
                                    agent.path[-1][1],
@@ -2884,59 +3135,242 @@ class PlanViz2024:
                                    agent.path[relative_prev_t][1],
                                    agent.path[relative_prev_t][2])
 
-        # Move the agents backward
-        _rad_ = ((1 - 2*DIR_OFFSET) - 0.1*2) * self.pcf.tile_size/2
-        substeps = self.pcf.animation_substeps
-        if substeps < 1:
-            substeps = 1
-        for _m_ in range(substeps):
-            if _m_ == substeps // 2:
-                self.set_time_labels(prev_timestep)
-            for (ag_id, agent) in self.pcf.agents.items():
-                cur_angle = get_angle(agent.agent_obj.loc[2])
-                direction = (prev_loc[ag_id][1] - agent.agent_obj.loc[1],
-                             prev_loc[ag_id][0] - agent.agent_obj.loc[0])
-                cur_move = (direction[0] * (self.pcf.tile_size / substeps),
-                            direction[1] * (self.pcf.tile_size / substeps))
-                cur_rotation = get_rotation(agent.agent_obj.loc[2], prev_loc[ag_id][2])
-                next_ang = cur_rotation*(math.pi/2)/(substeps)
+        self.start_step_animation(False, prev_timestep, prev_loc)
+        return True
 
-                # Move agent
-                _cos = math.cos(cur_angle+next_ang*(_m_+1)) - math.cos(cur_angle + next_ang*_m_)
-                _sin = -1*(math.sin(cur_angle+next_ang*(_m_+1))-math.sin(cur_angle + next_ang*_m_))
-                self.pcf.canvas.move(agent.agent_obj.obj, cur_move[0], cur_move[1])
-                self.pcf.canvas.move(agent.agent_obj.text, cur_move[0], cur_move[1])
-                if self.pcf.agent_model == "MAPF_T":
-                    self.pcf.canvas.move(agent.dir_obj, cur_move[0], cur_move[1])
-                    self.pcf.canvas.move(agent.dir_obj, _rad_*_cos, _rad_*_sin)
-            self.render_selected_agent_context()
-            self.pcf.canvas.update()
-            time.sleep(self.pcf.delay)
-        for (ag_id, agent) in self.pcf.agents.items():
-            agent.agent_obj.loc = prev_loc[ag_id]
 
-        self.pcf.cur_tstep = prev_timestep
-        self.render_selected_agent_context()
-        
-        self.update_event_list(self.event_listbox, 0)
-        self.update_event_list(self.pop_event_listbox, 1)
-        # If popup window location list exists, update it too
-        if self.pop_location_listbox and self.pop_location_listbox.winfo_exists():
-            # Extract grid location info from popup window title
-            title = self.pop_gui_window.title()
-            if "Location" in title:
-                # Parse coordinates from title "Event List - Location (x, y)"
-                match = re.search(r'Location \((\d+), (\d+)\)', title)
-                if match:
-                    grid_x, grid_y = int(match.group(1)), int(match.group(2))
-                    self.update_location_event_list(self.pop_location_listbox)
-        self.update_error_list(self.conflict_listbox)
-        self.update_agent_colors()
-        self.raise_agent_canvas_items()
+    def finish_backward_step(self) -> None:
+        self.pcf.cur_tstep -= 1
+        self.update_agent_culling()
+        self.update_step_panels()
         self.prev_button.config(state=tk.NORMAL)
         self.next_button.config(state=tk.NORMAL)
 
 
+    def start_step_animation(self, forward:bool, target_tstep:int,
+                             target_locs:Dict[int, Tuple]) -> None:
+        """ Start animating the agents in target_locs to their states at target_tstep.
+        The substeps are then applied by animate_step from after() callbacks.
+        """
+        started_at = time.perf_counter()
+        if self.is_run.get() is True and self.next_step_time is not None:
+            # Keep the wall-clock pace of the playback, but never lag more than one timestep
+            started_at = max(self.next_step_time, started_at - self.get_step_duration())
+        self.step_anim = {
+            "forward": forward,
+            "target_tstep": target_tstep,
+            "target_locs": target_locs,
+            "substeps": max(1, self.pcf.animation_substeps),
+            "shown": 0,
+            "start_time": started_at,
+            "substep_time": self.pcf.delay,
+            "playback": self.is_run.get() is True,
+        }
+        if self.is_run.get() is True and self.get_playback_speed() > 0:
+            self.step_anim["substep_time"] = self.get_step_duration() / self.step_anim["substeps"]
+        self.update_step_groups(self.step_anim)
+        self.agents_in_motion = True
+        self.animate_step()
+
+
+    def update_step_groups(self, anim:Dict) -> None:
+        """ Group the canvas items of the step animation by their moves at the current tile size.
+        """
+        # Culled agents only update their locations, and the agent layer is redrawn instead
+        shown_ids = [] if self.agent_lod == self.LOD_PIXELS else \
+            [ag_id for ag_id in anim["target_locs"] if ag_id not in self.culled_agents]
+        anim["item_groups"], anim["dir_groups"] = self.get_agent_move_groups(
+            [self.pcf.agents[ag_id] for ag_id in shown_ids],
+            [anim["target_locs"][ag_id] for ag_id in shown_ids], anim["substeps"]
+        )
+        anim["view"] = (self.pcf.tile_size, self.agent_lod)
+
+
+    def get_playback_speed(self) -> float:
+        """ Timesteps (or ticks) per second of the playback, 0 to animate every one of them.
+        """
+        try:
+            return max(0.0, float(self.playback_speed.get()))
+        except (tk.TclError, ValueError):
+            return 0.0
+
+
+    def get_step_duration(self) -> float:
+        """ Wall-clock seconds per timestep: one delay per substep, plus a pause between the
+        timesteps of the playback, or the inverse of the playback speed if one is set.
+        """
+        if self.is_run.get() is True and self.get_playback_speed() > 0:
+            return 1.0 / self.get_playback_speed()
+        duration = max(1, self.pcf.animation_substeps) * self.pcf.delay
+        if self.is_run.get() is True:
+            duration += self.pcf.delay * 2 if self.pcf.time_unit != "tick" else self.pcf.delay
+        return duration
+
+
+    def animate_step(self) -> None:
+        """ Render one frame of the current step animation.
+
+        The substeps due since the last frame are merged into one canvas update, so the playback
+        keeps its wall-clock speed when rendering falls behind, and no frame is rendered while
+        no substep is due.
+        """
+        self.step_job = None
+        anim = self.step_anim
+        if anim is None:
+            return
+
+        if anim["view"] != (self.pcf.tile_size, self.agent_lod):  # Zoomed during the step
+            prev_lod = anim["view"][1]
+            self.update_step_groups(anim)
+            if prev_lod == self.LOD_PIXELS and self.agent_lod != self.LOD_PIXELS:
+                # The agent items were snapped to the states before the step
+                self.move_agent_items(anim["item_groups"], anim["dir_groups"], 0, anim["shown"])
+
+        now = time.perf_counter()
+        substeps = anim["substeps"]
+        due = min(substeps, int((now - anim["start_time"]) / max(anim["substep_time"], 1e-6)) + 1)
+        if due > anim["shown"]:
+            if anim["shown"] <= substeps // 2 < due:
+                self.set_time_labels(anim["target_tstep"])
+            if self.agent_lod == self.LOD_PIXELS:
+                sign = 1 if anim["forward"] else -1
+                self.render_agent_layer(self.pcf.cur_tstep + sign * due / substeps)
+            else:
+                self.move_agent_items(anim["item_groups"], anim["dir_groups"],
+                                      anim["shown"], due - anim["shown"])
+            anim["shown"] = due
+            self.render_selected_agent_context()
+
+        if anim["shown"] < substeps:
+            next_time = anim["start_time"] + anim["shown"] * anim["substep_time"]
+            wait_ms = max(int((next_time - now) * 1000), 1000 // self.PLAYBACK_FPS)
+            self.step_job = self.pcf.canvas.after(wait_ms, self.animate_step)
+            return
+
+        for (ag_id, loc) in anim["target_locs"].items():
+            self.pcf.agents[ag_id].agent_obj.loc = loc
+        self.step_anim = None
+        self.agents_in_motion = False
+        if anim["forward"]:
+            self.finish_forward_step()
+        else:
+            self.finish_backward_step()
+
+        if anim["playback"]:
+            self.next_step_time = anim["start_time"] + self.get_step_duration()
+            wait_ms = max(int((self.next_step_time - time.perf_counter()) * 1000), 1)
+            self.step_job = self.pcf.canvas.after(wait_ms, self.continue_playback)
+
+
+    def continue_playback(self) -> None:
+        """ Start the next step of the playback. With a playback speed, the timesteps that the
+        rendering could not keep up with are skipped, so the speed is kept.
+        """
+        self.step_job = None
+        if self.is_run.get() is not True:
+            self.stop_playback()
+            return
+
+        speed = self.get_playback_speed()
+        last_tstep = min(self.pcf.makespan, self.pcf.end_tstep)
+        if speed > 0 and self.next_step_time is not None:
+            behind = int((time.perf_counter() - self.next_step_time) * speed)
+            num_skipped = min(behind, last_tstep - self.pcf.cur_tstep)
+            if num_skipped > 0:
+                self.skip_forward(num_skipped)
+                self.next_step_time += num_skipped / speed
+                if self.pcf.cur_tstep >= last_tstep and self.pcf.event_tracker:
+                    self.update_step_panels()  # No step is rendered after the skip
+
+        if not self.begin_forward_step():
+            self.stop_playback()
+
+
+    def skip_forward(self, num_tsteps:int) -> None:
+        """ Move cur_tstep num_tsteps forward without animation.
+        The task events are applied per timestep, while the agents are placed at their states
+        of the last one directly and the panels are left to the next rendered step.
+        """
+        for _ in range(num_tsteps):
+            self.pcf.cur_tstep += 1
+            if self.pcf.event_tracker:
+                self.apply_task_events()
+        self.pcf.prepare_paths(self.pcf.cur_tstep)
+        self.set_time_labels(self.pcf.cur_tstep)
+        self.place_agents()
+
+
+    def place_agents(self, agent_ids:Iterable[int]=()) -> None:
+        """ Place the agents at their states of cur_tstep without animation.
+        Only the agents whose state changed, plus agent_ids, have their canvas items moved.
+        """
+        agent_ids = set(agent_ids)
+        rel_tstep = self.pcf.cur_tstep - self.pcf.path_base_tstep
+        for (ag_id, agent) in self.pcf.agents.items():
+            state = agent.path[min(rel_tstep, len(agent.path)-1)]
+            loc = (state[0], state[1], state[2])
+            if ag_id not in agent_ids and tuple(agent.agent_obj.loc) == loc:
+                continue
+            agent.agent_obj.loc = loc
+            if ag_id not in self.culled_agents and self.agent_lod != self.LOD_PIXELS:
+                self.snap_agent_canvas_items(agent)
+        self.update_agent_culling()
+        self.render_agent_layer()
+
+
+    def seek_task_events(self, tstep:int) -> None:
+        """ Bring the task states to tstep.
+
+        The task states always reflect the assignments before event_tracker["aid"] and the
+        finishes before event_tracker["fid"], so only the errands whose state differs between
+        the tracked positions and tstep are updated, as found with the errand index.
+        """
+        tracker = self.pcf.event_tracker
+        a_times, f_times = tracker["aTime"], tracker["fTime"]  # Sorted, ending with -1
+        prev_states = self.pcf.get_errand_states(
+            a_times[tracker["aid"]-1] if tracker["aid"] > 0 else -1,
+            f_times[tracker["fid"]-1] if tracker["fid"] > 0 else -1
+        )
+        states = self.pcf.get_errand_states(tstep)
+        for row in np.flatnonzero(states != prev_states).tolist():
+            task_id, seq_id = divmod(int(self.pcf.errand_ids[row]), self.pcf.max_seq_num)
+            state = ERRAND_STATES[states[row]]
+            self.pcf.seq_tasks[task_id].tasks[seq_id].state = state
+            self.change_task_color(task_id, seq_id, TASK_COLORS[state])
+        tracker["aid"] = bisect_right(a_times, tstep, 0, max(len(a_times)-1, 0))
+        tracker["fid"] = bisect_right(f_times, tstep, 0, max(len(f_times)-1, 0))
+
+
+    def cancel_step_animation(self) -> None:
+        """ Drop the step being animated, e.g., before the agents are rebuilt at another time.
+        """
+        anim, waiting = self.step_anim, self.step_job is not None and self.step_anim is None
+        if self.step_job is not None:
+            self.pcf.canvas.after_cancel(self.step_job)
+            self.step_job = None
+        self.step_anim = None
+        self.agents_in_motion = False
+        if waiting or (anim is not None and anim["playback"]):
+            self.stop_playback()
+        elif anim is not None:
+            self.next_button.config(state=tk.NORMAL)
+            self.prev_button.config(state=tk.NORMAL)
+
+
+    def move_agents_per_timestep(self) -> None:
+        """ Move agents forward from cur_tstep, adding cur_tstep by 1.
+        """
+        if self.step_anim is None and self.step_job is None:
+            self.begin_forward_step()
+
+
+    def back_agents_per_timestep(self) -> None:
+        """ Move agents one step backward in time, reducing cur_tstep by 1.
+        """
+        if self.step_anim is None and self.step_job is None:
+            self.begin_backward_step()
+
+
     def move_agents(self) -> None:
         """ Move agents constantly until pause or end_tstep is reached.
         """
@@ -2949,16 +3383,15 @@ class PlanViz2024:
         self.task_shown.config(state=tk.DISABLED)
 
         self.is_run.set(True)
-        while self.pcf.cur_tstep < min(self.pcf.makespan, self.pcf.end_tstep):
-            if self.is_run.get() is True:
-                self.move_agents_per_timestep()
-                if self.pcf.time_unit != "tick":
-                    time.sleep(self.pcf.delay * 2)
-                else:
-                    time.sleep(self.pcf.delay)
-            else:
-                break
+        if self.step_anim is not None:  # Resumed before the current step is done
+            self.step_anim["playback"] = True
+        elif not self.begin_forward_step():
+            self.stop_playback()
+
 
+    def stop_playback(self) -> None:
+        self.is_run.set(False)
+        self.next_step_time = None
         self.run_button.config(state=tk.NORMAL)
         self.pause_button.config(state=tk.NORMAL)
         self.next_button.config(state=tk.NORMAL)
@@ -2970,6 +3403,8 @@ class PlanViz2024:
 
     def pause_agents(self) -> None:
         self.is_run.set(False)
+        if self.step_anim is None and self.step_job is not None:  # Waiting for the next step
+            self.cancel_step_animation()
         self.pause_button.config(state=tk.DISABLED)
         self.run_button.config(state=tk.NORMAL)
         self.next_button.config(state=tk.NORMAL)
@@ -2980,81 +3415,23 @@ class PlanViz2024:
 
     def update_curtime(self) -> None:
         """ Update the agents and tasks' colors to the cur_tstep
+        Only the task events between the previous and the new time are applied (or reverted),
+        and the agents that moved are placed at their new states.
         """
         if self.new_time.get() > self.pcf.end_tstep:
             print("The target time is larger than the ending time")
             self.new_time.set(self.pcf.end_tstep)
 
+        # The agents of an interrupted step are in between two states
+        interrupted = set(self.step_anim["target_locs"]) if self.step_anim is not None else set()
+        self.cancel_step_animation()
         self.pcf.cur_tstep = self.new_time.get()
         self.set_time_labels(self.pcf.cur_tstep)
-        if self.pcf.window_size is not None:
-            target_timestep = min(self.pcf.cur_tstep + self.pcf.window_size, self.pcf.end_tstep)
-            target_idx = target_timestep - self.pcf.start_tstep
-            if any(target_idx >= len(agent.path) for agent in self.pcf.agents.values()):
-                self.pcf.ensure_paths_through(target_timestep)
-        
-        # Change tasks' and agents' colors according to assigned timesteps
-        for (task_id, seq_task) in self.pcf.seq_tasks.items():
-            for (seq_id, task) in enumerate(seq_task.tasks):
-                task.state = "unassigned"  # Initialize all the task states to unassigned
-
-        for (task_id, seq_id) in self.pcf.rendered_tasks:
-            self.change_task_color(task_id, seq_id, TASK_COLORS["unassigned"])
-            self.hide_single_task(task_id, seq_id)
-
-        for a_id, a_time in enumerate(self.pcf.event_tracker["aTime"]):
-            if a_time == -1:
-                self.pcf.event_tracker["aid"] = a_id
-                break
-            if a_time <= self.pcf.cur_tstep:
-                for (global_task_id, ag_id) in self.pcf.events["assigned"][a_time].items():
-                    task_id = global_task_id // self.pcf.max_seq_num
-                    seq_id = global_task_id % self.pcf.max_seq_num
-                    self.pcf.seq_tasks[task_id].tasks[seq_id].state = "assigned"
-                    self.change_task_color(task_id, seq_id, TASK_COLORS["assigned"])
-                    if not self.pcf.shown_path_agents or ag_id in self.pcf.shown_path_agents:
-                        self.show_single_task(task_id, seq_id)
-            else:  # a_time > self.pcf.cur_tstep
-                self.pcf.event_tracker["aid"] = a_id
-                break
+        self.pcf.prepare_paths(self.pcf.cur_tstep)
 
-        # Change tasks' colors according to finished timesteps
-        for f_id, f_time in enumerate(self.pcf.event_tracker["fTime"]):
-            if f_time == -1:
-                break
-            if f_time <= self.pcf.cur_tstep:
-                for (global_task_id, ag_id) in self.pcf.events["finished"][f_time].items():
-                    task_id = global_task_id // self.pcf.max_seq_num
-                    seq_id = global_task_id % self.pcf.max_seq_num
-                    self.pcf.seq_tasks[task_id].tasks[seq_id].state = "finished"
-                    self.change_task_color(task_id, seq_id, TASK_COLORS["finished"])
-                    if not self.pcf.shown_path_agents or ag_id in self.pcf.shown_path_agents:
-                        self.show_single_task(task_id, seq_id)
-            else:
-                self.pcf.event_tracker["fid"] = f_id
-                break
-
-        for (ag_id, agent_) in self.pcf.agents.items():
-            # Re-generate agent objects
-            tstep = min(self.pcf.cur_tstep - self.pcf.start_tstep, len(agent_.path)-1)
-            self.pcf.canvas.delete(agent_.agent_obj.obj)
-            self.pcf.canvas.delete(agent_.agent_obj.text)
-            agent_.agent_obj = self.pcf.render_obj(ag_id, agent_.path[tstep], "oval",
-                                                   AGENT_COLORS[AgentStatus.NORMAL.color_key],
-                                                   tk.NORMAL, 0.05, str(ag_id))
-            
-            if self.pcf.agent_model == "MAPF_T":
-                self.pcf.canvas.delete(agent_.dir_obj)
-                dir_loc = get_dir_loc(agent_.path[tstep])
-                agent_.dir_obj = self.pcf.canvas.create_oval(dir_loc[0] * self.pcf.tile_size,
-                                                             dir_loc[1] * self.pcf.tile_size,
-                                                             dir_loc[2] * self.pcf.tile_size,
-                                                             dir_loc[3] * self.pcf.tile_size,
-                                                             fill="navy",
-                                                             tag="dir",
-                                                             state=tk.DISABLED,
-                                                             outline="")
-            self._tag_agent_dynamic_canvas_items(agent_)
+        if self.pcf.event_tracker:
+            self.seek_task_events(self.pcf.cur_tstep)
+        self.place_agents(interrupted)
         self.show_tasks()
         self.show_agent_index()
         self.render_selected_agent_context()
@@ -5,9 +5,9 @@
 import argparse
 import tkinter as tk
 import numpy as np
-import json
 from plan_config import PlanConfig2023, PlanConfig2024
 from plan_viz import PlanViz2023, PlanViz2024
+from plan_reader import read_plan_header
 import math
 
 def main() -> None:
@@ -30,8 +30,18 @@ def main() -> None:
     parser.add_argument("--ppm", dest="ppm", type=int, help="Number of pixels per move")
     parser.add_argument("--mv", dest="moves", type=int, help="Number of moves per action")
     parser.add_argument("--delay", type=float, help="Wait time between animation updates")
-    parser.add_argument("--event-limit", dest="event_limit", type=int, default=100,
-                        help="Number of recent events to show in the event panel")
+    parser.add_argument("--event-limit", dest="event_limit", type=int, default=None,
+                        help="Number of recent events and errors to list in the panels (default: all)")
+    parser.add_argument("--no-cache", dest="use_cache", action="store_false",
+                        help="Do not read or write the .pvz path cache next to the plan file")
+    parser.add_argument("--verify-cache", dest="verify_cache", action="store_true",
+                        help="Also check the .pvz cache against a hash of the whole plan file")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Number of worker processes for decoding paths")
+    parser.add_argument("--agent-layer", dest="agent_layer", action="store_true",
+                        help="Draw the agents into a single image instead of canvas items")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="Time units per second of the playback, 0 to animate every one")
     
     parser.add_argument("--grid", dest="show_grid", type=bool, default=True,
                         help="Show grid on the environment or not")
@@ -53,19 +63,18 @@ def main() -> None:
                         help="Show the low-level heuristics")
     args = parser.parse_args()
 
-    version = None
     # read the json file specied by --plan, read only the version field
-    with open(args.plan, "r") as f:
-        plan = json.load(f)
-        if "version" in plan:
-            version = plan["version"]
+    version = read_plan_header(args.plan, ["version"]).get("version")
     
     if args.version != None:
         version = args.version
     print(version)
     if version in ["2024 LoRR", "2026 LoRR"]:
         plan_config = PlanConfig2024(args.map, args.plan, args.team_size, args.start, args.end, args.window,
-                              args.ppm, args.moves, args.delay, version, event_limit=args.event_limit)
+                              args.ppm, args.moves, args.delay, version, event_limit=args.event_limit,
+                              use_cache=args.use_cache, jobs=args.jobs,
+                              agent_layer=args.agent_layer, speed=args.speed,
+                              verify_cache=args.verify_cache)
         PlanViz2024(plan_config, args.show_grid, args.show_ag_idx, args.show_task_idx,
                 args.show_static, args.show_conf_ag)
     else:
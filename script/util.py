@@ -6,6 +6,7 @@ import sys
 import math
 from enum import Enum
 from typing import List, Tuple, Dict
+import numpy as np
 from numba import njit, prange
 
 TASK_COLORS: Dict[int, str] = {
@@ -15,6 +16,8 @@ TASK_COLORS: Dict[int, str] = {
     "finished": "#C0C0C0"
 }
 
+ERRAND_STATES: Tuple[str, ...] = ("unassigned", "assigned", "finished")  # By state code
+
 AGENT_COLORS: Dict[str, str] = {
     "newlyassigned": "yellowgreen",
     "assigned": "deepskyblue",
@@ -235,51 +238,270 @@ def apply_motion_code(row, col, direction, motion, is_mapf, is_tick, ticks_per_t
     return row, col, direction
 
 
+@njit(cache=True)
+def skip_rle_spaces(buf, pos, end):
+    while pos < end and (buf[pos] == 32 or buf[pos] == 9 or buf[pos] == 10 or buf[pos] == 13):
+        pos += 1
+    return pos
+
+
+@njit(cache=True)
+def parse_segmented_rle(buf, begin, end, char_to_code, wait_code, codes, write):
+    """Parse one segmented-rle-v1 string from raw bytes: [(startTick,x,y,dir,counter):(A 10,W 20)]...
+    Returns the number of ticks, or -1 if the string is not in the strict form, in which case the
+    caller falls back to the Python decoder for validation and error messages.
+    """
+    pos = begin
+    cur_tick = 0
+    chunk_count = 0
+    while True:
+        pos = skip_rle_spaces(buf, pos, end)
+        if pos >= end:
+            break
+        if pos + 1 >= end or buf[pos] != 91 or buf[pos + 1] != 40:  # "[("
+            return -1
+        pos = skip_rle_spaces(buf, pos + 2, end)
+
+        start_tick = 0
+        digits = 0
+        while pos < end and 48 <= buf[pos] <= 57:
+            start_tick = start_tick * 10 + (buf[pos] - 48)
+            digits += 1
+            pos += 1
+        if digits == 0:
+            return -1
+        pos = skip_rle_spaces(buf, pos, end)
+        commas = 0
+        while pos < end and buf[pos] != 41:  # ")"
+            if buf[pos] == 44:  # ","
+                commas += 1
+            elif commas == 0:
+                return -1
+            pos += 1
+        if pos >= end or commas != 4 or start_tick != cur_tick:
+            return -1
+        pos += 1
+        if pos + 1 >= end or buf[pos] != 58 or buf[pos + 1] != 40:  # ":("
+            return -1
+        pos += 2
+
+        while True:
+            pos = skip_rle_spaces(buf, pos, end)
+            if pos >= end:
+                return -1
+            if buf[pos] == 41:  # ")"
+                pos += 1
+                break
+            if buf[pos] == 44:  # Empty run token
+                pos += 1
+                continue
+
+            action_begin = pos
+            while pos < end and buf[pos] != 32 and buf[pos] != 9 and buf[pos] != 10 and \
+                buf[pos] != 13 and buf[pos] != 44 and buf[pos] != 41:
+                pos += 1
+            action_end = pos
+            pos = skip_rle_spaces(buf, pos, end)
+            if pos == action_end:
+                return -1
+            run_ticks = 0
+            digits = 0
+            while pos < end and 48 <= buf[pos] <= 57:
+                run_ticks = run_ticks * 10 + (buf[pos] - 48)
+                digits += 1
+                pos += 1
+            if digits == 0:
+                return -1
+            pos = skip_rle_spaces(buf, pos, end)
+            if pos >= end or (buf[pos] != 44 and buf[pos] != 41):
+                return -1
+            if buf[pos] == 44:
+                pos += 1
+
+            if write:
+                code = wait_code
+                if action_end - action_begin == 1:
+                    code = char_to_code[buf[action_begin]]
+                for tick in range(cur_tick, cur_tick + run_ticks):
+                    codes[tick] = code
+            cur_tick += run_ticks
+
+        if pos >= end or buf[pos] != 93:  # "]"
+            return -1
+        pos += 1
+        chunk_count += 1
+
+    if chunk_count == 0:
+        return -1
+    return cur_tick
+
+
+@njit(parallel=True, cache=True)
+def count_segmented_rle_ticks(buf, bounds, char_to_code, wait_code, tick_counts):
+    dummy = np.empty(0, dtype=np.int32)
+    for path_id in prange(tick_counts.shape[0]):
+        tick_counts[path_id] = parse_segmented_rle(
+            buf, bounds[path_id], bounds[path_id + 1], char_to_code, wait_code, dummy, False
+        )
+
+
 @njit(parallel=True, cache=True)
-def compute_exec_paths(motion_codes, starts, results, step_counts,
+def fill_segmented_rle_codes(buf, bounds, char_to_code, wait_code, tick_counts, offsets, codes):
+    for path_id in prange(tick_counts.shape[0]):
+        if tick_counts[path_id] < 0:
+            continue
+        parse_segmented_rle(
+            buf, bounds[path_id], bounds[path_id + 1], char_to_code, wait_code,
+            codes[offsets[path_id]:offsets[path_id + 1]], True
+        )
+
+
+@njit(cache=True)
+def round_state(row, col, direction, is_tick):
+    """Round a state to the stored precision: 6 decimals for ticks, integers otherwise."""
+    if is_tick:
+        return np.rint(row * 1e6) / 1e6, np.rint(col * 1e6) / 1e6, np.rint(direction * 1e6) / 1e6
+    return np.rint(row), np.rint(col), np.rint(direction)
+
+
+@njit(cache=True)
+def store_state(states, pos, row, col, direction):
+    states[pos, 0] = row
+    states[pos, 1] = col
+    states[pos, 2] = direction
+
+
+@njit(cache=True)
+def append_exec_states(row_idx, agent_ids, codes, code_offsets, first_steps, step_counts,
+                       skip_counts, starts, states, state_offsets, state_lengths, tails,
+                       is_mapf, is_tick, ticks_per_timestep):
+    ag_id = agent_ids[row_idx]
+    code_begin = code_offsets[ag_id] + first_steps[row_idx]
+    out = state_offsets[ag_id] + state_lengths[ag_id]
+    skip = skip_counts[row_idx]
+    row = starts[row_idx, 0]
+    col = starts[row_idx, 1]
+    direction = starts[row_idx, 2]
+    if skip == 0:
+        store_state(states, out, *round_state(row, col, direction, is_tick))
+        out += 1
+
+    for i in range(step_counts[row_idx]):
+        row, col, direction = apply_motion_code(
+            row, col, direction, codes[code_begin + i], is_mapf, is_tick, ticks_per_timestep
+        )
+        if i + 1 >= skip:
+            store_state(states, out, *round_state(row, col, direction, is_tick))
+            out += 1
+    state_lengths[ag_id] = out - state_offsets[ag_id]
+    store_state(tails, ag_id, row, col, direction)
+
+
+@njit(parallel=True, cache=True)
+def compute_exec_paths(agent_ids, codes, code_offsets, first_steps, step_counts, skip_counts, starts,
+                       states, state_offsets, state_lengths, tails,
                        is_mapf, is_tick, ticks_per_timestep):
+    """Append the executed states of each agent into the ragged state buffer.
+    Row i applies step_counts[i] motion codes from first_steps[i] to starts[i]; the first
+    skip_counts[i] states of the sequence (including the start state) are not stored.
+    The last state is kept unrounded in tails, so that a later extension continues exactly as if
+    the whole sequence was computed at once.
+    """
+    for row_idx in prange(agent_ids.shape[0]):
+        append_exec_states(row_idx, agent_ids, codes, code_offsets, first_steps, step_counts,
+                           skip_counts, starts, states, state_offsets, state_lengths, tails,
+                           is_mapf, is_tick, ticks_per_timestep)
+
+
+@njit(nogil=True, cache=True)
+def compute_exec_paths_nogil(agent_ids, codes, code_offsets, first_steps, step_counts, skip_counts,
+                             starts, states, state_offsets, state_lengths, tails,
+                             is_mapf, is_tick, ticks_per_timestep):
+    """Serial compute_exec_paths for background threads: releases the GIL and stays off the
+    parallel threading layer, which must not be entered from two threads at once.
+    """
+    for row_idx in range(agent_ids.shape[0]):
+        append_exec_states(row_idx, agent_ids, codes, code_offsets, first_steps, step_counts,
+                           skip_counts, starts, states, state_offsets, state_lengths, tails,
+                           is_mapf, is_tick, ticks_per_timestep)
+
+
+@njit(parallel=True, cache=True)
+def compute_keyframes(codes, code_offsets, starts, interval, keyframes, keyframe_offsets,
+                      is_mapf, is_tick, ticks_per_timestep):
+    """Store the unrounded executed state of each agent at timesteps 0, interval, 2*interval, ...
+    """
     for ag_id in prange(starts.shape[0]):
-        num_steps = step_counts[ag_id]
         row = starts[ag_id, 0]
         col = starts[ag_id, 1]
         direction = starts[ag_id, 2]
-        results[ag_id, 0, 0] = row
-        results[ag_id, 0, 1] = col
-        results[ag_id, 0, 2] = direction
-
-        for i in range(num_steps):
-            motion = motion_codes[ag_id, i]
+        out = keyframe_offsets[ag_id]
+        store_state(keyframes, out, row, col, direction)
+        out += 1
+        for i in range(code_offsets[ag_id + 1] - code_offsets[ag_id]):
             row, col, direction = apply_motion_code(
-                row, col, direction, motion, is_mapf, is_tick, ticks_per_timestep
+                row, col, direction, codes[code_offsets[ag_id] + i],
+                is_mapf, is_tick, ticks_per_timestep
             )
-            results[ag_id, i + 1, 0] = row
-            results[ag_id, i + 1, 1] = col
-            results[ag_id, i + 1, 2] = direction
+            if (i + 1) % interval == 0:
+                store_state(keyframes, out, row, col, direction)
+                out += 1
+
+
+@njit(cache=True)
+def append_plan_states(row_idx, agent_ids, codes, code_offsets, first_steps, step_counts,
+                       write_starts, starts, exec_states, exec_offsets, exec_lengths, base_indices,
+                       states, state_offsets, state_lengths, is_mapf, is_tick, ticks_per_timestep):
+    ag_id = agent_ids[row_idx]
+    code_begin = code_offsets[ag_id] + first_steps[row_idx]
+    out = state_offsets[ag_id] + state_lengths[ag_id]
+    if write_starts[row_idx]:
+        row, col, direction = round_state(starts[row_idx, 0], starts[row_idx, 1],
+                                          starts[row_idx, 2], is_tick)
+        store_state(states, out, row, col, direction)
+        out += 1
+
+    last_base = exec_lengths[ag_id] - 1
+    for i in range(step_counts[row_idx]):
+        base = exec_offsets[ag_id] + min(base_indices[row_idx] + i, last_base)
+        row, col, direction = apply_motion_code(
+            float(exec_states[base, 0]), float(exec_states[base, 1]),
+            float(exec_states[base, 2]), codes[code_begin + i],
+            is_mapf, is_tick, ticks_per_timestep
+        )
+        row, col, direction = round_state(row, col, direction, is_tick)
+        store_state(states, out, row, col, direction)
+        out += 1
+    state_lengths[ag_id] = out - state_offsets[ag_id]
 
 
 @njit(parallel=True, cache=True)
-def compute_plan_next_states(motion_codes, starts, base_states, results, step_counts,
+def compute_plan_next_states(agent_ids, codes, code_offsets, first_steps, step_counts, write_starts,
+                             starts, exec_states, exec_offsets, exec_lengths, base_indices,
+                             states, state_offsets, state_lengths,
                              is_mapf, is_tick, ticks_per_timestep):
-    for ag_id in prange(starts.shape[0]):
-        num_steps = step_counts[ag_id]
-        start_row = starts[ag_id, 0]
-        start_col = starts[ag_id, 1]
-        start_direction = starts[ag_id, 2]
-        results[ag_id, 0, 0] = start_row
-        results[ag_id, 0, 1] = start_col
-        results[ag_id, 0, 2] = start_direction
-
-        for i in range(num_steps):
-            row = base_states[ag_id, i, 0]
-            col = base_states[ag_id, i, 1]
-            direction = base_states[ag_id, i, 2]
-            motion = motion_codes[ag_id, i]
-            row, col, direction = apply_motion_code(
-                row, col, direction, motion, is_mapf, is_tick, ticks_per_timestep
-            )
-            results[ag_id, i + 1, 0] = row
-            results[ag_id, i + 1, 1] = col
-            results[ag_id, i + 1, 2] = direction
+    """Append the planned next states of each agent into the ragged state buffer.
+    Step i applies a planned motion to the executed state base_indices[row] + i, clamped to the
+    last executed state. The start state is stored first if write_starts[row] is set.
+    """
+    for row_idx in prange(agent_ids.shape[0]):
+        append_plan_states(row_idx, agent_ids, codes, code_offsets, first_steps, step_counts,
+                           write_starts, starts, exec_states, exec_offsets, exec_lengths,
+                           base_indices, states, state_offsets, state_lengths,
+                           is_mapf, is_tick, ticks_per_timestep)
+
+
+@njit(nogil=True, cache=True)
+def compute_plan_next_states_nogil(agent_ids, codes, code_offsets, first_steps, step_counts,
+                                   write_starts, starts, exec_states, exec_offsets, exec_lengths,
+                                   base_indices, states, state_offsets, state_lengths,
+                                   is_mapf, is_tick, ticks_per_timestep):
+    """Serial compute_plan_next_states for background threads, see compute_exec_paths_nogil."""
+    for row_idx in range(agent_ids.shape[0]):
+        append_plan_states(row_idx, agent_ids, codes, code_offsets, first_steps, step_counts,
+                           write_starts, starts, exec_states, exec_offsets, exec_lengths,
+                           base_indices, states, state_offsets, state_lengths,
+                           is_mapf, is_tick, ticks_per_timestep)
 
 
 class BaseObj:
@@ -0,0 +1,113 @@
+# -*- coding: UTF-8 -*-
+""" Virtual scrolling for Tk listboxes
+This script contains the list widget behind the event, error and location panels of PlanViz2024:
+a Tk listbox that only holds the rows in view of a list that can be hundreds of thousands of rows
+long, and asks for the text of each row when it scrolls into view.
+All rights reserved.
+"""
+
+from typing import Callable, List, Optional, Sequence
+import tkinter as tk
+
+
+class VirtualListbox:
+    """ A window of rows of a long list, shown in a Tk listbox under fixed header lines.
+
+    The rows are given by their number and callbacks from a row position (0 is the top row) to
+    its text, background color and selection. The scrollbar and the mouse wheel move the window,
+    and only the rows in it are inserted into the listbox, so neither a long list nor a change of
+    its rows costs more than the rows in view.
+    """
+    def __init__(self, listbox:tk.Listbox, scrollbar:tk.Scrollbar, header:Sequence[str]=(),
+                 max_rows:int=15, font=None):
+        self.listbox = listbox
+        self.scrollbar = scrollbar
+        self.header = list(header)
+        self.max_rows = max_rows  # Rows in view, without the header
+        self.font = font
+        self.num_rows = 0
+        self.top = 0  # Position of the top row in view
+        self.get_text:Callable[[int], str] = str
+        self.get_background:Optional[Callable[[int], str]] = None
+        self.is_selected:Optional[Callable[[int], bool]] = None
+
+        self.listbox.config(yscrollcommand="")
+        self.scrollbar.config(command=self.yview)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.listbox.bind(sequence, self.on_wheel)
+
+    def get_num_shown(self) -> int:
+        return max(0, min(self.max_rows, self.num_rows - self.top))
+
+    def set_rows(self, num_rows:int, get_text:Callable[[int], str],
+                 get_background:Callable[[int], str]=None,
+                 is_selected:Callable[[int], bool]=None) -> None:
+        """Show num_rows rows from the current scroll position."""
+        self.num_rows = num_rows
+        self.get_text = get_text
+        self.get_background = get_background
+        self.is_selected = is_selected
+        self.scroll_to(self.top)
+
+    def scroll_to(self, top:int) -> None:
+        self.top = max(0, min(top, self.num_rows - self.max_rows))
+        self.render()
+
+    def render(self) -> None:
+        if not self.listbox.winfo_exists():
+            return
+        self.listbox.delete(0, tk.END)
+        if self.font is not None:
+            self.listbox.config(font=self.font)
+        num_shown = self.get_num_shown()
+        lines = self.header + [self.get_text(pos) for pos in range(self.top, self.top + num_shown)]
+        if lines:
+            self.listbox.insert(tk.END, *lines)
+        for pos in range(self.top, self.top + num_shown):
+            index = self.get_index(pos)
+            if self.get_background is not None:
+                color = self.get_background(pos)
+                if color:
+                    self.listbox.itemconfigure(index, background=color)
+            if self.is_selected is not None and self.is_selected(pos):
+                self.listbox.selection_set(index)
+        self.listbox.config(height=max(2, len(self.header) + num_shown))
+        if self.num_rows > 0:
+            self.scrollbar.set(self.top / self.num_rows, (self.top + num_shown) / self.num_rows)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def get_index(self, pos:int) -> int:
+        """Listbox index of the row at pos, which must be in view."""
+        return len(self.header) + pos - self.top
+
+    def get_pos(self, index:int) -> Optional[int]:
+        """Position of the row at a listbox index, or None for the header lines."""
+        pos = self.top + index - len(self.header)
+        if index < len(self.header) or pos >= self.top + self.get_num_shown():
+            return None
+        return pos
+
+    def get_shown_positions(self) -> range:
+        return range(self.top, self.top + self.get_num_shown())
+
+    def get_selected_positions(self) -> List[int]:
+        return [pos for pos in map(self.get_pos, self.listbox.curselection()) if pos is not None]
+
+    def yview(self, *args) -> None:
+        """Scrollbar command: ("moveto", fraction) or ("scroll", number, "units" | "pages")."""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * self.num_rows))
+        elif args[0] == "scroll":
+            step = self.max_rows if args[2] == "pages" else 1
+            self.scroll_to(self.top + int(args[1]) * step)
+
+    def on_wheel(self, event) -> str:
+        # Respond to Linux (event.num) or Windows (event.delta) wheel event
+        if event.num == 5 or event.delta < 0:
+            self.scroll_to(self.top + 3)
+        elif event.num == 4 or event.delta > 0:
+            self.scroll_to(self.top - 3)
+        return "break"